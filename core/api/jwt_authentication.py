@@ -1,4 +1,9 @@
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from channels.sessions import CookieMiddleware
+from django.contrib.auth.models import AnonymousUser
 from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
 
@@ -15,3 +20,27 @@ class JWTAuthenticationByCookie(BaseAuthentication):
         user = self.jwt_auth_obj.get_user(validated_token)
 
         return user, validated_token
+
+
+@database_sync_to_async
+def get_user_by_access_cookie(access):
+    if not access:
+        return AnonymousUser()
+
+    jwt_auth_obj = JWTAuthenticationByCookie.jwt_auth_obj
+    try:
+        return jwt_auth_obj.get_user(jwt_auth_obj.get_validated_token(access))
+    except AuthenticationFailed:
+        return AnonymousUser()
+
+
+class JWTCookieAuthMiddleware(BaseMiddleware):
+    """Channels counterpart of JWTAuthenticationByCookie for WebSocket connections."""
+
+    async def __call__(self, scope, receive, send):
+        scope['user'] = await get_user_by_access_cookie(scope.get('cookies', {}).get('access'))
+        return await super().__call__(scope, receive, send)
+
+
+def JWTCookieAuthMiddlewareStack(inner):
+    return CookieMiddleware(JWTCookieAuthMiddleware(inner))
@@ -0,0 +1,29 @@
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from utils.realtime import run_status_group
+
+
+class RunStatusConsumer(AsyncJsonWebsocketConsumer):
+    """Pushes status changes of the user's simulation runs, see utils.realtime.publish_run_statuses."""
+
+    group_name = None
+
+    async def connect(self):
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            await self.close(code=4401)
+            return
+
+        self.group_name = run_status_group(user.pk)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if self.group_name:
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        pass
+
+    async def run_status(self, event):
+        await self.send_json(event['data'])
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from api.v1.consumers import RunStatusConsumer
+
+websocket_urlpatterns = [
+    path('ws/v1/runs/', RunStatusConsumer.as_asgi(), name='ws-run-status'),
+]
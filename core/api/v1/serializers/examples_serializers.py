@@ -1,9 +1,18 @@
+import math
+from datetime import timedelta
+from itertools import product
+
+from django.conf import settings
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
 from api.v1.serializers.users_serializers import UserQuickInfoSerializer
 from api.v1.serializers.validators import m2m_validator
-from geant_examples.models import Example, Tag, ExampleCommand, Command, CommandValue, CommandList, Category
+from geant_examples.models import (
+    Example, Tag, ExampleCommand, Command, CommandValue, CommandList, Category, UserExampleCommand
+)
+from geant_examples.run_params import params_from_key
+from geant_examples.run_stats import get_run_stats
 
 
 class TagSerializer(serializers.Serializer):
@@ -115,6 +124,10 @@ class ExampleCommandPOSTSerializer(serializers.ModelSerializer):
         return ex_command
 
 
+class ExampleCommandRunSerializer(serializers.Serializer):
+    params = serializers.DictField(child=serializers.CharField(allow_blank=True), required=False, default=dict)
+
+
 class CategorySerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -134,6 +147,25 @@ class ExampleGETSerializer(serializers.Serializer):
     def get_tags(self, obj):
         return list(obj.tags.all().values_list('title', flat=True))
 
+class ExampleDocumentSerializer(serializers.Serializer):
+    """ExampleGETSerializer output built from ExampleDocument _source, without a database query"""
+    id = serializers.IntegerField()
+    title_verbose = serializers.CharField(required=False)
+    title_not_verbose = serializers.CharField(required=False)
+    description = serializers.CharField(required=False)
+    date_to_update = serializers.SerializerMethodField()
+    tags = serializers.ListField(child=serializers.CharField(), required=False)
+    category = serializers.SerializerMethodField()
+
+    def get_date_to_update(self, obj):
+        value = obj.get('date_to_update')
+        return str(value)[:10] if value else None
+
+    def get_category(self, obj):
+        title = obj.get('category')
+        return {'title': title} if title else None
+
+
 class ExamplePOSTSerializer(serializers.ModelSerializer):
     tags = TagSerializer(many=True, required=False)
 
@@ -200,6 +232,7 @@ class ExampleForUserSerializer(serializers.Serializer):
     category = serializers.SerializerMethodField()
     params = serializers.SerializerMethodField()
     example_id = serializers.SerializerMethodField(method_name='get_example_id')
+    eta = serializers.SerializerMethodField()
 
     def get_title_verbose(self, obj):
         return obj.example_command.example.title_verbose
@@ -211,15 +244,8 @@ class ExampleForUserSerializer(serializers.Serializer):
         return obj.example_command.example.date_to_update
 
     def get_params(self, obj):
-        key = obj.example_command.key_s3
-        raw_params = key.split('__', 1)[1].split('__')
-
-        if not any(raw_params):
-            return {}
-
-        params = dict([param.split('=') for param in raw_params])
-
-        return params
+        params = obj.example_command.params
+        return params if params is not None else params_from_key(obj.example_command.key_s3)
 
     def get_tags(self, obj):
         return list(obj.example_command.example.tags.all().values_list('title', flat=True))
@@ -231,7 +257,90 @@ class ExampleForUserSerializer(serializers.Serializer):
     def get_example_id(self, obj):
         return obj.example_command.example.id
 
+    def get_eta(self, obj):
+        if obj.status != UserExampleCommand.StatusChoice.executing:
+            return None
+
+        # a history page lists many runs of few examples, the stats are looked up once per example
+        run_stats = self.context.setdefault('run_stats', {})
+        example_id = obj.example_command.example_id
+        if example_id not in run_stats:
+            run_stats[example_id] = get_run_stats(example_id)
+        if run_stats[example_id]['p50'] is None:
+            return None
+
+        started_at = obj.example_command.started_at or obj.creation_date
+        return serializers.DateTimeField().to_representation(
+            started_at + timedelta(seconds=run_stats[example_id]['p50']))
+
 
 class ExampleCommandUpdateStatusSerializer(serializers.Serializer):
     key_s3 = serializers.CharField()
     err_body = serializers.CharField(required=False)
+
+
+class ExampleSweepPOSTSerializer(serializers.Serializer):
+    grid = serializers.DictField(
+        child=serializers.ListField(child=serializers.CharField(), allow_empty=False), required=False)
+    points = serializers.ListField(
+        child=serializers.DictField(child=serializers.CharField()),
+        required=False,
+        allow_empty=False,
+        max_length=settings.EXAMPLE_SWEEP_MAX_POINTS
+    )
+
+    def validate(self, attrs):
+        if ('grid' in attrs) == ('points' in attrs):
+            raise ValidationError('Provide either "grid" or "points"')
+
+        max_points = settings.EXAMPLE_SWEEP_MAX_POINTS
+        if 'grid' in attrs:
+            grid = {title: list(dict.fromkeys(values)) for title, values in attrs['grid'].items()}
+            # the size is known before expanding, a huge grid must not be built just to be rejected
+            if math.prod(len(values) for values in grid.values()) > max_points:
+                raise ValidationError(f'Max points in one sweep is {max_points}')
+            points = [dict(zip(grid, values)) for values in product(*grid.values())]
+        else:
+            points = attrs['points']
+
+        seen, unique_points = set(), []
+        for point in points:
+            if frozenset(point.items()) not in seen:
+                seen.add(frozenset(point.items()))
+                unique_points.append(point)
+        if len(unique_points) > max_points:
+            raise ValidationError(f'Max points in one sweep is {max_points}')
+
+        commands = set(self.context['example'].commands.values_list('title', flat=True))
+        unknown = {title for point in unique_points for title in point} - commands
+        if unknown:
+            raise ValidationError(f'Unknown commands: {", ".join(sorted(unknown))}')
+
+        return {'points': unique_points}
+
+
+class SweepPointSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    example_command = serializers.IntegerField(source='example_command_id')
+    key_s3 = serializers.CharField(source='example_command.key_s3')
+    status = serializers.IntegerField()
+    params = serializers.SerializerMethodField()
+    eta = serializers.SerializerMethodField()
+
+    get_params = ExampleForUserSerializer.get_params
+    get_eta = ExampleForUserSerializer.get_eta
+
+
+class ExampleSweepSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    example = serializers.IntegerField(source='example_id')
+    creation_date = serializers.DateTimeField()
+    summary = serializers.SerializerMethodField()
+
+    def get_summary(self, obj):
+        return {
+            'total': obj.total,
+            'executing': obj.executing,
+            'executed': obj.executed,
+            'failure': obj.failure,
+        }
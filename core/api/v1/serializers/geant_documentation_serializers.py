@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db import transaction
 from drf_writable_nested import WritableNestedModelSerializer
 from rest_framework import serializers
@@ -98,7 +99,104 @@ class ArticleListSerializer(serializers.ModelSerializer):
         return obj.chapter.title if obj.chapter else None
 
 
-class ArticleSerializer(WritableNestedModelSerializer):
+class ArticleDocumentSerializer(serializers.Serializer):
+    """ArticleListSerializer output built from ArticleDocument _source, without a database query"""
+    id = serializers.IntegerField()
+    category = serializers.SerializerMethodField()
+    chapter = serializers.SerializerMethodField()
+    description = serializers.CharField(required=False)
+    title = serializers.CharField(required=False)
+    match = serializers.DictField(required=False)
+
+    def get_category(self, obj):
+        return obj.get('category') or None
+
+    def get_chapter(self, obj):
+        return obj.get('chapter') or None
+
+
+class ArticleTreeWriter:
+    """Writes an article's subscriptions, elements and files with bulk queries.
+
+    Subscriptions and elements are matched by id, files by uuid, so a file that stays
+    in the payload keeps both its row and its stored object.
+    """
+
+    def __init__(self, article: Article):
+        self.article = article
+        self.subscriptions = {sub.pk: sub for sub in Subscription.objects.filter(article=article)}
+        self.elements = {element.pk: element for element in Element.objects.filter(subscription__article=article)}
+        self.files = {str(file.uuid): file for file in File.objects.filter(element__subscription__article=article)}
+        self.element_parents = {pk: element.subscription_id for pk, element in self.elements.items()}
+        self.file_parents = {file.pk: file.element_id for file in self.files.values()}
+
+    @staticmethod
+    def get_pk(initial) -> int | None:
+        try:
+            return int(initial.get('pk') or initial.get('id'))
+        except (AttributeError, TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def save_rows(model, rows: list, fields: list[str]):
+        existing = [row for row in rows if row.pk]
+        new = [row for row in rows if not row.pk]
+        if existing:
+            model.objects.bulk_update(existing, fields)
+        if new:
+            model.objects.bulk_create(new)
+
+    def build(self, subscriptions_data: list, subscriptions_initial: list):
+        sub_rows, element_rows, file_rows = [], [], []
+        for data, initial in zip(subscriptions_data, subscriptions_initial):
+            sub = self.subscriptions.get(self.get_pk(initial)) or Subscription(article=self.article)
+            sub.title = data.get('title', sub.title)
+            sub.subscription_order = data.get('subscription_order', sub.subscription_order)
+            sub_rows.append(sub)
+
+            for element_data, element_initial in zip(data.get('elements', []), initial.get('elements', [])):
+                element = self.elements.get(self.get_pk(element_initial)) or Element()
+                element.subscription = sub
+                element.text = element_data.get('text', element.text)
+                element.element_order = element_data.get('element_order', element.element_order)
+                element.type = element_data.get('type', element.type)
+                element_rows.append(element)
+
+                for file_data in element_data.get('files', []):
+                    uuid = file_data.get('uuid')
+                    file = self.files.get(str(uuid)) if uuid else None
+                    file = file or File(**({'uuid': uuid} if uuid else {}))
+                    file.element = element
+                    file.format = file_data.get('format', file.format)
+                    file_rows.append(file)
+        return sub_rows, element_rows, file_rows
+
+    def write(self, subscriptions_data: list, subscriptions_initial: list):
+        sub_rows, element_rows, file_rows = self.build(subscriptions_data, subscriptions_initial)
+
+        kept_files = {file.pk for file in file_rows if file.pk}
+        kept_elements = {element.pk for element in element_rows if element.pk}
+        dead_elements = set(self.elements) - kept_elements
+        dead_subs = set(self.subscriptions) - {sub.pk for sub in sub_rows if sub.pk}
+        # dead parents of rows that are moved elsewhere are removed only after the move, the rest go first to free their unique slots
+        holding_elements = {self.file_parents[pk] for pk in kept_files} & dead_elements
+        holding_subs = {
+            self.element_parents[pk] for pk in kept_elements | holding_elements
+        } & dead_subs
+
+        File.objects.filter(element__subscription__article=self.article).exclude(pk__in=kept_files).delete()
+        Element.objects.filter(pk__in=dead_elements - holding_elements).delete()
+        Subscription.objects.filter(pk__in=dead_subs - holding_subs).delete()
+
+        self.save_rows(Subscription, sub_rows, ['title', 'subscription_order'])
+        self.save_rows(Element, element_rows, ['subscription', 'text', 'element_order', 'type'])
+        self.save_rows(File, file_rows, ['element', 'format'])
+
+        Element.objects.filter(pk__in=holding_elements).delete()
+        Subscription.objects.filter(pk__in=holding_subs).delete()
+
+
+class ArticleSerializer(serializers.ModelSerializer):
     chapter = serializers.PrimaryKeyRelatedField(queryset=Chapter.objects.all(), required=False, allow_null=True)
     category = serializers.PrimaryKeyRelatedField(queryset=Category.objects.all(), required=False, allow_null=True)
     subscriptions = SubscriptionSerializer(many=True)
@@ -108,13 +206,31 @@ class ArticleSerializer(WritableNestedModelSerializer):
         fields = '__all__'
         extra_kwargs = {'id': {'required': False}}
 
+    def validate_subscriptions(self, subscriptions):
+        # File.save counts files one row at a time, bulk writes skip it so the limit is checked here
+        for subscription in subscriptions:
+            for element in subscription.get('elements', []):
+                if len(element.get('files', [])) > settings.MAX_FILES_PER_ELEMENT:
+                    raise serializers.ValidationError(
+                        f'Max files for element is {settings.MAX_FILES_PER_ELEMENT}')
+        return subscriptions
+
     def create(self, validated_data):
+        subscriptions = validated_data.pop('subscriptions', [])
         with transaction.atomic():
-            return super().create(validated_data)
+            article = Article.objects.create(**validated_data)
+            ArticleTreeWriter(article).write(subscriptions, self.initial_data.get('subscriptions', []))
+        return article
 
     def update(self, instance, validated_data):
+        subscriptions = validated_data.pop('subscriptions', None)
         with transaction.atomic():
-            return super().update(instance, validated_data)
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            instance.save()
+            if subscriptions is not None:
+                ArticleTreeWriter(instance).write(subscriptions, self.initial_data.get('subscriptions', []))
+        return instance
 
 
 class ArticleIdSerializer(serializers.ModelSerializer):
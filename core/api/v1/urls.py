@@ -13,11 +13,13 @@ from api.v1.views.auth_views import (
     GetAuthInfoAPIView
 )
 
-from api.v1.views.examples_views import ExampleViewSet, ExampleCommandViewSet, ExampleCommandUpdateStatusAPIView, CategoryViewSet as ExampleCategoryViewSet
+from api.v1.views.examples_views import ExampleViewSet, ExampleCommandViewSet, ExampleCommandUpdateStatusAPIView, CategoryViewSet as ExampleCategoryViewSet, \
+    ExampleSweepViewSet
 from api.v1.views.tags_views import TagViewSet
 from api.v1.views.geant_documentation_views import ArticleViewSet, ChapterViewSet, CategoryViewSet, SubscriptionViewSet, \
-    ElementViewSet, FileViewSet, ArticleUserViewSet, AllArticleIdAPIView
+    ElementViewSet, FileViewSet, FileBatchAPIView, ArticleUserViewSet, AllArticleIdAPIView
 from api.v1.views.groups_views import GroupAPIViewSet
+from api.v1.views.metrics_views import HttpPoolStatsAPIView
 from api.v1.views.users_views import (
     UserProfileViewSet,
     UserProfileUpdateImportantInfoViewSet,
@@ -66,6 +68,8 @@ example_command_router = NestedSimpleRouter(
     parent_router=example_router, parent_prefix=r'examples', lookup='example')
 example_command_router.register(
     r'example_geant', ExampleCommandViewSet, basename='example-example-command')
+example_command_router.register(
+    r'sweeps', ExampleSweepViewSet, basename='example-sweep')
 
 urlpatterns = [
     path('', include(example_router.urls)),
@@ -77,6 +81,7 @@ urlpatterns = [
     path('documentations/', include(documentation_router.urls)),
     path('documentations/', include(documentation_subscription_element_router.urls)),
     path('documentations/', include(documentation_subscription_router.urls)),
+    path('documentations/files/', FileBatchAPIView.as_view(), name='file-batch'),
     path(
         'documentations/<uuid:uuid>/<str:file_format>/',
         FileViewSet.as_view(actions=FileViewSet.get_action_map()),
@@ -115,5 +120,6 @@ urlpatterns = [
     ),
     path('is_authorized/', GetAuthInfoAPIView.as_view(), name='is-authorized'),
     path('check-is-staff/', UserStaff.as_view(), name='check-is-staff'),
+    path('metrics/http_pools/', HttpPoolStatsAPIView.as_view(), name='http-pool-stats'),
     path('no-search-path/', AllArticleIdAPIView.as_view(),)
 ]
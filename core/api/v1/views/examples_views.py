@@ -1,14 +1,17 @@
-from math import ceil
+from datetime import timedelta
 
 import loguru
-import requests
+import redis
 from cacheops import invalidate_model
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
 from django.db.models.query import QuerySet, Prefetch
-from django.http import FileResponse
+from django.utils import timezone
 from drf_spectacular.utils import extend_schema
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.exceptions import Throttled
 from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
@@ -23,13 +26,23 @@ from api.v1.serializers.examples_serializers import (
     ExampleCommandGETSerializer,
     ExampleCommandPOSTSerializer,
     ExampleCommandUpdateStatusSerializer,
-    DetailExampleSerializer, CategorySerializer
+    ExampleCommandRunSerializer,
+    DetailExampleSerializer, CategorySerializer, ExampleDocumentSerializer,
+    ExampleSweepPOSTSerializer, ExampleSweepSerializer, SweepPointSerializer
 )
 from file_client.exceptions import FileClientException
 from file_client.files_clients import ReadOnlyClient
 from geant_examples.documents import ExampleDocument
-from geant_examples.models import Example, UserExampleCommand, ExampleCommand, Command, CommandValue, Category
-from .mixins import ElasticMixin
+from geant_examples.models import (
+    Example, UserExampleCommand, ExampleCommand, Command, CommandValue, Category, ExampleSweep
+)
+from geant_examples import scheduler
+from geant_examples.run_params import canonical_params, stored_params
+from geant_examples.run_stats import expected_duration, get_run_stats, invalidate_run_stats
+from geant_examples.tasks import finish_run, mark_run_finished, submit_runs
+from utils.realtime import publish_run_statuses
+from utils.search_index import enqueue
+from .mixins import ElasticMixin, ConditionalFileMixin
 
 
 @extend_schema(
@@ -48,6 +61,7 @@ class ExampleViewSet(ModelViewSet, ElasticMixin):
     permission_classes = (IsAuthenticated,)
     http_method_names = ['get', 'post', 'patch', 'delete']
     elastic_document = ExampleDocument
+    elastic_serializer_class = ExampleDocumentSerializer
 
     @extend_schema(exclude=True)
     @action(detail=False, methods=['patch'], url_path="change-synchronized", permission_classes=[])
@@ -62,6 +76,15 @@ class ExampleViewSet(ModelViewSet, ElasticMixin):
 
         return Response({"message": "success."}, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['get'], url_path='suggest', url_name='suggest')
+    def suggest(self, request, *args, **kwargs):
+        return self.elastic_suggest(request)
+
+    @action(detail=True, methods=['get'], url_path='run-stats', url_name='run-stats')
+    def run_stats(self, request, *args, **kwargs):
+        example = get_object_or_404(Example, pk=kwargs['pk'])
+        return Response(get_run_stats(example.pk))
+
     def get_serializer(self, *args, **kwargs):
         match self.request.method:
             case 'GET':
@@ -74,12 +97,6 @@ class ExampleViewSet(ModelViewSet, ElasticMixin):
                 return ExamplePATCHSerializer(*args, **kwargs)
 
     def get_queryset(self):
-        if self.action == 'list':
-            elastic_document_class = self.get_elastic_document_class()
-            self.setup_elastic_document_conf()
-            search = elastic_document_class.search()
-            result_search = self.elastic_full_query_handling(self.request, search)
-            return result_search.to_queryset()
         return Example.objects.prefetch_related(
             'tags',
             Prefetch(
@@ -96,16 +113,13 @@ class ExampleViewSet(ModelViewSet, ElasticMixin):
         )
 
     def list(self, request, *args, **kwargs):
-        response = super().list(request, *args, **kwargs)
-        response.data.append(
-            {"pages_count": ceil(len(response.data) / self.elastic_document_conf["pagination_page_size"])})
-        return response
+        return self.elastic_list(request)
 
 
 @extend_schema(
     tags=['ExampleCommand endpoint']
 )
-class ExampleCommandViewSet(ModelViewSet):
+class ExampleCommandViewSet(ModelViewSet, ConditionalFileMixin):
     permission_classes = (IsAuthenticated,)
     http_method_names = ['get', 'post', 'delete', ]
 
@@ -126,68 +140,138 @@ class ExampleCommandViewSet(ModelViewSet):
         example = int(self.kwargs.get('example_pk'))
         return ExampleCommand.objects.filter(example=example).prefetch_related(*prefetch_lookups)
 
-    @extend_schema(request=ExampleCommandPOSTSerializer)
+    @extend_schema(request=ExampleCommandRunSerializer)
     def create(self, request, *args, **kwargs):
-        params = request.data.get('params', {})
         user = request.user
         example = get_object_or_404(Example, id=self.kwargs.get('example_pk'))
-        for command in example.commands.all():
-            if command.title in params.keys():
-                params[command.title] = [params[command.title], command.order_index]
-
-        key_s3 = self._generate_key_s3(example.title_not_verbose, params)
-        request.data['params'] = key_s3
-        filename = key_s3 + '.zip'
-
-        client = ReadOnlyClient(filename)
+        serializer = ExampleCommandRunSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        commands = list(example.commands.all())
+        params = canonical_params(commands, serializer.validated_data['params'])
+
+        candidates = self._candidate_keys(
+            example.title_not_verbose, commands, serializer.validated_data['params'], params)
+        key_s3 = candidates[0]
+        if self._key_is_too_long(key_s3):
+            return Response({'detail': 'Run parameters are too long'}, status=status.HTTP_400_BAD_REQUEST)
+
+        for candidate in candidates:
+            filename = candidate + '.zip'
+            try:
+                cached = ReadOnlyClient(filename).download_cached()
+            except FileClientException:
+                continue
+            self._add_user_in_example_command(example, candidate, user, params)
+            return self.get_file_response(request, cached, filename)
+
+        key_s3 = self._known_keys({key_s3: candidates})[key_s3] or key_s3
+        return self._run_or_attach(example, key_s3, params, user)
+
+    @action(detail=True, methods=['get'], url_path='download', url_name='download')
+    def download(self, request, *args, **kwargs):
+        ex_command = get_object_or_404(self.get_queryset(), pk=kwargs['pk'], users=request.user)
+        filename = ex_command.key_s3 + '.zip'
         try:
-            response = client.download()
+            cached = ReadOnlyClient(filename).download_cached()
         except FileClientException as e:
+            return Response(e.error, status=status.HTTP_404_NOT_FOUND)
+        return self.get_file_response(request, cached, filename)
+
+    def _run_or_attach(self, example, key_s3, params, user):
+        with transaction.atomic():
+            ex_command, created = ExampleCommand.objects.select_for_update().get_or_create(
+                key_s3=key_s3, defaults={'example': example, 'params': stored_params(params)}
+            )
+            if created:
+                return self._run_example(ex_command, params, user)
+
+            us_ex_commands = UserExampleCommand.objects.filter(
+                example_command=ex_command)
+            status_val = us_ex_commands.values_list(
+                'status', flat=True).first()
+            if status_val == 2:
+                ex_command.users.add(user)
+                us_ex_commands.update(
+                    status=UserExampleCommand.StatusChoice.failure)
+                invalidate_model(UserExampleCommand)
+                return Response({'detail': 'Example executing was finished in error'},
+                                status=status.HTTP_400_BAD_REQUEST)
+
             ex_commands = self.get_queryset(
-                'example', 'users').filter(key_s3=key_s3)
-            if not ex_commands.exists():
-                response = self._run_example(request, example, params)
-            else:
-                ex_command = ex_commands.first()
-                us_ex_commands = UserExampleCommand.objects.filter(
-                    example_command=ex_command)
-                status_val = us_ex_commands.values_list(
-                    'status', flat=True).first()
-                if status_val == 2:
-                    ex_command.users.add(user)
-                    us_ex_commands.update(
-                        status=UserExampleCommand.StatusChoice.failure)
-                    invalidate_model(UserExampleCommand)
-                    return Response({'detail': 'Example executing was finished in error'},
-                                    status=status.HTTP_400_BAD_REQUEST)
-                response = self._example_is_executing(ex_commands, user)
-            return response
-
-        self._add_user_in_example_command(example, key_s3, user)
-        return FileResponse(response, as_attachment=True, filename=filename)
+                'example', 'users').filter(pk=ex_command.pk)
+            return self._example_is_executing(ex_commands, user)
 
     @staticmethod
     def _generate_key_s3(title, params):
         str_params = {
             str(v[-1]): str(v[0]).replace(' ', '--')
-            for k, v in params.items()
+            for k, v in sorted(params.items(), key=lambda item: int(item[1][-1]))
         }
         return f'key-s3-{title}__' + '__'.join(f'{k}={v}' for k, v in str_params.items())
 
-    def _run_example(self, request, example, params):
-        data = {
-            'title': example.title_not_verbose,
+    @staticmethod
+    def _generate_legacy_key_s3(title, commands, params):
+        # the key as it was built before canonical_params: request order, given commands only, raw values
+        order_indexes = {command.title: command.order_index for command in commands}
+        return f'key-s3-{title}__' + '__'.join(
+            f'{order_indexes[k]}={str(v).replace(" ", "--")}' for k, v in params.items() if k in order_indexes
+        )
+
+    @classmethod
+    def _candidate_keys(cls, title, commands, raw_params, params):
+        # results stored before keys were canonical are still found under the key the request used to get
+        return list(dict.fromkeys([
+            cls._generate_key_s3(title, params), cls._generate_legacy_key_s3(title, commands, raw_params)
+        ]))
+
+    @staticmethod
+    def _known_keys(candidates):
+        """Key of the existing run for each {key_s3: candidate keys}, None where there is none yet."""
+        known = set(ExampleCommand.objects.filter(
+            key_s3__in=[key for keys in candidates.values() for key in keys]
+        ).values_list('key_s3', flat=True))
+        return {
+            key_s3: next((key for key in keys if key in known), None)
+            for key_s3, keys in candidates.items()
+        }
+
+    @staticmethod
+    def _key_is_too_long(key_s3):
+        return len(key_s3.encode()) > ExampleCommand._meta.get_field('key_s3').max_length
+
+    @staticmethod
+    def _get_run_data(title, params):
+        return {
+            'title': title,
             'commands': [{k: str(v[0])} for k, v in params.items()]
         }
-        response = requests.post(
-            settings.GEANT_BACKEND_RUN_EXAMPLE_URL, json=data)
-        if response.status_code == 200:
-            return super().create(request)
+
+    def _run_example(self, ex_command, params, user):
+        ex_command.users.add(user)
+        jobs = [(
+            ex_command.key_s3,
+            self._get_run_data(ex_command.example.title_not_verbose, params),
+            expected_duration(ex_command.example_id),
+        )]
+        try:
+            position = scheduler.check_capacity(user.pk, len(jobs)) + 1
+        except scheduler.QueueFull as e:
+            # raised inside the transaction, so the example command created for this run is rolled back
+            raise Throttled(wait=e.retry_after, detail='Simulation queue is full, try again later')
+        except redis.RedisError as e:
+            loguru.logger.error(f'Scheduler is unavailable: {e}')
+            position = None
+        transaction.on_commit(lambda: submit_runs(user.pk, jobs))
 
         return Response(
-            data=response.json(),
-            status=response.status_code,
-            headers=response.headers
+            {
+                'detail': 'Example execution started',
+                'id': ex_command.id,
+                'key_s3': ex_command.key_s3,
+                'status': UserExampleCommand.StatusChoice.executing,
+                'queue_position': position,
+            },
+            status=status.HTTP_202_ACCEPTED
         )
 
     def _example_is_executing(self, ex_commands, user):
@@ -200,9 +284,9 @@ class ExampleCommandViewSet(ModelViewSet):
         )
 
     @staticmethod
-    def _add_user_in_example_command(example, key_s3, user):
+    def _add_user_in_example_command(example, key_s3, user, params=None):
         ex_command, created = ExampleCommand.objects.get_or_create(
-            key_s3=key_s3, example=example)
+            key_s3=key_s3, example=example, defaults={'params': stored_params(params) if params else None})
 
         if user not in ex_command.users.all():
             ex_command.users.add(user)
@@ -213,6 +297,153 @@ class ExampleCommandViewSet(ModelViewSet):
         us_ex_command.save()
 
 
+@extend_schema(
+    tags=['ExampleSweep endpoint']
+)
+class ExampleSweepViewSet(ReadOnlyModelViewSet):
+    permission_classes = (IsAuthenticated,)
+    http_method_names = ['get', 'post']
+    serializer_class = ExampleSweepSerializer
+
+    def get_queryset(self):
+        user = self.request.user
+        users_runs = Q(example_commands__userexamplecommand__user=user)
+        status_field = 'example_commands__userexamplecommand__status'
+        counts = {
+            choice.name: Count('example_commands__userexamplecommand', filter=users_runs & Q(**{status_field: choice}))
+            for choice in UserExampleCommand.StatusChoice
+        }
+        return ExampleSweep.objects.filter(user=user, example=self.kwargs['example_pk']).annotate(
+            total=Count('example_commands', distinct=True), **counts
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(self.get_sweep_data(self.get_object()))
+
+    def get_sweep_data(self, sweep):
+        points = UserExampleCommand.objects.filter(
+            user=self.request.user, example_command__sweeps=sweep
+        ).select_related('example_command').order_by('example_command_id')
+        return {
+            **ExampleSweepSerializer(sweep).data,
+            'points': SweepPointSerializer(points, many=True).data,
+        }
+
+    @extend_schema(request=ExampleSweepPOSTSerializer)
+    def create(self, request, *args, **kwargs):
+        user = request.user
+        example = get_object_or_404(Example, id=self.kwargs.get('example_pk'))
+        serializer = ExampleSweepPOSTSerializer(data=request.data, context={'example': example})
+        serializer.is_valid(raise_exception=True)
+
+        commands = list(example.commands.all())
+        points, candidates = {}, {}
+        for point in serializer.validated_data['points']:
+            params = canonical_params(commands, point)
+            keys = ExampleCommandViewSet._candidate_keys(example.title_not_verbose, commands, point, params)
+            points[keys[0]], candidates[keys[0]] = params, keys
+        if any(ExampleCommandViewSet._key_is_too_long(key_s3) for key_s3 in points):
+            return Response({'detail': 'Run parameters are too long'}, status=status.HTTP_400_BAD_REQUEST)
+
+        resolved = ExampleCommandViewSet._known_keys(candidates)
+        missing = [key_s3 for key_s3, found in resolved.items() if found is None]
+        probed = ReadOnlyClient.exists_many(
+            [ReadOnlyClient(key + '.zip') for key_s3 in missing for key in candidates[key_s3]])
+        stored = set()
+        for key_s3 in missing:
+            found = next((key for key in candidates[key_s3] if probed[key + '.zip'] is True), None)
+            if found is not None:
+                stored.add(found)
+            resolved[key_s3] = found or key_s3
+        runs = {resolved[key_s3]: params for key_s3, params in points.items()}
+        unknown = [resolved[key_s3] for key_s3 in missing]
+
+        with transaction.atomic():
+            ExampleCommand.objects.bulk_create(
+                [
+                    ExampleCommand(key_s3=key_s3, example=example, params=stored_params(runs[key_s3]))
+                    for key_s3 in unknown
+                ],
+                ignore_conflicts=True
+            )
+            # a concurrent request inserting the same keys holds them until it has attached its user and committed
+            ex_commands = list(ExampleCommand.objects.select_for_update().filter(key_s3__in=runs).order_by('pk'))
+
+            statuses, attached, since = {}, set(), {}
+            for command_id, user_id, run_status, creation_date in UserExampleCommand.objects.filter(
+                    example_command__in=ex_commands
+            ).values_list('example_command_id', 'user_id', 'status', 'creation_date'):
+                statuses.setdefault(command_id, run_status)
+                since[command_id] = min(since.get(command_id, creation_date), creation_date)
+                if user_id == user.pk:
+                    attached.add(command_id)
+
+            # rows nobody is attached to were inserted by this request, the rest already have a run of their own
+            to_run = [
+                ex_command for ex_command in ex_commands
+                if ex_command.pk not in statuses and ex_command.key_s3 not in stored
+            ]
+            to_run += self._stale_runs(ex_commands, statuses, since)
+            self._queue_runs(user, example, {ex_command.key_s3: runs[ex_command.key_s3] for ex_command in to_run})
+
+            new_runs = UserExampleCommand.objects.bulk_create([
+                UserExampleCommand(
+                    user=user,
+                    example_command=ex_command,
+                    status=(
+                        UserExampleCommand.StatusChoice.executed if ex_command.key_s3 in stored
+                        else statuses.get(ex_command.pk, UserExampleCommand.StatusChoice.executing)
+                    ),
+                )
+                for ex_command in ex_commands if ex_command.pk not in attached
+            ])
+            sweep = ExampleSweep.objects.create(user=user, example=example)
+            sweep.example_commands.set(ex_commands)
+            invalidate_model(ExampleCommand)
+            invalidate_model(UserExampleCommand)
+            enqueue(UserExampleCommand, [run.pk for run in new_runs])
+
+            sweep = self.get_queryset().get(pk=sweep.pk)
+            return Response(self.get_sweep_data(sweep), status=status.HTTP_202_ACCEPTED)
+
+    @staticmethod
+    def _stale_runs(ex_commands, statuses, since):
+        # an executing run the scheduler no longer holds that had run_timeout to report back has died
+        timeout = timezone.now() - timedelta(seconds=settings.GEANT_SCHEDULER['run_timeout'])
+        candidates = [
+            ex_command for ex_command in ex_commands
+            if statuses.get(ex_command.pk) == UserExampleCommand.StatusChoice.executing
+            and (ex_command.started_at or since[ex_command.pk]) < timeout
+        ]
+        if not candidates:
+            return []
+
+        try:
+            active = scheduler.active_runs()
+        except redis.RedisError as e:
+            loguru.logger.error(f'Could not look up stale runs in the scheduler: {e}')
+            return []
+        return [ex_command for ex_command in candidates if ex_command.key_s3 not in active]
+
+    @staticmethod
+    def _queue_runs(user, example, runs):
+        if not runs:
+            return
+
+        expected = expected_duration(example.pk)
+        jobs = [
+            (key_s3, ExampleCommandViewSet._get_run_data(example.title_not_verbose, params), expected)
+            for key_s3, params in runs.items()
+        ]
+        try:
+            scheduler.check_capacity(user.pk, len(jobs))
+        except scheduler.QueueFull as e:
+            raise Throttled(wait=e.retry_after, detail='Simulation queue is full, try again later')
+        except redis.RedisError as e:
+            loguru.logger.error(f'Scheduler is unavailable: {e}')
+        transaction.on_commit(lambda: submit_runs(user.pk, jobs))
+
+
 @extend_schema(
     tags=['ExampleCommand endpoint'], request=ExampleCommandUpdateStatusSerializer
 )
@@ -245,6 +476,10 @@ class ExampleCommandUpdateStatusAPIView(APIView):
         user_emails = list(example_command.users.values_list('email', flat=True))
         users_example_commands.update(status=new_status)
         invalidate_model(UserExampleCommand)
+        mark_run_finished(key_s3)
+        invalidate_run_stats(example_command.example_id)
+        publish_run_statuses(key_s3)
+        finish_run(key_s3)
         topic = 'Статус симуляции'
         message = (
             f'Статус симуляции примера "{title_verbose}" с ключом {key_s3} '
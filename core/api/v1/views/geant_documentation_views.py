@@ -1,14 +1,19 @@
+from uuid import UUID
+
+from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import IntegrityError
-from django.http import FileResponse
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
 from drf_spectacular.utils import extend_schema
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError as DRFValidationError
-from rest_framework.generics import ListCreateAPIView, ListAPIView
+from rest_framework.generics import ListCreateAPIView, ListAPIView, get_object_or_404
 from rest_framework.mixins import CreateModelMixin, UpdateModelMixin, DestroyModelMixin, ListModelMixin
 from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet, ViewSet, GenericViewSet
@@ -19,22 +24,27 @@ from api.v1.serializers.geant_documentation_serializers import (
     SubscriptionSerializer,
     ElementSerializer,
     ChapterSerializer,
-    CategorySerializer, RealFileSerializer, ArticleUserSerializer, ArticleIdSerializer
+    CategorySerializer, RealFileSerializer, ArticleUserSerializer, ArticleIdSerializer, ArticleDocumentSerializer
 )
+from api.v1.serializers.utils import get_custom_absolute_uri
 from core.permissions import IsStaffPermission
 from file_client.exceptions import FileClientException
-from file_client.files_clients import ReadOnlyClient
-from file_client.schema import file_schema
+from file_client.files_clients import ReadOnlyClient, DocumentationImageRenderClient, DocumentationGraphicClient
+from file_client.cache import LocalFileCache
+from file_client.schema import file_schema, batch_file_schema
 from file_client.tasks import (
     render_and_upload_documentation_image_task,
     render_and_update_documentation_graphic_task,
     render_and_upload_documentation_graphic_task,
-    render_and_update_documentation_image_task
+    render_and_update_documentation_image_task,
+    render_and_upload_documentation_files_task
 )
-from file_client.utils import handle_file_upload
+from file_client.utils import handle_file_upload, build_csv_summary, summary_name
+from geant_documentation.cache import get_article_detail, set_article_detail
 from geant_documentation.documents import ArticleDocument
-from geant_documentation.models import Article, Subscription, Chapter, Category, Element, ArticleUser
-from .mixins import ElasticMixin, ValidationHandlingMixin
+from geant_documentation.models import Article, Subscription, Chapter, Category, Element, ArticleUser, File
+from .mixins import ElasticMixin, ValidationHandlingMixin, ConditionalFileMixin, BatchFileMixin, \
+    ImageVariantMixin
 
 
 @extend_schema(
@@ -114,7 +124,7 @@ class CategoryViewSet(ModelViewSet):
 @extend_schema(
     tags=['Documentation Files']
 )
-class FileViewSet(ViewSet):
+class FileViewSet(ImageVariantMixin, ViewSet, ConditionalFileMixin):
     parser_classes = (MultiPartParser,)
 
     @classmethod
@@ -167,18 +177,49 @@ class FileViewSet(ViewSet):
 
     def destroy(self, request, *args, **kwargs):
         uuid = str(kwargs['uuid'])
-        ReadOnlyClient(name=uuid, file_format=kwargs['file_format']).delete()
+        match kwargs['file_format']:
+            case 'webp':
+                DocumentationImageRenderClient(name=uuid).delete()
+            case 'csv':
+                DocumentationGraphicClient(name=uuid).delete()
+            case _:
+                ReadOnlyClient(name=uuid, file_format=kwargs['file_format']).delete()
         return Response({"detail": "Image deleted"}, status=status.HTTP_200_OK)
 
     def retrieve(self, request, *args, **kwargs):
         uuid = str(kwargs['uuid'])
-        client = ReadOnlyClient(uuid, file_format=kwargs['file_format'])
+        if kwargs['file_format'] == 'csv' and 'summary' in request.query_params:
+            return self.retrieve_summary(request, uuid)
+
+        if kwargs['file_format'] == 'webp':
+            variants = self.get_image_variants(request, uuid)
+        else:
+            variants = [(uuid, kwargs['file_format'])]
+
+        for name, file_format in variants:
+            client = ReadOnlyClient(name, file_format=file_format)
+            try:
+                cached = client.download_cached()
+            except FileClientException as e:
+                error = e
+                continue
+            response = self.get_file_response(request, cached, client.filename)
+            patch_vary_headers(response, ('Accept',))
+            return response
+        return Response(error.error, status=status.HTTP_404_NOT_FOUND)
+
+    def retrieve_summary(self, request, uuid):
+        client = ReadOnlyClient(summary_name(uuid), file_format='json')
         try:
-            response = FileResponse(
-                client.download(), as_attachment=True, filename=uuid + f'.{client.format}')
-        except FileClientException as e:
-            return Response(e.error, status=status.HTTP_404_NOT_FOUND)
-        return response
+            cached = client.download_cached()
+        except FileClientException:
+            # graphics uploaded before summaries existed get theirs built once and kept in the local cache
+            try:
+                source = ReadOnlyClient(uuid, file_format='csv').download_cached()
+            except FileClientException as e:
+                return Response(e.error, status=status.HTTP_404_NOT_FOUND)
+            cached = LocalFileCache().put(client.filename, [build_csv_summary(source.path)])
+        return self.get_file_response(request, cached, client.filename)
 
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -188,6 +229,65 @@ class FileViewSet(ViewSet):
         return [permission() for permission in permission_classes]
 
 
+@extend_schema(
+    tags=['Documentation Files']
+)
+class FileBatchAPIView(BatchFileMixin, APIView):
+    parser_classes = (MultiPartParser,)
+
+    def get_permissions(self):
+        if self.request.method == 'GET':
+            permission_classes = [AllowAny]
+        else:
+            permission_classes = [IsAuthenticated, IsStaffPermission]
+        return [permission() for permission in permission_classes]
+
+    @staticmethod
+    def parse_name(name: str):
+        uuid, _, file_format = name.strip().rpartition('.')
+        try:
+            uuid = str(UUID(uuid))
+        except ValueError:
+            raise DRFValidationError({'detail': f'Invalid file name {name}, expected <uuid>.<format>'})
+        if file_format not in File.FormatChoice.values:
+            raise DRFValidationError({'detail': f'Unsupported file format {file_format}'})
+        return uuid, file_format
+
+    def check_batch_size(self, names):
+        if len(names) > settings.FILE_CLIENT_BATCH_MAX_FILES:
+            raise DRFValidationError({'detail': f'Max files in one batch is {settings.FILE_CLIENT_BATCH_MAX_FILES}'})
+
+    def get(self, request):
+        names = [name for name in request.query_params.get('files', '').split(',') if name.strip()]
+        if not names:
+            raise DRFValidationError({'detail': 'Query param "files" is required'})
+        self.check_batch_size(names)
+        files = [self.parse_name(name) for name in names]
+        return self.get_batch_response(files, 'files.zip')
+
+    @extend_schema(
+        request=batch_file_schema
+    )
+    def post(self, request):
+        names = list(request.FILES.keys())
+        if not names:
+            raise DRFValidationError({'detail': 'No files were sent'})
+        self.check_batch_size(names)
+
+        files = []
+        for name in names:
+            uuid, file_format = self.parse_name(name)
+            file = request.FILES[name]
+            file.name = f'{uuid}-{file.name}'
+            files.append((handle_file_upload(file), uuid, file_format))
+        render_and_upload_documentation_files_task.delay(files)
+
+        return Response(
+            {"detail": "Files processing started", "files": [f'{uuid}.{file_format}' for _, uuid, file_format in files]},
+            status=status.HTTP_202_ACCEPTED
+        )
+
+
 @extend_schema(
     tags=['Documentation Elements']
 )
@@ -222,7 +322,7 @@ class ElementViewSet(ValidationHandlingMixin, ModelViewSet):
 @extend_schema(
     tags=['Documentations Subscriptions']
 )
-class SubscriptionViewSet(ValidationHandlingMixin, ModelViewSet):
+class SubscriptionViewSet(ValidationHandlingMixin, BatchFileMixin, ModelViewSet):
     serializer_class = SubscriptionSerializer
 
     def get_queryset(self):
@@ -231,7 +331,7 @@ class SubscriptionViewSet(ValidationHandlingMixin, ModelViewSet):
         )
 
     def get_permissions(self):
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'files']:
             permission_classes = [AllowAny]
         else:
             permission_classes = [IsAuthenticated, IsStaffPermission]
@@ -249,6 +349,12 @@ class SubscriptionViewSet(ValidationHandlingMixin, ModelViewSet):
         }
         super().perform_update(serializer, **url_variables)
 
+    @action(detail=True, methods=['get'], url_path='files', url_name='files')
+    def files(self, request, *args, **kwargs):
+        subscription = self.get_object()
+        files = File.objects.filter(element__subscription=subscription).values_list('uuid', 'format')
+        return self.get_batch_response(files, f'subscription_{subscription.pk}.zip')
+
 
 @extend_schema(
     tags=['Documentations user chosen Articles']
@@ -290,16 +396,11 @@ class ArticleUserViewSet(
 @extend_schema(
     tags=['Documentations Articles']
 )
-class ArticleViewSet(ElasticMixin, ValidationHandlingMixin, ModelViewSet):
+class ArticleViewSet(ElasticMixin, ValidationHandlingMixin, BatchFileMixin, ModelViewSet):
     elastic_document = ArticleDocument
+    elastic_serializer_class = ArticleDocumentSerializer
 
     def get_queryset(self):
-        if self.action == 'list':
-            elastic_document_class = self.get_elastic_document_class()
-            self.setup_elastic_document_conf()
-            search = elastic_document_class.search()
-            result_search = self.elastic_full_query_handling(self.request, search)
-            return result_search.to_queryset()
         return Article.objects.select_related('category', 'chapter').prefetch_related(
             'subscriptions',
             'subscriptions__elements',
@@ -313,17 +414,37 @@ class ArticleViewSet(ElasticMixin, ValidationHandlingMixin, ModelViewSet):
         return ArticleSerializer
 
     def get_permissions(self):
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'files', 'suggest']:
             permission_classes = [AllowAny]
         else:
             permission_classes = [IsAuthenticated, IsStaffPermission]
         return [permission() for permission in permission_classes]
 
     def list(self, request, *args, **kwargs):
-        response = super().list(request, *args, **kwargs)
-        new_response_data = self.get_response_data_with_pages_count(response.data)
-        response.data = new_response_data
-        return response
+        return self.elastic_list(request)
+
+    def retrieve(self, request, *args, **kwargs):
+        if request.accepted_renderer.format != 'json':
+            return super().retrieve(request, *args, **kwargs)
+
+        # file urls in the payload are absolute, so the payload depends on the origin it was requested from
+        origin = get_custom_absolute_uri(request, '')
+        payload = get_article_detail(kwargs['pk'], origin)
+        if payload is None:
+            response = super().retrieve(request, *args, **kwargs)
+            payload = JSONRenderer().render(response.data)
+            set_article_detail(kwargs['pk'], origin, payload)
+        return HttpResponse(payload, content_type='application/json')
+
+    @action(detail=False, methods=['get'], url_path='suggest', url_name='suggest')
+    def suggest(self, request, *args, **kwargs):
+        return self.elastic_suggest(request)
+
+    @action(detail=True, methods=['get'], url_path='files', url_name='files')
+    def files(self, request, *args, **kwargs):
+        article = get_object_or_404(Article, pk=kwargs['pk'])
+        files = File.objects.filter(element__subscription__article=article).values_list('uuid', 'format')
+        return self.get_batch_response(files, f'article_{article.pk}.zip')
 
 
 class AllArticleIdAPIView(ListAPIView):
@@ -0,0 +1,17 @@
+from drf_spectacular.utils import extend_schema
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.permissions import IsStaffPermission
+from utils.http import pool_stats
+
+
+@extend_schema(
+    tags=['Metrics']
+)
+class HttpPoolStatsAPIView(APIView):
+    permission_classes = (IsAuthenticated, IsStaffPermission)
+
+    def get(self, request):
+        return Response(pool_stats())
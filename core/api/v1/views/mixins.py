@@ -1,21 +1,42 @@
+import base64
+import binascii
+import hashlib
+import json
+import mimetypes
+import re
+
 import loguru
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db import IntegrityError
+from django.db.models import Case, When, IntegerField
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe, quote_etag
 from django_elasticsearch_dsl import Document
 
+from elasticsearch import ApiError, TransportError
 from elasticsearch_dsl import Q
 
 from rest_framework.exceptions import ValidationError as DRFValidationError
 from rest_framework.request import Request
+from rest_framework.response import Response
 
 from api.v1.serializers.utils import resolve_dot_notation
+from file_client.base_file_client import BaseRendererUploader
+from file_client.cache import CachedFile
+from file_client.files_clients import ReadOnlyClient
+from file_client.utils import iter_zip, image_formats, variant_name
 from users.auth.utils import response_cookies
+from utils.search_index import get_index_version
 from math import ceil
 
 
 class ElasticMixin:
     elastic_document_conf = None
+    elastic_serializer_class = None
+    elastic_response = None
     total_count = None
 
     def get_elastic_document_class(self) -> Document:
@@ -77,42 +98,258 @@ class ElasticMixin:
                 "multi_match", query=target, fields=fields,
                 fuzziness="auto"
             )
+            nested = self.elastic_document_conf.get('nested_search')
+            if nested:
+                q |= Q(
+                    "nested", path=nested['path'],
+                    query=Q("multi_match", query=target, fields=nested['fields'], fuzziness="auto"),
+                    inner_hits={
+                        'size': 1,
+                        '_source': nested['source'],
+                        'highlight': {'fields': {field: {} for field in nested['highlight']}},
+                    }
+                )
             search = search.query(q)
 
         return search
 
-    def elastic_order(self, request, search):
+    def get_elastic_sort_fields(self, request) -> list[dict]:
         ordering_param = self.elastic_document_conf['params'].get('order')
         ordering_value = request.query_params.get(ordering_param)
 
+        sort_fields = []
         if ordering_value:
-            sort_fields = []
             for field in ordering_value.split(','):
                 field = field.strip()
                 if field.startswith('-'):
                     sort_fields.append({field[1:]: {"order": "desc"}})
                 else:
                     sort_fields.append({field: {"order": "asc"}})
+        return sort_fields
+
+    def elastic_order(self, request, search):
+        sort_fields = self.get_elastic_sort_fields(request)
+        if sort_fields:
             search = search.sort(*sort_fields)
 
         return search
 
+    def get_cursor_value(self, request) -> str | None:
+        cursor_param = self.elastic_document_conf['params'].get('cursor')
+        return request.query_params.get(cursor_param) if cursor_param else None
+
     def elastic_pagination(self, request, search):
+        page_size = self.elastic_document_conf['pagination_page_size']
+        if self.get_cursor_value(request):
+            # the page is addressed by search_after in elastic_cursor
+            return search.extra(size=page_size)
+
         page_param_name = self.elastic_document_conf['params']['pagination']
         page = int(request.query_params.get(page_param_name, 1))
-        page_size = self.elastic_document_conf['pagination_page_size']
         start = (page - 1) * page_size
         search = search.extra(from_=start, size=page_size)
         return search
 
+    def get_cursor_sort_fields(self, request) -> list:
+        # score and user ordering alone are not unique, the tiebreak keeps search_after pages from skipping hits
+        sort_fields = self.get_elastic_sort_fields(request)
+        if not sort_fields and request.query_params.get(self.elastic_document_conf['params']['search']):
+            sort_fields = ['_score']
+        tiebreak = self.elastic_document_conf.get('cursor_tiebreak', 'id')
+        sort_fields.append({tiebreak: {"order": "asc"}})
+        return sort_fields
+
+    def elastic_cursor(self, request, search):
+        sort_fields = self.get_cursor_sort_fields(request)
+        search = search.sort(*sort_fields)
+
+        cursor = self.get_cursor_value(request)
+        if cursor:
+            search = search.extra(search_after=self.decode_cursor(cursor, sort_fields))
+        return search
+
+    @staticmethod
+    def cursor_signature(sort_fields: list) -> list[str]:
+        return [field if isinstance(field, str) else json.dumps(field, sort_keys=True) for field in sort_fields]
+
+    def encode_cursor(self, sort_values: list, sort_fields: list) -> str:
+        payload = json.dumps({'after': sort_values, 'sort': self.cursor_signature(sort_fields)})
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, cursor: str, sort_fields: list) -> list:
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            sort_values = payload['after']
+            signature = payload['sort']
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise DRFValidationError({'detail': 'Invalid cursor'})
+
+        if signature != self.cursor_signature(sort_fields) or len(sort_values) != len(sort_fields):
+            raise DRFValidationError({'detail': 'Cursor does not match the requested ordering'})
+        return sort_values
+
+    def get_next_cursor(self, request, page: dict) -> str | None:
+        if len(page['hits']) < self.elastic_document_conf['pagination_page_size'] or not page['after']:
+            return None
+        return self.encode_cursor(page['after'], self.get_cursor_sort_fields(request))
+
     def elastic_full_query_handling(self, request, search):
         for action in self.elastic_document_conf['params']:
             search = getattr(self, f'elastic_{action}', search)(
                 request, search)
 
-        self.total_count = search.count()
+        if not self.elastic_serializer_class:
+            search = search.source(excludes=['*'])
+        else:
+            search = search.source(excludes=['*_suggest', *self.elastic_document_conf.get('source_excludes', [])])
+        search = search.extra(track_total_hits=True)
+        facet_size = self.elastic_document_conf.get('facet_size', 50)
+        for field in self.elastic_document_conf.get('facets', []):
+            search.aggs.bucket(field, 'terms', field=field, size=facet_size)
+
+        # hits, total and facets come from a single request, the response stays cached on search for to_queryset
+        self.elastic_response = search.execute()
+        self.total_count = self.elastic_response.hits.total.value
         return search
 
+    def get_elastic_facets(self) -> dict:
+        aggregations = self.elastic_response.aggregations
+        return {
+            field: [
+                {'value': bucket.key, 'count': bucket.doc_count}
+                for bucket in getattr(aggregations, field).buckets
+                if bucket.key != ''
+            ]
+            for field in self.elastic_document_conf.get('facets', [])
+        }
+
+    def get_nested_match(self, hit) -> dict | None:
+        nested = self.elastic_document_conf.get('nested_search')
+        inner_hits = getattr(hit.meta, 'inner_hits', None) if nested else None
+        if not inner_hits or nested['path'] not in inner_hits:
+            return None
+
+        matches = inner_hits[nested['path']].hits
+        if not len(matches):
+            return None
+        match = matches[0]
+        highlight = match.meta.to_dict().get('highlight', {})
+        return {
+            'subscription': match.to_dict(),
+            'highlight': [fragment for field in nested['highlight'] for fragment in highlight.get(field, [])],
+        }
+
+    def get_elastic_source(self) -> list[dict]:
+        source = []
+        for hit in self.elastic_response.hits:
+            data = {**hit.to_dict(), 'id': int(hit.meta.id)}
+            match = self.get_nested_match(hit)
+            if match:
+                data['match'] = match
+            source.append(data)
+        return source
+
+    def get_elastic_cache_key(self, request) -> str:
+        document_name = self.get_elastic_document_class().__name__
+        params = self.elastic_document_conf['params']
+        query = {}
+        for name in params['filter']:
+            value = request.query_params.get(name)
+            if value:
+                query[name] = sorted(value.split(','))
+        for action, name in params.items():
+            if action != 'filter' and request.query_params.get(name):
+                query[name] = request.query_params.get(name)
+        # required filters such as the current user are part of the result, not only the query string
+        resolved_required_filters, _ = self.add_required_filters(set(), request)
+        normalized = json.dumps([query, resolved_required_filters], sort_keys=True, default=str)
+        digest = hashlib.sha256(normalized.encode()).hexdigest()
+        return f'search:{document_name}:{get_index_version(document_name)}:{digest}'
+
+    def get_elastic_page(self, request) -> dict:
+        cache_timeout = self.elastic_document_conf.get('cache_timeout')
+        if cache_timeout:
+            cache_key = self.get_elastic_cache_key(request)
+            page = cache.get(cache_key)
+            if page is not None:
+                self.total_count = page['total']
+                return page
+
+        document_class = self.get_elastic_document_class()
+        self.elastic_full_query_handling(request, document_class.search())
+        hits = self.elastic_response.hits
+        if self.elastic_serializer_class:
+            page_hits = self.get_elastic_source()
+        else:
+            page_hits = [{'id': int(hit.meta.id)} for hit in hits]
+        page = {
+            'total': self.total_count,
+            'hits': page_hits,
+            'after': list(getattr(hits[-1].meta, 'sort', [])) if len(hits) else None,
+            'facets': self.get_elastic_facets(),
+        }
+
+        if cache_timeout:
+            cache.set(cache_key, page, cache_timeout)
+        return page
+
+    def elastic_list(self, request, queryset=None):
+        self.setup_elastic_document_conf()
+        page = self.get_elastic_page(request)
+
+        if self.elastic_serializer_class:
+            serializer = self.elastic_serializer_class(
+                page['hits'], many=True, context=self.get_serializer_context())
+        else:
+            if queryset is None:
+                queryset = self.get_elastic_document_class().django.model._default_manager.all()
+            pks = [hit['id'] for hit in page['hits']]
+            preserved_order = Case(*[When(pk=pk, then=pos) for pos, pk in enumerate(pks)], output_field=IntegerField())
+            queryset = queryset.filter(pk__in=pks).order_by(preserved_order)
+            serializer = self.get_serializer(queryset, many=True)
+
+        response_data = self.get_response_data_with_pages_count(list(serializer.data))
+        if 'cursor' in self.elastic_document_conf['params']:
+            response_data[-1]['next_cursor'] = self.get_next_cursor(request, page)
+        if 'facets' in self.elastic_document_conf:
+            response_data[-1]['facets'] = page['facets']
+        return Response(response_data)
+
+    def elastic_suggest(self, request):
+        self.setup_elastic_document_conf()
+        conf = self.elastic_document_conf['suggest']
+        prefix = request.query_params.get(self.elastic_document_conf['params']['search'], '').strip()[:100]
+        if not prefix:
+            return Response([])
+
+        document_class = self.get_elastic_document_class()
+        document_name = document_class.__name__
+        digest = hashlib.sha256(prefix.lower().encode()).hexdigest()
+        cache_key = f'suggest:{document_name}:{get_index_version(document_name)}:{digest}'
+        suggestions = cache.get(cache_key)
+        if suggestions is not None:
+            return Response(suggestions)
+
+        search = document_class.search().source(conf['source']).extra(size=0, timeout=conf['timeout'])
+        search = search.suggest('titles', prefix, completion={
+            'field': conf['field'],
+            'size': conf['size'],
+            'skip_duplicates': True,
+        })
+        try:
+            response = search.execute()
+        except (ApiError, TransportError) as e:
+            # typeahead degrades to no suggestions, the full search is still there
+            loguru.logger.warning(f'Suggest on {document_name} failed: {e}')
+            return Response([])
+
+        suggestions = [
+            {'id': int(option._id), **option._source.to_dict()}
+            for option in response.suggest.titles[0].options
+        ]
+        cache.set(cache_key, suggestions, self.elastic_document_conf.get('cache_timeout', 30))
+        return Response(suggestions)
+
     def get_response_data_with_pages_count(self, response_data: list):
         page_size = self.elastic_document_conf['pagination_page_size']
         pages_count = ceil(self.total_count / page_size)
@@ -191,3 +428,140 @@ class QueryParamsMixin:
                 order_by = '-' + order_by
             queryset = queryset.order_by(order_by)
         return queryset
+
+
+class ConditionalFileMixin:
+    range_re = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+    def get_file_response(self, request, cached: CachedFile, filename: str):
+        etag = quote_etag(cached.etag)
+        last_modified = int(cached.modified)
+        headers = {
+            'ETag': etag,
+            'Last-Modified': http_date(last_modified),
+            'Accept-Ranges': 'bytes',
+        }
+
+        if request.method in ('GET', 'HEAD'):
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is not None:
+                return self.set_headers(response, headers)
+
+        byte_range = self.get_byte_range(request, cached, etag)
+        if byte_range is None:
+            response = FileResponse(open(cached.path, 'rb'), as_attachment=True, filename=filename)
+            return self.set_headers(response, headers)
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            headers['Content-Range'] = f'bytes */{cached.size}'
+            return self.set_headers(response, headers)
+
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            self.iter_file_range(cached.path, start, end - start + 1),
+            status=206,
+            content_type=mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        )
+        headers.update({
+            'Content-Range': f'bytes {start}-{end}/{cached.size}',
+            'Content-Length': end - start + 1,
+            'Content-Disposition': content_disposition_header(True, filename),
+        })
+        return self.set_headers(response, headers)
+
+    def get_byte_range(self, request, cached: CachedFile, etag: str):
+        """None - send the whole file, False - range is not satisfiable, (start, end) - inclusive bounds"""
+        header = request.headers.get('Range')
+        if not header or cached.size == 0:
+            return None
+
+        if_range = request.headers.get('If-Range')
+        if if_range:
+            if if_range.startswith(('"', 'W/')):
+                if if_range != etag:
+                    return None
+            elif parse_http_date_safe(if_range) != int(cached.modified):
+                return None
+
+        match = self.range_re.match(header.replace(' ', ''))
+        if not match or match.groups() == ('', ''):
+            return None
+
+        first, last = match.groups()
+        if not first:
+            start, end = max(cached.size - int(last), 0), cached.size - 1
+        else:
+            start = int(first)
+            end = min(int(last), cached.size - 1) if last else cached.size - 1
+            if last and int(last) < start:
+                return None
+
+        if start >= cached.size:
+            return False
+        return start, end
+
+    @staticmethod
+    def iter_file_range(path, start, length):
+        chunk_size = settings.FILE_CLIENT_CHUNK_SIZE
+        with open(path, 'rb') as file:
+            file.seek(start)
+            while length > 0:
+                chunk = file.read(min(chunk_size, length))
+                if not chunk:
+                    break
+                length -= len(chunk)
+                yield chunk
+
+    @staticmethod
+    def set_headers(response, headers):
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+
+class BatchFileMixin:
+    def get_batch_response(self, files, filename: str):
+        """files - iterable of (uuid, file_format) pairs, answered with one zip of everything found in storage"""
+        clients = [ReadOnlyClient(str(uuid), file_format=file_format) for uuid, file_format in dict.fromkeys(files)]
+        results = BaseRendererUploader.download_cached_many(clients)
+
+        found = [(name, result) for name, result in results.items() if isinstance(result, CachedFile)]
+        missing = [name for name, result in results.items() if not isinstance(result, CachedFile)]
+        for name in missing:
+            loguru.logger.warning(f"Batch download of {filename} skipped {name}: {results[name]}")
+
+        response = StreamingHttpResponse(iter_zip(found), content_type='application/zip')
+        response['Content-Disposition'] = content_disposition_header(True, filename)
+        response['X-Missing-Files'] = ','.join(missing)
+        return response
+
+
+class ImageVariantMixin:
+    def perform_content_negotiation(self, request, force=False):
+        # Accept here picks the image format, image only Accept headers must not end up in 406
+        return super().perform_content_negotiation(request, force=True)
+
+    def get_image_size(self, request) -> str:
+        size = request.query_params.get('size', 'full')
+        if size not in settings.IMAGE_VARIANTS:
+            raise DRFValidationError({'detail': f'Unknown size {size}, choose from {", ".join(settings.IMAGE_VARIANTS)}'})
+        return size
+
+    @staticmethod
+    def get_image_format(request) -> str:
+        accept = request.headers.get('Accept', '')
+        formats = image_formats()
+        if 'avif' in formats and 'image/avif' in accept:
+            return 'avif'
+        if 'image/webp' not in accept and 'jpeg' in formats and 'image/' in accept:
+            return 'jpeg'
+        return 'webp'
+
+    def get_image_variants(self, request, name: str) -> list[tuple[str, str]]:
+        """(storage name, format) to try in order, images rendered before variants existed only have the full webp"""
+        size, file_format = self.get_image_size(request), self.get_image_format(request)
+        variants = [(variant_name(name, size, file_format), file_format)]
+        if (size, file_format) != ('full', 'webp'):
+            variants.append((name, 'webp'))
+        return variants
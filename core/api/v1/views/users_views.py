@@ -1,6 +1,8 @@
 from django.conf import settings
 from django.db.utils import IntegrityError
-from django.http import FileResponse
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import content_disposition_header
 from drf_spectacular.utils import extend_schema
 from rest_framework import status
 from rest_framework.decorators import action
@@ -24,7 +26,7 @@ from file_client.exceptions import FileClientException
 from file_client.files_clients import ProfileImageRendererClient
 from file_client.schema import image_schema
 from file_client.tasks import render_and_upload_profile_image_task, render_and_update_profile_image_task
-from file_client.utils import handle_file_upload
+from file_client.utils import handle_file_upload, IMAGE_MIME_TYPES
 from geant_examples.models import UserExampleCommand
 from users.auth.utils import (
     response_cookies,
@@ -34,7 +36,7 @@ from users.auth.utils import (
 )
 from users.documents import UserExampleCommandDocument
 from users.models import User
-from .mixins import ElasticMixin, CookiesMixin
+from .mixins import ElasticMixin, CookiesMixin, ImageVariantMixin
 
 
 @extend_schema(
@@ -96,7 +98,7 @@ class ConfirmEmailUpdateAPIView(APIView):
 @extend_schema(
     tags=['UserProfile']
 )
-class UserProfileImageViewSet(ViewSet):
+class UserProfileImageViewSet(ImageVariantMixin, ViewSet):
     permission_classes = (IsAuthenticated,)
     parser_classes = (MultiPartParser,)
 
@@ -145,13 +147,18 @@ class UserProfileImageViewSet(ViewSet):
 
     def retrieve(self, request):
         user = self.get_user()
-        client = ProfileImageRendererClient(name=str(user.uuid))
-        try:
-            response = FileResponse(client.download(), as_attachment=True, filename=str(
-                user.uuid) + f'.{client.format}')
-        except FileClientException as e:
-            return Response(e.error, status=status.HTTP_404_NOT_FOUND)
-        return response
+        for name, file_format in self.get_image_variants(request, str(user.uuid)):
+            client = ProfileImageRendererClient(name=name, file_format=file_format)
+            try:
+                chunks = client.download_chunks()
+            except FileClientException as e:
+                error = e
+                continue
+            response = StreamingHttpResponse(chunks, content_type=IMAGE_MIME_TYPES[client.format])
+            response['Content-Disposition'] = content_disposition_header(True, client.filename)
+            patch_vary_headers(response, ('Accept',))
+            return response
+        return Response(error.error, status=status.HTTP_404_NOT_FOUND)
 
 
 @extend_schema(
@@ -196,25 +203,15 @@ class UserExampleView(ReadOnlyModelViewSet, ElasticMixin):
     elastic_document = UserExampleCommandDocument
 
     def get_queryset(self):
-        base_query = super().get_queryset().filter(
+        return super().get_queryset().filter(
             user=self.request.user
         ).prefetch_related(
             'example_command__example',
             'example_command__example__tags'
         )
-        if self.action == 'list':
-            document_class = self.get_elastic_document_class()
-            search = document_class.search()
-            self.setup_elastic_document_conf()
-            search = self.elastic_full_query_handling(self.request, search)
-            return search.to_queryset(UserExampleCommand.objects)
-        return base_query
 
     def list(self, request, *args, **kwargs):
-        response = super().list(request, *args, **kwargs)
-        new_response_data = self.get_response_data_with_pages_count(response.data)
-        response.data = new_response_data
-        return response
+        return self.elastic_list(request, self.get_queryset())
 
 
 @extend_schema(
@@ -12,9 +12,23 @@ app.config_from_object('django.conf:settings')
 app.conf.broker_url = settings.CELERY_BROKER_URL
 app.autodiscover_tasks()
 
+app.conf.task_routes = {
+    'geant_examples.tasks.run_example_task': {'queue': 'geant_backend'},
+}
+
 app.conf.beat_schedule = {
     'backup_database': {
         'task': 'utils.tasks.database_backup',
         'schedule': crontab(minute='0', hour=0),
     },
+    'flush_search_index': {
+        'task': 'utils.tasks.flush_search_index',
+        'schedule': settings.ELASTICSEARCH_INDEX_QUEUE['flush_interval'],
+        'options': {'expires': settings.ELASTICSEARCH_INDEX_QUEUE['flush_interval']},
+    },
+    'dispatch_runs': {
+        'task': 'geant_examples.tasks.dispatch_runs',
+        'schedule': settings.GEANT_SCHEDULER['dispatch_interval'],
+        'options': {'expires': settings.GEANT_SCHEDULER['dispatch_interval']},
+    },
 }
\ No newline at end of file
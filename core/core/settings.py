@@ -56,6 +56,7 @@ INSTALLED_APPS = [
     'drf_spectacular',
     'django_elasticsearch_dsl',
     'dbbackup',
+    'channels',
 
     'api.apps.ApiConfig',
     'users.apps.UsersConfig',
@@ -99,6 +100,15 @@ TEMPLATES = [
 WSGI_APPLICATION = 'core.wsgi.application'
 ASGI_APPLICATION = 'core.asgi.application'
 
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels_redis.core.RedisChannelLayer',
+        'CONFIG': {
+            'hosts': [f'redis://:{REDIS_PASSWORD}@redis:6379/2'],
+        },
+    },
+}
+
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 DATABASES = {
@@ -193,6 +203,8 @@ CACHES = {
     }
 }
 CACHE_LIVE_TIME = 60 * 60
+ARTICLE_DETAIL_CACHE_TIMEOUT = CACHE_LIVE_TIME
+MAX_FILES_PER_ELEMENT = 8
 CACHEOPS_REDIS = CACHES['default']['LOCATION']
 CACHEOPS = {
     'users.user': {
@@ -262,12 +274,67 @@ INTERNAL_IPS += [".".join(ip.split(".")[:-1] + ["1"]) for ip in ips]
 
 STORAGE_URL = os.getenv('STORAGE_URL')
 PATH_TO_LOCAL_STORAGE = os.getenv('PATH_TO_LOCAL_STORAGE')
+LOCAL_FILE_CACHE_MAX_SIZE = int(os.getenv('LOCAL_FILE_CACHE_MAX_SIZE', 2 * 1024 ** 3))
+FILE_CLIENT_CHUNK_SIZE = 64 * 1024
+FILE_CLIENT_BATCH_WORKERS = int(os.getenv('FILE_CLIENT_BATCH_WORKERS', 8))
+FILE_CLIENT_BATCH_MAX_FILES = 64
+IMAGE_VARIANTS = {
+    'thumbnail': 128,
+    'medium': 640,
+    'full': None,
+}
+IMAGE_FALLBACK_FORMATS = [fmt for fmt in os.getenv('IMAGE_FALLBACK_FORMATS', 'avif,jpeg').split(',') if fmt]
+IMAGE_RENDER_WORKERS = int(os.getenv('IMAGE_RENDER_WORKERS', os.cpu_count() or 1))
+GRAPHIC_SUMMARY_POINTS = int(os.getenv('GRAPHIC_SUMMARY_POINTS', 1000))
 WEB_BACKEND_URL = os.getenv('WEB_BACKEND_URL')
 GEANT_BACKEND_URL = os.getenv('BACKEND_URL')
 GEANT_BACKEND_RUN_EXAMPLE_URL = GEANT_BACKEND_URL + '/examples/run'
 GEANT_BACKEND_GET_EXAMPLE_URL = GEANT_BACKEND_URL + "/examples/by/{title}"
 GEANT_BACKEND_CREATE_EXAMPLE_URL = GEANT_BACKEND_URL + "/examples"
 GEANT_BACKEND_DELETE_EXAMPLE_URL = GEANT_BACKEND_URL + "/examples/{id}"
+GEANT_BACKEND_TIMEOUT = (
+    float(os.getenv('GEANT_BACKEND_CONNECT_TIMEOUT', 3)),
+    float(os.getenv('GEANT_BACKEND_READ_TIMEOUT', 30)),
+)
+GEANT_BACKEND_MAX_RETRIES = int(os.getenv('GEANT_BACKEND_MAX_RETRIES', 3))
+GEANT_SCHEDULER = {
+    'redis_url': CACHES['default']['LOCATION'],
+    'key': 'geant_scheduler',
+    # simulations the backend runs at once, the rest wait in the queue
+    'concurrency': int(os.getenv('GEANT_BACKEND_CONCURRENCY', 4)),
+    'max_user_running': int(os.getenv('GEANT_SCHEDULER_MAX_USER_RUNNING', 1)),
+    'max_queue': int(os.getenv('GEANT_SCHEDULER_MAX_QUEUE', 200)),
+    'max_user_queue': int(os.getenv('GEANT_SCHEDULER_MAX_USER_QUEUE', 50)),
+    # average seconds a simulation takes, Retry-After is estimated from it
+    'run_time': int(os.getenv('GEANT_SCHEDULER_RUN_TIME', 60)),
+    'run_timeout': int(os.getenv('GEANT_SCHEDULER_RUN_TIMEOUT', 60 * 60)),
+    'dispatch_interval': float(os.getenv('GEANT_SCHEDULER_DISPATCH_INTERVAL', 10)),
+}
+# a sweep is queued all at once, so it can not be larger than a user's share of the queue
+EXAMPLE_SWEEP_MAX_POINTS = GEANT_SCHEDULER['max_user_queue']
+RUN_STATS = {
+    # durations of this many latest successful runs of an example make up its statistics
+    'window': int(os.getenv('RUN_STATS_WINDOW', 100)),
+    'percentiles': (50, 90, 99),
+    'timeout': CACHE_LIVE_TIME,
+}
+STORAGE_TIMEOUT = (
+    float(os.getenv('STORAGE_CONNECT_TIMEOUT', 3)),
+    float(os.getenv('STORAGE_READ_TIMEOUT', 60)),
+)
+HTTP_CLIENTS = {
+    'storage': {
+        'pool_size': int(os.getenv('STORAGE_POOL_SIZE', 10)),
+        'timeout': STORAGE_TIMEOUT,
+        'retries': int(os.getenv('STORAGE_MAX_RETRIES', 3)),
+        'retry_methods': ['GET', 'POST', 'DELETE'],
+    },
+    'geant_backend': {
+        'pool_size': int(os.getenv('GEANT_BACKEND_POOL_SIZE', 10)),
+        'timeout': GEANT_BACKEND_TIMEOUT,
+        'retries': GEANT_BACKEND_MAX_RETRIES,
+    },
+}
 
 FRONTEND_URL = os.getenv('FRONTEND_URL')
 
@@ -283,6 +350,18 @@ USE_X_FORWARDED_HOST = True
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 
 ELASTICSEARCH_DSL_AUTOSYNC = True
+ELASTICSEARCH_DSL_SIGNAL_PROCESSOR = 'utils.search_index.QueuedSignalProcessor'
+ELASTICSEARCH_INDEX_QUEUE = {
+    'redis_url': CACHES['default']['LOCATION'],
+    'key': 'search_index:queue',
+    'batch_size': int(os.getenv('ELASTICSEARCH_INDEX_BATCH_SIZE', 500)),
+    'flush_interval': float(os.getenv('ELASTICSEARCH_INDEX_FLUSH_INTERVAL', 2)),
+}
+ELASTICSEARCH_REBUILD = {
+    'workers': int(os.getenv('ELASTICSEARCH_REBUILD_WORKERS', 4)),
+    'chunk_size': int(os.getenv('ELASTICSEARCH_REBUILD_CHUNK_SIZE', 500)),
+    'replay_timeout': 6 * 60 * 60,
+}
 ELASTICSEARCH_ANALYZER_SETTINGS = {
     "filter": {
         "russian_stop": {
@@ -342,7 +421,8 @@ ELASTIC_PARAMS_CONF = {
                 ],
                 'order': 'ordering',
                 'search': 'query',
-                'pagination': 'page'
+                'pagination': 'page',
+                'cursor': 'cursor'
             },
             'required_filter': {'synchronized': 'true'},
             'fields': [
@@ -354,7 +434,16 @@ ELASTIC_PARAMS_CONF = {
                 "title_verbose",
                 "title_verbose.keyword"
             ],
-            'pagination_page_size': 10
+            'pagination_page_size': 10,
+            'facets': ['tags', 'category'],
+            'cursor_tiebreak': 'id',
+            'cache_timeout': 30,
+            'suggest': {
+                'field': 'title_suggest',
+                'source': ['title_verbose'],
+                'size': 8,
+                'timeout': '150ms'
+            }
         },
         'ArticleDocument': {
             'params': {
@@ -364,7 +453,8 @@ ELASTIC_PARAMS_CONF = {
                     'chosen',
                 ],
                 'search': 'query',
-                'pagination': 'page'
+                'pagination': 'page',
+                'cursor': 'cursor'
             },
             'fields': [
                 "description.english",
@@ -374,7 +464,30 @@ ELASTIC_PARAMS_CONF = {
                 "title.russian",
                 "title"
             ],
-            'pagination_page_size': 10
+            'pagination_page_size': 10,
+            'facets': ['category', 'chapter'],
+            'nested_search': {
+                'path': 'subscriptions',
+                'fields': [
+                    "subscriptions.title",
+                    "subscriptions.title.english",
+                    "subscriptions.title.russian",
+                    "subscriptions.text",
+                    "subscriptions.text.english",
+                    "subscriptions.text.russian"
+                ],
+                'source': ['subscriptions.id', 'subscriptions.title', 'subscriptions.order'],
+                'highlight': ['subscriptions.text', 'subscriptions.title']
+            },
+            'source_excludes': ['subscriptions'],
+            'cursor_tiebreak': 'id',
+            'cache_timeout': 30,
+            'suggest': {
+                'field': 'title_suggest',
+                'source': ['title'],
+                'size': 8,
+                'timeout': '150ms'
+            }
         },
         'UserExampleCommandDocument': {
             'params': {
@@ -384,7 +497,8 @@ ELASTIC_PARAMS_CONF = {
                 ],
                 'search': 'query',
                 'order': 'ordering',
-                'pagination': 'page'
+                'pagination': 'page',
+                'cursor': 'cursor'
             },
             'required_filter': {'user': 'request.user.id'},
             'fields': [
@@ -396,7 +510,9 @@ ELASTIC_PARAMS_CONF = {
                 "title_verbose",
                 "title_verbose.keyword"
             ],
-            'pagination_page_size': 10
+            'pagination_page_size': 10,
+            'facets': ['tags', 'category'],
+            'cursor_tiebreak': 'id'
         }
     }
 }
@@ -407,3 +523,8 @@ CSRF_TRUSTED_ORIGINS = [
     'https://geant4-dev-frontend.tsu.ru:444',
     'https://92.63.76.159'
 ]
+
+# origins the article detail payload is cached for, requests from any other origin are rendered every time
+ARTICLE_DETAIL_CACHE_ORIGINS = CSRF_TRUSTED_ORIGINS + [
+    f'{proto}://{host}' for host in ALLOWED_HOSTS for proto in ('http', 'https')
+]
@@ -1,4 +1,3 @@
-import requests
 import os
 
 from tempfile import TemporaryDirectory
@@ -6,6 +5,8 @@ from django.conf import settings
 from django.core.files.base import File
 from django.core.files.storage import Storage
 
+from utils.http import get_session
+
 class BackupStorage(Storage):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -13,14 +14,14 @@ class BackupStorage(Storage):
         self.init_backup()
 
     def init_backup(self):
-        response = requests.post(
+        response = get_session('storage').post(
             url=settings.STORAGE_URL + "/upload/",
             files={"file": (self.filename, b"")}
         )
         response.raise_for_status()
 
     def _open(self, name, mode="rb"):
-        response = requests.post(
+        response = get_session('storage').post(
             url=settings.STORAGE_URL + "/retrieve/",
             json={
                 "filename": self.filename
@@ -38,7 +39,7 @@ class BackupStorage(Storage):
             )
 
     def _save(self, name, content):
-        response = requests.post(
+        response = get_session('storage').post(
             url=settings.STORAGE_URL + "/update/",
             files={"file": (self.filename, content.open(mode="rb"))}
         )
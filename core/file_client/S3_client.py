@@ -6,10 +6,10 @@ from contextlib import contextmanager
 from dataclasses import dataclass
 from io import BytesIO
 
-import requests
-
 from django.conf import settings
 
+from utils.http import get_session
+
 
 @dataclass
 class Endpoint:
@@ -24,6 +24,7 @@ class S3FileLoader:
         self.path = path
         self.format = "zip"
         self.filename = self.extract_name()
+        self.session = get_session('storage')
 
     def extract_name(self):
         head, tail = ntpath.split(self.path)
@@ -31,17 +32,23 @@ class S3FileLoader:
             return tail
         return ntpath.basename(head) + ".%s" % self.format
 
-    def sender(self, url, stream=False, temporary=False, data=None, json=None, file=False):
+    def sender(self, url, stream=False, temporary=False, chunked=False, data=None, json=None, file=False):
         if stream:
-            response = requests.post(url=url, data=data, json=json)
-            path = os.path.join(settings.PATH_TO_LOCAL_STORAGE, self.filename)
-            if response.ok:
+            with self.session.post(url=url, data=data, json=json, stream=True) as response:
+                if not response.ok:
+                    return response.json()
+                path = os.path.join(settings.PATH_TO_LOCAL_STORAGE, self.filename)
                 with open(path, "wb") as file:
-                    file.write(response.content)
-            else:
+                    for chunk in response.iter_content(chunk_size=settings.FILE_CLIENT_CHUNK_SIZE):
+                        file.write(chunk)
+        elif chunked:
+            response = self.session.post(url=url, data=data, json=json, stream=True)
+            if response.ok:
+                return self.iter_response(response)
+            with response:
                 return response.json()
         elif temporary:
-            response = requests.post(url=url, data=data, json=json)
+            response = self.session.post(url=url, data=data, json=json)
             if response.ok:
                 return BytesIO(response.content)
             else:
@@ -49,12 +56,17 @@ class S3FileLoader:
         elif file:
             with self.file_after_process() as _file:
                 files = {'file': _file}
-                response = requests.post(url=url, json=json, files=files)
+                response = self.session.post(url=url, json=json, files=files)
                 return response.json()
         else:
-            response = requests.post(url=url, json=json, data=data)
+            response = self.session.post(url=url, json=json, data=data)
             return response.json()
 
+    @staticmethod
+    def iter_response(response):
+        with response:
+            yield from response.iter_content(chunk_size=settings.FILE_CLIENT_CHUNK_SIZE)
+
     @contextmanager
     def file_after_process(self):
         self.format = "zip"
@@ -84,5 +96,13 @@ class S3FileLoader:
     def download_temporary(self, filename):
         return self.sender(url=Endpoint.retrieve, temporary=True, json={'filename': filename})
 
+    def download_chunks(self, filename):
+        return self.sender(url=Endpoint.retrieve, chunked=True, json={'filename': filename})
+
+    def exists(self, filename) -> bool:
+        # the storage has no HEAD endpoint, the retrieve response is closed before its body is read
+        with self.session.post(url=Endpoint.retrieve, json={'filename': filename}, stream=True) as response:
+            return response.ok
+
     def delete(self, filename):
         return self.sender(url=Endpoint.remove, json={'filename': filename})
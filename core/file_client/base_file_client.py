@@ -1,6 +1,8 @@
 import os
 
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Iterator
 from functools import wraps
 from io import BytesIO
 
@@ -8,6 +10,7 @@ from django.conf import settings
 from loguru import logger
 
 from file_client.S3_client import S3FileLoader
+from file_client.cache import LocalFileCache, CachedFile
 from file_client.exceptions import FileClientException
 
 
@@ -26,6 +29,24 @@ def render_then_cleanup(method):
     return wrapper
 
 
+def run_many(clients, method) -> dict:
+    """Runs method for every client in a thread pool, results (or raised errors) are keyed by filename"""
+    results = {}
+    if not clients:
+        return results
+
+    workers = min(settings.FILE_CLIENT_BATCH_WORKERS, len(clients))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {client.filename: executor.submit(method, client) for client in clients}
+
+    for filename, future in futures.items():
+        try:
+            results[filename] = future.result()
+        except Exception as e:
+            results[filename] = e
+    return results
+
+
 class BaseRendererUploader(ABC):
     def __init__(self, name: str, path: str = None, file_format='webp'):
         self.is_read_only = not path
@@ -55,8 +76,43 @@ class BaseRendererUploader(ABC):
             return response
         raise FileClientException(404, {"detail": "Downloaded file not found S3"})
 
+    def download_chunks(self) -> Iterator[bytes]:
+        self.check_is_read_only()
+
+        response = self.loader.download_chunks(self.filename)
+        if isinstance(response, Iterator):
+            return response
+        raise FileClientException(404, {"detail": "Downloaded file not found S3"})
+
+    def download_cached(self) -> CachedFile:
+        self.check_is_read_only()
+
+        cache = LocalFileCache()
+        cached = cache.get(self.filename)
+        if cached:
+            return cached
+
+        return cache.put(self.filename, self.download_chunks())
+
+    def exists(self) -> bool:
+        self.check_is_read_only()
+        return LocalFileCache().get(self.filename) is not None or self.loader.exists(self.filename)
+
+    @staticmethod
+    def exists_many(clients: list['BaseRendererUploader']) -> dict[str, bool | Exception]:
+        return run_many(clients, lambda client: client.exists())
+
+    @staticmethod
+    def download_cached_many(clients: list['BaseRendererUploader']) -> dict[str, CachedFile | FileClientException]:
+        return run_many(clients, lambda client: client.download_cached())
+
+    @staticmethod
+    def upload_many(clients: list['BaseRendererUploader']) -> dict[str, dict | Exception]:
+        return run_many(clients, lambda client: client.upload())
+
     def delete(self):
         self.check_is_read_only()
+        LocalFileCache().invalidate(self.filename)
         return self.loader.delete(self.filename)
 
     def check_is_read_only(self):
@@ -66,12 +122,16 @@ class BaseRendererUploader(ABC):
     @render_then_cleanup
     def upload(self):
         self.check_is_not_read_only()
-        return self.loader.upload()
+        response = self.loader.upload()
+        LocalFileCache().invalidate(self.filename)
+        return response
 
     @render_then_cleanup
     def update(self):
         self.check_is_not_read_only()
-        return self.loader.update()
+        response = self.loader.update()
+        LocalFileCache().invalidate(self.filename)
+        return response
 
     def check_is_not_read_only(self):
         if self.is_read_only:
@@ -0,0 +1,120 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Iterable
+
+from django.conf import settings
+
+
+@dataclass
+class CachedFile:
+    path: str
+    etag: str
+    size: int
+    modified: float
+
+
+class LocalFileCache:
+    """Content-addressed LRU cache of storage files on local disk.
+
+    Every storage filename owns a directory named after the hash of that
+    filename, holding a single blob named after the hash of its content.
+    Recency is tracked through the blob access time, so eviction never
+    needs an index of its own.
+    """
+
+    def __init__(self, root: str = None, max_size: int = None):
+        self.root = root or os.path.join(settings.PATH_TO_LOCAL_STORAGE, 'cache')
+        self.max_size = settings.LOCAL_FILE_CACHE_MAX_SIZE if max_size is None else max_size
+
+    def entry_dir(self, name: str) -> str:
+        return os.path.join(self.root, hashlib.sha256(name.encode()).hexdigest())
+
+    def get(self, name: str) -> CachedFile | None:
+        # a concurrent put or eviction can remove blobs at any point, a vanished blob is a miss
+        try:
+            blobs = [entry for entry in os.scandir(self.entry_dir(name)) if entry.is_file()]
+            if not blobs:
+                return None
+
+            blob = max(blobs, key=lambda entry: entry.stat().st_mtime)
+            stat = blob.stat()
+            os.utime(blob.path, (time.time(), stat.st_mtime))
+        except FileNotFoundError:
+            return None
+        return CachedFile(path=blob.path, etag=blob.name, size=stat.st_size, modified=stat.st_mtime)
+
+    def put(self, name: str, chunks: Iterable[bytes]) -> CachedFile:
+        os.makedirs(self.root, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        with tempfile.NamedTemporaryFile(dir=self.root, prefix='.tmp-', delete=False) as tmp:
+            try:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    tmp.write(chunk)
+                    size += len(chunk)
+            except BaseException:
+                tmp.close()
+                os.remove(tmp.name)
+                raise
+
+        directory = self.entry_dir(name)
+        os.makedirs(directory, exist_ok=True)
+        blob_path = os.path.join(directory, digest.hexdigest())
+        # the replace is atomic, readers see either the previous blob or this one, never an empty entry
+        os.replace(tmp.name, blob_path)
+        self.remove_stale(directory, keep=blob_path)
+
+        self.evict(keep=directory)
+        try:
+            modified = os.path.getmtime(blob_path)
+        except FileNotFoundError:
+            # replaced right away by a concurrent put of other content
+            modified = time.time()
+        return CachedFile(path=blob_path, etag=digest.hexdigest(), size=size, modified=modified)
+
+    @staticmethod
+    def remove_stale(directory: str, keep: str):
+        try:
+            entries = list(os.scandir(directory))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            if entry.path == keep:
+                continue
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+    def invalidate(self, name: str):
+        shutil.rmtree(self.entry_dir(name), ignore_errors=True)
+
+    def evict(self, keep: str = None):
+        entries = []
+        total = 0
+        try:
+            directories = [entry for entry in os.scandir(self.root) if entry.is_dir()]
+        except FileNotFoundError:
+            return
+
+        for directory in directories:
+            try:
+                for blob in os.scandir(directory.path):
+                    stat = blob.stat()
+                    total += stat.st_size
+                    entries.append((stat.st_atime, stat.st_size, directory.path))
+            except FileNotFoundError:
+                continue
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            if path == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
@@ -1,43 +1,125 @@
+import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 
 from PIL import Image
+from django.conf import settings
+from loguru import logger
 
-from file_client.base_file_client import BaseRendererUploader
+from file_client.S3_client import S3FileLoader
+from file_client.base_file_client import BaseRendererUploader, render_then_cleanup
+from file_client.cache import LocalFileCache
+from file_client.utils import (
+    image_formats,
+    map_in_pool,
+    render_image_variant,
+    variant_name,
+    build_csv_summary,
+    summary_name
+)
 
 
-class ProfileImageRendererClient(BaseRendererUploader):
+class MultiFileRenderClient(BaseRendererUploader):
+    """Client whose render stage produces extra files that are stored next to the main one"""
 
     def __init__(self, name: str, path: str = None, file_format='webp'):
         super().__init__(name, path, file_format)
+        self.name = os.path.splitext(name)[0]
+        self.extra_paths = []
+
+    def extra_filenames(self) -> list[str]:
+        return []
+
+    @render_then_cleanup
+    def upload(self):
+        self.check_is_not_read_only()
+        return self.send_all(lambda loader: loader.upload())
+
+    @render_then_cleanup
+    def update(self):
+        self.check_is_not_read_only()
+        return self.send_all(lambda loader: loader.update())
+
+    def send_all(self, method):
+        response = method(self.loader)
+        loaders = [S3FileLoader(path=path) for path in self.extra_paths]
+        with ThreadPoolExecutor(max_workers=settings.FILE_CLIENT_BATCH_WORKERS) as executor:
+            results = executor.map(lambda loader: (loader.filename, method(loader)), loaders)
+            for filename, result in results:
+                LocalFileCache().invalidate(filename)
+                logger.info(f"{filename} sent to storage: {result}")
+        LocalFileCache().invalidate(self.filename)
+        return response
+
+    def delete(self):
+        response = super().delete()
+        for filename in self.extra_filenames():
+            LocalFileCache().invalidate(filename)
+            self.loader.delete(filename)
+        return response
+
+    def cleanup(self):
+        super().cleanup()
+        for path in self.extra_paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+class ImageVariantsRenderClient(MultiFileRenderClient):
+    """Renders every size from settings.IMAGE_VARIANTS in every supported format.
+
+    The full size webp keeps the plain "<name>.webp" storage name, the rest are stored as "<name>_<size>.<format>".
+    """
+    save_options = {}
+
+    def __init__(self, name: str, path: str = None, file_format='webp'):
+        super().__init__(name, path, file_format)
+
+    def variant_filenames(self, formats=None):
+        formats = formats or image_formats()
+        return [
+            (size, file_format, f'{variant_name(self.name, size, file_format)}.{file_format}')
+            for size in settings.IMAGE_VARIANTS for file_format in formats
+        ]
+
+    def extra_filenames(self) -> list[str]:
+        formats = ['webp'] + settings.IMAGE_FALLBACK_FORMATS
+        return [filename for _, _, filename in self.variant_filenames(formats) if filename != self.filename]
 
     def render(self):
         super().render()
 
         with Image.open(self.path) as img:
-            img.save(
-                self.new_path,
-                self.format,
-                optimize=True,
-                quality=10
-            )
+            img.verify()
+
+        jobs = []
+        for size, file_format, filename in self.variant_filenames():
+            dst = self.new_path if filename == self.filename else os.path.join(settings.PATH_TO_LOCAL_STORAGE, filename)
+            jobs.append((self.path, dst, settings.IMAGE_VARIANTS[size], file_format, self.save_options.get(file_format, {})))
 
+        self.extra_paths = [path for path in map_in_pool(render_image_variant, jobs) if path != self.new_path]
 
-class DocumentationImageRenderClient(BaseRendererUploader):
+
+class ProfileImageRendererClient(ImageVariantsRenderClient):
+    save_options = {
+        'webp': {'optimize': True, 'quality': 10},
+        'avif': {'quality': 30},
+        'jpeg': {'optimize': True, 'quality': 40},
+    }
 
     def __init__(self, name: str, path: str = None, file_format='webp'):
         super().__init__(name, path, file_format)
 
-    def render(self):
-        super().render()
 
-        with Image.open(self.path) as img:
-            img.save(
-                self.new_path,
-                "WEBP",
-                quality=50,
-                method=6,
-                optimize=True
-            )
+class DocumentationImageRenderClient(ImageVariantsRenderClient):
+    save_options = {
+        'webp': {'quality': 50, 'method': 6, 'optimize': True},
+        'avif': {'quality': 50},
+        'jpeg': {'optimize': True, 'quality': 75},
+    }
+
+    def __init__(self, name: str, path: str = None, file_format='webp'):
+        super().__init__(name, path, file_format)
 
 
 class ReadOnlyClient(BaseRendererUploader):
@@ -52,11 +134,21 @@ class ReadOnlyClient(BaseRendererUploader):
         raise NotImplementedError('Method not allowed')
 
 
-class DocumentationGraphicClient(BaseRendererUploader):
+class DocumentationGraphicClient(MultiFileRenderClient):
+    """Stores the raw csv together with "<name>_summary.json", a downsampled copy the frontend can plot directly"""
+
     def __init__(self, name: str, path: str = None, file_format='csv'):
         super().__init__(name, path, file_format)
 
+    def extra_filenames(self) -> list[str]:
+        return [summary_name(self.name) + '.json']
+
     def render(self):
         super().render()
 
         shutil.copyfile(self.path, self.new_path)
+
+        summary_path = os.path.join(settings.PATH_TO_LOCAL_STORAGE, self.extra_filenames()[0])
+        with open(summary_path, 'wb') as file:
+            file.write(build_csv_summary(self.new_path))
+        self.extra_paths = [summary_path]
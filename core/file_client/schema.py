@@ -21,3 +21,11 @@ file_schema = {
         'required': ['file']
     }
 }
+
+batch_file_schema = {
+    'multipart/form-data': {
+        'type': 'object',
+        'additionalProperties': build_basic_type(OpenApiTypes.BINARY),
+        'description': 'Every part is named "<uuid>.<format>", format is webp or csv'
+    }
+}
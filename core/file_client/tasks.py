@@ -1,8 +1,14 @@
 from celery import shared_task
 
+from file_client.base_file_client import BaseRendererUploader
 from file_client.files_clients import ProfileImageRendererClient, DocumentationImageRenderClient, \
     DocumentationGraphicClient
 
+DOCUMENTATION_CLIENTS = {
+    'webp': DocumentationImageRenderClient,
+    'csv': DocumentationGraphicClient,
+}
+
 
 @shared_task
 def render_and_upload_profile_image_task(old_file_path: str, new_name: str):
@@ -50,3 +56,13 @@ def render_and_update_documentation_graphic_task(old_file_path: str, new_name: s
 def destroy_documentation_graphic_task(name: str):
     client = DocumentationGraphicClient(name=name)
     return client.delete()
+
+
+@shared_task
+def render_and_upload_documentation_files_task(files: list):
+    clients = [
+        DOCUMENTATION_CLIENTS[file_format](name=uuid, path=old_file_path)
+        for old_file_path, uuid, file_format in files
+    ]
+    results = BaseRendererUploader.upload_many(clients)
+    return {name: str(result) if isinstance(result, Exception) else result for name, result in results.items()}
@@ -1,7 +1,20 @@
+import csv
+import io
+import json
+import math
+import multiprocessing
 import os
+import time
+import zipfile
+from array import array
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 from django.conf import settings
 from django.core.files.uploadedfile import UploadedFile
+from PIL import Image
+
+from file_client.cache import CachedFile
 
 
 def handle_file_upload(file: UploadedFile) -> str:
@@ -11,4 +24,164 @@ def handle_file_upload(file: UploadedFile) -> str:
         for chunk in file.chunks():
             f.write(chunk)
 
-    return path
\ No newline at end of file
+    return path
+
+class _ZipBuffer(io.RawIOBase):
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.buffer += b
+        return len(b)
+
+    def pop(self) -> bytes:
+        chunk = bytes(self.buffer)
+        self.buffer.clear()
+        return chunk
+
+
+def iter_zip(files: list[tuple[str, CachedFile]]) -> Iterator[bytes]:
+    """Streams an uncompressed zip of cached files, webp and csv assets gain nothing from deflate"""
+    chunk_size = settings.FILE_CLIENT_CHUNK_SIZE
+    buffer = _ZipBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as archive:
+        for arcname, cached in files:
+            info = zipfile.ZipInfo(arcname, date_time=time.localtime(cached.modified)[:6])
+            info.file_size = cached.size
+            with open(cached.path, 'rb') as src, archive.open(info, 'w') as dst:
+                for chunk in iter(lambda: src.read(chunk_size), b''):
+                    dst.write(chunk)
+                    yield buffer.pop()
+    yield buffer.pop()
+
+
+IMAGE_MIME_TYPES = {
+    'webp': 'image/webp',
+    'avif': 'image/avif',
+    'jpeg': 'image/jpeg',
+}
+
+
+def image_formats() -> list[str]:
+    """webp is always rendered, fallbacks only when the installed Pillow can encode them"""
+    Image.init()
+    return ['webp'] + [
+        file_format for file_format in settings.IMAGE_FALLBACK_FORMATS
+        if file_format != 'webp' and file_format.upper() in Image.SAVE
+    ]
+
+
+def variant_name(name: str, size: str, file_format: str) -> str:
+    if size == 'full' and file_format == 'webp':
+        return name
+    return f'{name}_{size}'
+
+
+def render_image_variant(src: str, dst: str, max_side: int | None, file_format: str, options: dict) -> str:
+    with Image.open(src) as img:
+        if max_side:
+            img.thumbnail((max_side, max_side))
+        if file_format == 'jpeg' and img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+        img.save(dst, file_format.upper(), **options)
+    return dst
+
+
+def map_in_pool(func, jobs: list[tuple]) -> list:
+    """Process pool where possible, prefork celery children are daemonic and may not fork, so they get threads"""
+    if not jobs:
+        return []
+
+    workers = min(settings.IMAGE_RENDER_WORKERS, len(jobs))
+    if multiprocessing.current_process().daemon or workers == 1:
+        executor = ThreadPoolExecutor(max_workers=workers)
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+
+    with executor:
+        return list(executor.map(func, *zip(*jobs)))
+
+
+def summary_name(name: str) -> str:
+    return f'{name}_summary'
+
+
+def read_csv_columns(path: str) -> tuple[list[str] | None, list[array]]:
+    """Numeric columns of a csv, a leading non numeric row is taken as header, other broken rows are skipped"""
+    header, columns = None, None
+    with open(path, newline='') as file:
+        sample = file.read(64 * 1024)
+        file.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t ')
+        except csv.Error:
+            dialect = csv.excel
+
+        for row in csv.reader(file, dialect):
+            cells = [cell.strip() for cell in row]
+            if not any(cells):
+                continue
+            try:
+                values = [float(cell) for cell in cells]
+            except ValueError:
+                if header is None and columns is None:
+                    header = cells
+                continue
+            if columns is None:
+                columns = [array('d') for _ in values]
+            if len(values) != len(columns) or not all(math.isfinite(value) for value in values):
+                continue
+            for column, value in zip(columns, values):
+                column.append(value)
+
+    return header, columns or []
+
+
+def lttb(xs, ys, threshold: int) -> list[tuple[float, float]]:
+    """Largest-Triangle-Three-Buckets downsampling, keeps the visual shape of a series with `threshold` points"""
+    size = len(xs)
+    if threshold >= size or threshold < 3:
+        return list(zip(xs, ys))
+
+    sampled = [(xs[0], ys[0])]
+    every = (size - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, size)
+        avg_x = sum(xs[avg_start:avg_end]) / (avg_end - avg_start)
+        avg_y = sum(ys[avg_start:avg_end]) / (avg_end - avg_start)
+
+        ax, ay = xs[a], ys[a]
+        max_area, next_a = -1, None
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > max_area:
+                max_area, next_a = area, j
+
+        sampled.append((xs[next_a], ys[next_a]))
+        a = next_a
+
+    sampled.append((xs[-1], ys[-1]))
+    return sampled
+
+
+def build_csv_summary(path: str, points: int = None) -> bytes:
+    points = points or settings.GRAPHIC_SUMMARY_POINTS
+    header, columns = read_csv_columns(path)
+    names = header if header and len(header) == len(columns) else [f'column_{i}' for i in range(len(columns))]
+
+    if len(columns) == 1:
+        names = ['index'] + names
+        columns = [array('d', range(len(columns[0])))] + columns
+
+    rows = len(columns[0]) if columns else 0
+    series = [
+        {'name': name, 'points': lttb(columns[0], column, points)}
+        for name, column in zip(names[1:], columns[1:])
+    ]
+    summary = {'x': names[0] if names else None, 'rows': rows, 'series': series}
+    return json.dumps(summary, separators=(',', ':')).encode()
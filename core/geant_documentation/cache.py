@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+def article_detail_key(article_id, origin: str) -> str:
+    return f'article:detail:{article_id}:{origin}'
+
+
+def get_article_detail(article_id, origin: str) -> bytes | None:
+    if origin not in settings.ARTICLE_DETAIL_CACHE_ORIGINS:
+        return None
+    return cache.get(article_detail_key(article_id, origin))
+
+
+def set_article_detail(article_id, origin: str, payload: bytes):
+    # the origin comes from forwarded headers any client can set, so only known ones get an entry
+    if origin not in settings.ARTICLE_DETAIL_CACHE_ORIGINS:
+        return
+    cache.set(article_detail_key(article_id, origin), payload, settings.ARTICLE_DETAIL_CACHE_TIMEOUT)
+
+
+def invalidate_article_detail(article_id):
+    if article_id is None:
+        return
+    keys = [article_detail_key(article_id, origin) for origin in settings.ARTICLE_DETAIL_CACHE_ORIGINS]
+    # dropped again after commit so a request that read the old rows meanwhile can't keep its payload cached
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
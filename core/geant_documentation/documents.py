@@ -2,7 +2,8 @@ from django.conf import settings
 from django_elasticsearch_dsl import Document, fields
 from django_elasticsearch_dsl.registries import registry
 
-from geant_documentation.models import Article
+from geant_documentation.models import Article, Subscription, Element
+from utils.search_index import suggest_inputs
 
 
 @registry.register_document
@@ -38,11 +39,58 @@ class ArticleDocument(Document):
         }
     )
 
+    title_suggest = fields.CompletionField()
     category = fields.KeywordField(multi=True)
     chapter = fields.KeywordField()
+    subscriptions = fields.NestedField(properties={
+        'id': fields.IntegerField(),
+        'order': fields.IntegerField(),
+        'title': fields.TextField(
+            fields={
+                "english": fields.TextField(analyzer="english_analyzer"),
+                "russian": fields.TextField(analyzer="russian_analyzer"),
+            }
+        ),
+        'text': fields.TextField(
+            fields={
+                "english": fields.TextField(analyzer="english_analyzer"),
+                "russian": fields.TextField(analyzer="russian_analyzer"),
+            }
+        ),
+    })
+
+    text_element_types = (Element.TypeChoice.TEXT, Element.TypeChoice.FORMULA, Element.TypeChoice.SUBSUBSCRIPTION)
 
     class Django:
         model = Article
+        fields = ['id']
+        queryset_pagination = 500
+        related_models = [Subscription, Element]
+
+    def get_queryset(self):
+        return super().get_queryset().select_related('category', 'chapter').prefetch_related('subscriptions__elements')
+
+    def get_instances_from_related(self, related_instance):
+        if isinstance(related_instance, Subscription):
+            return related_instance.article
+        return related_instance.subscription.article
+
+    def prepare_subscriptions(self, instance):
+        return [
+            {
+                'id': subscription.id,
+                'order': subscription.subscription_order,
+                'title': subscription.title,
+                'text': '\n'.join(
+                    element.text for element in subscription.elements.all()
+                    if element.text and element.type in self.text_element_types
+                ),
+            }
+            for subscription in instance.subscriptions.all()
+        ]
+
+    def prepare_title_suggest(self, instance):
+        return suggest_inputs(instance.title)
 
     def prepare_category(self, instance):
         return instance.category.title if instance.category else ""
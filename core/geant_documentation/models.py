@@ -1,5 +1,6 @@
 from uuid import uuid4
 
+from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models
 
@@ -121,7 +122,7 @@ class File(models.Model):
 
     def save(self, *args, **kwargs):
         count = File.objects.filter(element=self.element).count()
-        if count >= 8:
-            raise ValidationError('Max files for element is 8')
+        if count >= settings.MAX_FILES_PER_ELEMENT:
+            raise ValidationError(f'Max files for element is {settings.MAX_FILES_PER_ELEMENT}')
 
         return super().save(*args, **kwargs)
@@ -1,8 +1,9 @@
-from django.db.models.signals import post_delete
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 
 from file_client.tasks import destroy_documentation_image_task, destroy_documentation_graphic_task
-from geant_documentation.models import File
+from geant_documentation.cache import invalidate_article_detail
+from geant_documentation.models import Article, ArticleUser, Subscription, Element, File
 
 
 @receiver(post_delete, sender=File)
@@ -14,3 +15,51 @@ def destroy_file(sender, instance, **kwargs):
             destroy_documentation_graphic_task.delay(name=str(instance.uuid))
         case _:
             pass
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+def invalidate_article(sender, instance, **kwargs):
+    invalidate_article_detail(instance.pk)
+
+
+@receiver(post_save, sender=ArticleUser)
+@receiver(post_delete, sender=ArticleUser)
+def invalidate_article_user_article(sender, instance, **kwargs):
+    invalidate_article_detail(instance.article_id)
+
+
+@receiver(m2m_changed, sender=Article.users.through)
+def invalidate_article_users(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        invalidate_article_detail(instance.pk)
+        return
+
+    article_ids = pk_set if action != 'pre_clear' else ArticleUser.objects.filter(
+        user=instance).values_list('article_id', flat=True)
+    for article_id in article_ids:
+        invalidate_article_detail(article_id)
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def invalidate_subscription_article(sender, instance, **kwargs):
+    invalidate_article_detail(instance.article_id)
+
+
+@receiver(post_save, sender=Element)
+@receiver(post_delete, sender=Element)
+def invalidate_element_article(sender, instance, **kwargs):
+    invalidate_article_detail(
+        Subscription.objects.filter(pk=instance.subscription_id).values_list('article_id', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=File)
+@receiver(post_delete, sender=File)
+def invalidate_file_article(sender, instance, **kwargs):
+    invalidate_article_detail(
+        Element.objects.filter(pk=instance.element_id).values_list('subscription__article_id', flat=True).first()
+    )
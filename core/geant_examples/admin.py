@@ -8,7 +8,8 @@ from geant_examples.models import (
     Command,
     CommandValue,
     CommandList,
-    Category
+    Category,
+    ExampleSweep
 )
 
 
@@ -19,4 +20,5 @@ admin.site.register(ExampleCommand)
 admin.site.register(Command)
 admin.site.register(CommandValue)
 admin.site.register(CommandList)
-admin.site.register(Category)
\ No newline at end of file
+admin.site.register(Category)
+admin.site.register(ExampleSweep)
@@ -2,7 +2,8 @@ from django_elasticsearch_dsl import Document, fields
 from django_elasticsearch_dsl.registries import registry
 from django.conf import settings
 
-from .models import Example
+from utils.search_index import suggest_inputs
+from .models import Example, Tag, Category
 
 
 @registry.register_document
@@ -38,6 +39,8 @@ class ExampleDocument(Document):
             ),
         }
     )
+    title_not_verbose = fields.KeywordField()
+    title_suggest = fields.CompletionField()
     tags = fields.KeywordField(multi=True)
     category = fields.KeywordField()
     date_to_update = fields.DateField()
@@ -45,6 +48,20 @@ class ExampleDocument(Document):
 
     class Django:
         model = Example
+        fields = ['id']
+        queryset_pagination = 1000
+        related_models = [Tag, Category]
+
+    def get_queryset(self):
+        return super().get_queryset().select_related('category').prefetch_related('tags')
+
+    def get_instances_from_related(self, related_instance):
+        return related_instance.examples.all()
+
+    def prepare_title_suggest(self, instance):
+        if not instance.synchronized:
+            return None
+        return suggest_inputs(instance.title_verbose, instance.title_not_verbose)
 
     def prepare_tags(self, instance):
         return [tag.title for tag in instance.tags.all()]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-18 13:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geant_examples', '0018_alter_command_max_alter_command_min'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examplecommand',
+            name='finished_at',
+            field=models.DateTimeField(blank=True, help_text='When the Geant backend reported the result of the run', null=True),
+        ),
+        migrations.AddField(
+            model_name='examplecommand',
+            name='started_at',
+            field=models.DateTimeField(blank=True, help_text='When the Geant backend accepted the run', null=True),
+        ),
+    ]
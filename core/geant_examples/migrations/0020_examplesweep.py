@@ -0,0 +1,31 @@
+# Generated by Django 5.1.5 on 2026-10-18 14:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geant_examples', '0019_examplecommand_started_at_finished_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExampleSweep',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('creation_date', models.DateTimeField(auto_now_add=True)),
+                ('example', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sweeps', to='geant_examples.example')),
+                ('example_commands', models.ManyToManyField(related_name='sweeps', to='geant_examples.examplecommand')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='example_sweeps', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'ExampleSweep',
+                'verbose_name_plural': 'ExampleSweeps',
+                'ordering': ('-creation_date',),
+            },
+        ),
+    ]
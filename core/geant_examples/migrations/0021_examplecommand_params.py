@@ -0,0 +1,31 @@
+# Generated by Django 5.1.5 on 2026-10-18 14:12
+
+from django.db import migrations, models
+
+
+def fill_params(apps, schema_editor):
+    ExampleCommand = apps.get_model('geant_examples', 'ExampleCommand')
+    ex_commands = list(ExampleCommand.objects.filter(params__isnull=True).only('key_s3'))
+    for ex_command in ex_commands:
+        raw_params = ex_command.key_s3.split('__', 1)[1].split('__') if '__' in ex_command.key_s3 else []
+        ex_command.params = dict(
+            (index, value.replace('--', ' '))
+            for index, value in (param.split('=', 1) for param in raw_params if '=' in param)
+        )
+    ExampleCommand.objects.bulk_update(ex_commands, ['params'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geant_examples', '0020_examplesweep'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examplecommand',
+            name='params',
+            field=models.JSONField(blank=True, help_text='Values of the run commands by order index', null=True),
+        ),
+        migrations.RunPython(fill_params, migrations.RunPython.noop),
+    ]
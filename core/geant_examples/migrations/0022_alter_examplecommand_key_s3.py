@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-18 14:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geant_examples', '0021_examplecommand_params'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='examplecommand',
+            name='key_s3',
+            field=models.CharField(help_text='in this field encoded all info about example', max_length=1020, unique=True),
+        ),
+    ]
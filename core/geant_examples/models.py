@@ -100,8 +100,9 @@ class CommandValue(models.Model):
 class ExampleCommand(models.Model):
     users = models.ManyToManyField(
         User, related_name='example_commands', through='UserExampleCommand')
+    # every command value is part of the key, S3 caps object keys at 1024 bytes including ".zip"
     key_s3 = models.CharField(
-        max_length=255,
+        max_length=1020,
         help_text=_('in this field encoded all info about example'),
         unique=True
     )
@@ -110,6 +111,12 @@ class ExampleCommand(models.Model):
         on_delete=models.CASCADE,
         related_name='example_commands'
     )
+    started_at = models.DateTimeField(
+        null=True, blank=True, help_text=_('When the Geant backend accepted the run'))
+    finished_at = models.DateTimeField(
+        null=True, blank=True, help_text=_('When the Geant backend reported the result of the run'))
+    params = models.JSONField(
+        null=True, blank=True, help_text=_('Values of the run commands by order index'))
 
     class Meta:
         verbose_name = _('ExampleCommand')
@@ -144,6 +151,21 @@ class UserExampleCommand(models.Model):
         return str(self.creation_date) + f', status {self.status}'
 
 
+class ExampleSweep(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='example_sweeps')
+    example = models.ForeignKey(Example, on_delete=models.CASCADE, related_name='sweeps')
+    example_commands = models.ManyToManyField(ExampleCommand, related_name='sweeps')
+    creation_date = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('ExampleSweep')
+        verbose_name_plural = _('ExampleSweeps')
+        ordering = ('-creation_date',)
+
+    def __str__(self):
+        return f'{self.example_id}, {self.creation_date}'
+
+
 class Tag(models.Model):
     title = models.CharField(
         max_length=255,
@@ -0,0 +1,40 @@
+from decimal import Decimal, InvalidOperation
+
+
+def normalize_value(value) -> str:
+    # "1", "1.0" and "1e0" describe the same simulation and have to share its key
+    value = str(value).strip()
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        return value
+    if not number.is_finite():
+        return value
+    if number.is_zero():
+        return '0'
+    return format(number.normalize(), 'f')
+
+
+def canonical_params(commands, params: dict) -> dict:
+    """Values of all commands of the example as {title: [value, order_index]}, in order_index order.
+
+    Omitted commands take their default and unknown ones are dropped, so the same
+    simulation gets the same key_s3 however the request spelled it.
+    """
+    return {
+        command.title: [normalize_value(params.get(command.title, command.default)), command.order_index]
+        for command in sorted(commands, key=lambda command: command.order_index)
+    }
+
+
+def stored_params(params: dict) -> dict:
+    return {str(order_index): value for value, order_index in params.values()}
+
+
+def params_from_key(key_s3: str) -> dict:
+    # runs created before ExampleCommand.params only have their values encoded in the key
+    raw_params = key_s3.split('__', 1)[1].split('__') if '__' in key_s3 else []
+    return dict(
+        (index, value.replace('--', ' '))
+        for index, value in (param.split('=', 1) for param in raw_params if '=' in param)
+    )
@@ -0,0 +1,50 @@
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Exists, F, OuterRef
+
+from geant_examples.models import ExampleCommand, UserExampleCommand
+
+
+def run_stats_key(example_id) -> str:
+    return f'run_stats:{example_id}'
+
+
+def percentile(values: list[float], q: float) -> float:
+    # nearest-rank, values are sorted
+    return values[max(math.ceil(q / 100 * len(values)) - 1, 0)]
+
+
+def get_run_stats(example_id) -> dict:
+    """Duration percentiles, in seconds, of the latest successful runs of the example."""
+    stats = cache.get(run_stats_key(example_id))
+    if stats is not None:
+        return stats
+
+    succeeded = UserExampleCommand.objects.filter(
+        example_command=OuterRef('pk'), status=UserExampleCommand.StatusChoice.executed)
+    durations = ExampleCommand.objects.filter(
+        Exists(succeeded),
+        example_id=example_id,
+        started_at__isnull=False,
+        finished_at__isnull=False,
+    ).order_by('-finished_at').annotate(
+        duration=F('finished_at') - F('started_at')
+    ).values_list('duration', flat=True)[:settings.RUN_STATS['window']]
+    durations = sorted(max(duration.total_seconds(), 0) for duration in durations)
+
+    stats = {'count': len(durations)}
+    for q in settings.RUN_STATS['percentiles']:
+        stats[f'p{q}'] = percentile(durations, q) if durations else None
+
+    cache.set(run_stats_key(example_id), stats, settings.RUN_STATS['timeout'])
+    return stats
+
+
+def expected_duration(example_id) -> float:
+    return get_run_stats(example_id)['p50'] or settings.GEANT_SCHEDULER['run_time']
+
+
+def invalidate_run_stats(example_id):
+    cache.delete(run_stats_key(example_id))
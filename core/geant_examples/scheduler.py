@@ -0,0 +1,181 @@
+import json
+import math
+import time
+
+import loguru
+import redis
+from django.conf import settings
+
+_connection = None
+
+
+class QueueFull(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f'Simulation queue is full, retry after {retry_after} seconds')
+        self.retry_after = retry_after
+
+
+def get_connection() -> redis.Redis:
+    global _connection
+    if _connection is None:
+        _connection = redis.Redis.from_url(settings.GEANT_SCHEDULER['redis_url'])
+    return _connection
+
+
+def get_keys() -> dict:
+    key = settings.GEANT_SCHEDULER['key']
+    return {
+        'lock': f'{key}:lock',
+        'users': f'{key}:users',
+        'size': f'{key}:size',
+        'running': f'{key}:running',
+        'seq': f'{key}:seq',
+    }
+
+
+def pending_key(user_id) -> str:
+    return f'{settings.GEANT_SCHEDULER["key"]}:pending:{user_id}'
+
+
+def get_lock(connection):
+    return connection.lock(get_keys()['lock'], timeout=10, blocking_timeout=5)
+
+
+def estimate_wait(depth: int, slots: int) -> int:
+    return math.ceil(depth / max(slots, 1)) * settings.GEANT_SCHEDULER['run_time']
+
+
+def submit(user_id: int, key_s3: str, data: dict, expected: float = 0) -> int:
+    """Queue a run for the user and return its position in the whole queue.
+
+    Each user's runs start shortest expected duration first, runs expected to take
+    equally long in the order they were submitted.
+    Raises QueueFull when the queue or the user's share of it is full.
+    """
+    return submit_many(user_id, [(key_s3, data, expected)])
+
+
+def check_capacity(user_id: int, count: int, connection=None) -> int:
+    """Raise QueueFull unless count more runs of the user fit in the queue, return the queue size."""
+    conf = settings.GEANT_SCHEDULER
+    connection = connection or get_connection()
+    size = int(connection.get(get_keys()['size']) or 0)
+    user_size = connection.zcard(pending_key(user_id))
+    if size + count > conf['max_queue']:
+        raise QueueFull(estimate_wait(size + count, conf['concurrency']))
+    if user_size + count > conf['max_user_queue']:
+        raise QueueFull(estimate_wait(user_size + count, conf['max_user_running']))
+    return size
+
+
+def submit_many(user_id: int, runs: list[tuple[str, dict, float]], force: bool = False) -> int:
+    """Queue (key_s3, data, expected) runs of the user all at once, or none of them.
+
+    force skips the capacity check, for runs that were already admitted by check_capacity.
+    """
+    keys = get_keys()
+    connection = get_connection()
+
+    with get_lock(connection):
+        if force:
+            size = int(connection.get(keys['size']) or 0)
+        else:
+            size = check_capacity(user_id, len(runs), connection)
+        user_size = connection.zcard(pending_key(user_id))
+
+        for key_s3, data, expected in runs:
+            seq = connection.incr(keys['seq'])
+            job = json.dumps({'user': user_id, 'key_s3': key_s3, 'data': data})
+            connection.zadd(pending_key(user_id), {f'{seq:012d}:{job}': round(expected)})
+        if not user_size:
+            connection.rpush(keys['users'], user_id)
+        connection.incrby(keys['size'], len(runs))
+
+    return size + 1
+
+
+def get_running(connection) -> dict:
+    return {
+        key_s3.decode(): json.loads(run)
+        for key_s3, run in connection.hgetall(get_keys()['running']).items()
+    }
+
+
+def next_job(connection, running: dict) -> dict | None:
+    # users take turns: each one gets at most one run per pass over the ring
+    keys = get_keys()
+    running_per_user = {}
+    for run in running.values():
+        running_per_user[run['user']] = running_per_user.get(run['user'], 0) + 1
+
+    for _ in range(connection.llen(keys['users'])):
+        user_id = int(connection.lpop(keys['users']))
+        if running_per_user.get(user_id, 0) >= settings.GEANT_SCHEDULER['max_user_running']:
+            connection.rpush(keys['users'], user_id)
+            continue
+
+        popped = connection.zpopmin(pending_key(user_id))
+        if connection.zcard(pending_key(user_id)):
+            connection.rpush(keys['users'], user_id)
+        if popped:
+            connection.decr(keys['size'])
+            member, _ = popped[0]
+            return json.loads(member.split(b':', 1)[1])
+
+    return None
+
+
+def get_queued(connection) -> set[str]:
+    queued = set()
+    for user_id in connection.lrange(get_keys()['users'], 0, -1):
+        for member in connection.zrange(pending_key(int(user_id)), 0, -1):
+            queued.add(json.loads(member.split(b':', 1)[1])['key_s3'])
+    return queued
+
+
+def active_runs() -> set[str]:
+    """key_s3s of the runs the scheduler still holds, queued or running."""
+    connection = get_connection()
+    with get_lock(connection):
+        return set(get_running(connection)) | get_queued(connection)
+
+
+def reclaim_expired() -> list[str]:
+    """Free the slots of runs whose status callback never came and return their key_s3s."""
+    conf = settings.GEANT_SCHEDULER
+    connection = get_connection()
+    now = time.time()
+
+    with get_lock(connection):
+        running = get_running(connection)
+        expired = [key_s3 for key_s3, run in running.items() if now - run['since'] > conf['run_timeout']]
+        if expired:
+            loguru.logger.warning(f'Releasing {len(expired)} runs without a status callback: {expired}')
+            connection.hdel(get_keys()['running'], *expired)
+
+    return expired
+
+
+def take_jobs() -> list[dict]:
+    """Move as many queued runs to running as the backend has free slots for."""
+    conf = settings.GEANT_SCHEDULER
+    keys = get_keys()
+    connection = get_connection()
+    now = time.time()
+    jobs = []
+
+    with get_lock(connection):
+        running = get_running(connection)
+        while len(running) < conf['concurrency']:
+            job = next_job(connection, running)
+            if job is None:
+                break
+            running[job['key_s3']] = {'user': job['user'], 'since': now}
+            connection.hset(keys['running'], job['key_s3'], json.dumps(running[job['key_s3']]))
+            jobs.append(job)
+
+    return jobs
+
+
+def release(key_s3: str):
+    get_connection().hdel(get_keys()['running'], key_s3)
@@ -1,10 +1,9 @@
-import loguru
 from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 
 from geant_examples.models import Example, Command, ExampleCommand
 from geant_examples.models import UserExampleCommand
-from users.documents import UserExampleCommandDocument
+from utils.search_index import enqueue
 from utils.services import DatabaseSynchronizer
 
 
@@ -38,14 +37,8 @@ def delete_command(sender, instance, **kwargs):
 @receiver(m2m_changed, sender=ExampleCommand.users.through)
 def update_user_example_command_document(sender, instance, action, pk_set, **kwargs):
     if action == 'post_add':
-
-        for user_id in pk_set:
-            try:
-                us_ex_command = UserExampleCommand.objects.get(
-                    user_id=user_id,
-                    example_command=instance
-                )
-                UserExampleCommandDocument().update(us_ex_command, refresh=True)
-                loguru.logger.critical(f'update for {user_id}, {instance}, {us_ex_command}')
-            except UserExampleCommand.DoesNotExist:
-                pass
+        us_ex_command_ids = UserExampleCommand.objects.filter(
+            user_id__in=pk_set,
+            example_command=instance
+        ).values_list('id', flat=True)
+        enqueue(UserExampleCommand, list(us_ex_command_ids))
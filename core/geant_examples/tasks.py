@@ -0,0 +1,119 @@
+import redis
+import requests
+from cacheops import invalidate_model
+from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
+from loguru import logger
+
+from geant_examples import scheduler
+from geant_examples.models import ExampleCommand, UserExampleCommand
+from utils.http import get_session
+from utils.realtime import publish_run_statuses
+
+
+def mark_example_command_failed(key_s3: str):
+    UserExampleCommand.objects.filter(
+        example_command__key_s3=key_s3
+    ).update(status=UserExampleCommand.StatusChoice.failure)
+    invalidate_model(UserExampleCommand)
+    mark_run_finished(key_s3)
+    publish_run_statuses(key_s3)
+    finish_run(key_s3)
+
+
+def mark_run_finished(key_s3: str):
+    ExampleCommand.objects.filter(key_s3=key_s3).update(finished_at=timezone.now())
+    invalidate_model(ExampleCommand)
+
+
+def finish_run(key_s3: str):
+    try:
+        scheduler.release(key_s3)
+        dispatch_runs()
+    except redis.RedisError as e:
+        logger.error(f"Could not release run {key_s3} in the scheduler: {e}")
+
+
+def enqueue_runs(user_id: int, jobs: list[tuple[str, dict, float]]) -> int:
+    try:
+        return scheduler.submit_many(user_id, jobs)
+    except scheduler.QueueFull:
+        # admitted by check_capacity, so the queue only overshoots by the runs that raced for its last places
+        return scheduler.submit_many(user_id, jobs, force=True)
+
+
+def submit_runs(user_id: int, jobs: list[tuple[str, dict, float]]) -> int | None:
+    # called once the rows of the runs are committed, so a rolled back request never leaves a job behind
+    try:
+        position = enqueue_runs(user_id, jobs)
+    except redis.RedisError as e:
+        logger.error(f"Scheduler is unavailable, queueing of {len(jobs)} runs is retried: {e}")
+        try:
+            submit_runs_task.apply_async((user_id, jobs), countdown=1)
+        except Exception as e:
+            logger.error(f"Could not retry queueing of {len(jobs)} runs: {e}")
+            fail_runs(jobs)
+        return None
+
+    dispatch_runs.delay()
+    return position
+
+
+def fail_runs(jobs: list[tuple[str, dict, float]]):
+    for key_s3, _, _ in jobs:
+        mark_example_command_failed(key_s3)
+
+
+@shared_task(bind=True, max_retries=settings.GEANT_BACKEND_MAX_RETRIES)
+def submit_runs_task(self, user_id: int, jobs: list):
+    try:
+        enqueue_runs(user_id, jobs)
+    except redis.RedisError as e:
+        if not self.request.is_eager and self.request.retries < self.max_retries:
+            raise self.retry(exc=e, countdown=2 ** self.request.retries)
+        logger.error(f"Scheduler stayed unavailable, {len(jobs)} runs failed: {e}")
+        fail_runs(jobs)
+        return False
+
+    dispatch_runs.delay()
+    return True
+
+
+@shared_task
+def dispatch_runs():
+    # runs whose status callback never came would stay executing for their users forever
+    for key_s3 in scheduler.reclaim_expired():
+        mark_example_command_failed(key_s3)
+
+    jobs = scheduler.take_jobs()
+    for job in jobs:
+        run_example_task.delay(job['key_s3'], job['data'])
+    return len(jobs)
+
+
+@shared_task(bind=True, max_retries=settings.GEANT_BACKEND_MAX_RETRIES)
+def run_example_task(self, key_s3: str, data: dict):
+    # stamped before the POST, the status callback may land before the backend answers it
+    ExampleCommand.objects.filter(key_s3=key_s3).update(started_at=timezone.now(), finished_at=None)
+    invalidate_model(ExampleCommand)
+    try:
+        response = get_session('geant_backend').post(settings.GEANT_BACKEND_RUN_EXAMPLE_URL, json=data)
+    except requests.ReadTimeout as e:
+        # the backend may have accepted the run already, posting it again could start a second simulation,
+        # the status callback or reclaim_expired settles it instead
+        logger.warning(f"Geant backend did not answer in time for run {key_s3}, leaving it executing: {e}")
+        return None
+    except requests.ConnectionError as e:
+        if not self.request.is_eager and self.request.retries < self.max_retries:
+            raise self.retry(exc=e, countdown=2 ** self.request.retries)
+        logger.error(f"Geant backend is unreachable, run {key_s3} failed: {e}")
+        mark_example_command_failed(key_s3)
+        return False
+
+    if not response.ok:
+        logger.error(f"Geant backend rejected run {key_s3}: {response.status_code} {response.text}")
+        mark_example_command_failed(key_s3)
+        return False
+
+    return True
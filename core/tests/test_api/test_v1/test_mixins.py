@@ -1,9 +1,21 @@
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
 from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db import IntegrityError
 from django.test import TestCase
+from django.urls import reverse
+from elasticsearch import ConnectionError as ElasticConnectionError
+from elasticsearch_dsl import Search
+from elasticsearch_dsl.response import Response
+from rest_framework import status
 from rest_framework.exceptions import ValidationError as DRFValidationError
 
-from api.v1.views.mixins import ValidationHandlingMixin
+from api.v1.views.mixins import ValidationHandlingMixin, ElasticMixin
+from geant_documentation.documents import ArticleDocument
+from geant_examples.documents import ExampleDocument
+from tests.test_api.test_v1.test_views.auth_test_base import AuthSettingsTest
+from utils.search_index import bump_index_version, suggest_inputs
 
 
 class ValidationHandlingMixinTests(TestCase):
@@ -67,3 +79,328 @@ class ValidationHandlingMixinTests(TestCase):
         with self.assertRaises(DRFValidationError) as exc:
             self.mixin.perform_update(serializer)
         self.assertIn("update integrity issue", str(exc.exception))
+
+
+class FakeHits(list):
+    def __init__(self, hits, total):
+        super().__init__(hits)
+        self.total = MagicMock(value=total)
+
+
+def fake_hit(pk, source):
+    hit = MagicMock()
+    hit.meta.id = str(pk)
+    hit.to_dict.return_value = source
+    return hit
+
+
+def fake_search(hits, total):
+    search = MagicMock()
+    for method in ('filter', 'query', 'sort', 'extra', 'source'):
+        getattr(search, method).return_value = search
+    search.execute.return_value = MagicMock(hits=FakeHits(hits, total))
+    return search
+
+
+class ElasticMixinTests(TestCase):
+    def setUp(self):
+        self.mixin = ElasticMixin()
+        self.mixin.elastic_document = ExampleDocument
+        self.mixin.setup_elastic_document_conf()
+        self.request = MagicMock(query_params={})
+
+    def test_full_query_handling_uses_single_request(self):
+        search = fake_search([], 42)
+
+        result = self.mixin.elastic_full_query_handling(self.request, search)
+
+        self.assertIs(result, search)
+        search.extra.assert_any_call(track_total_hits=True)
+        search.execute.assert_called_once()
+        search.count.assert_not_called()
+        self.assertEqual(self.mixin.total_count, 42)
+
+    def test_source_excluded_without_source_serializer(self):
+        search = fake_search([], 0)
+
+        self.mixin.elastic_full_query_handling(self.request, search)
+
+        search.source.assert_called_once_with(excludes=['*'])
+
+    def test_source_kept_with_source_serializer(self):
+        self.mixin.elastic_serializer_class = MagicMock()
+        search = fake_search([fake_hit(7, {'title_verbose': 'x'})], 1)
+
+        self.mixin.elastic_full_query_handling(self.request, search)
+
+        search.source.assert_called_once_with(excludes=['*_suggest'])
+        self.assertEqual(self.mixin.get_elastic_source(), [{'title_verbose': 'x', 'id': 7}])
+
+
+class ElasticNestedSearchTests(TestCase):
+    def setUp(self):
+        self.mixin = ElasticMixin()
+        self.mixin.elastic_document = ArticleDocument
+        self.mixin.setup_elastic_document_conf()
+
+    def test_search_matches_subscription_text(self):
+        search = fake_search([], 0)
+
+        self.mixin.elastic_search(MagicMock(query_params={'query': 'muon'}), search)
+
+        query = search.query.call_args.args[0].to_dict()
+        nested = query['bool']['should'][1]['nested']
+        self.assertEqual(nested['path'], 'subscriptions')
+        self.assertIn('subscriptions.text', nested['query']['multi_match']['fields'])
+        self.assertEqual(nested['inner_hits']['size'], 1)
+        self.assertIn('subscriptions.text', nested['inner_hits']['highlight']['fields'])
+
+    def test_source_has_matching_subscription(self):
+        self.mixin.elastic_response = Response(Search(), {'hits': {'total': {'value': 1}, 'hits': [{
+            '_id': '5', '_index': 'articles', '_source': {'title': 'Muons'},
+            'inner_hits': {'subscriptions': {'hits': {'total': {'value': 1}, 'hits': [{
+                '_index': 'articles', '_id': '5', '_nested': {'field': 'subscriptions', 'offset': 0},
+                '_source': {'id': 3, 'title': 'Decay', 'order': 1},
+                'highlight': {'subscriptions.text': ['The <em>muon</em> decays']},
+            }]}}},
+        }]}})
+
+        self.assertEqual(self.mixin.get_elastic_source(), [{
+            'title': 'Muons', 'id': 5,
+            'match': {
+                'subscription': {'id': 3, 'title': 'Decay', 'order': 1},
+                'highlight': ['The <em>muon</em> decays'],
+            },
+        }])
+
+
+class ElasticFacetTests(TestCase):
+    def setUp(self):
+        self.mixin = ElasticMixin()
+        self.mixin.elastic_document = ExampleDocument
+        self.mixin.setup_elastic_document_conf()
+
+    def test_facets_requested_with_hits(self):
+        search = fake_search([], 0)
+
+        self.mixin.elastic_full_query_handling(MagicMock(query_params={}), search)
+
+        search.aggs.bucket.assert_any_call('tags', 'terms', field='tags', size=50)
+        search.aggs.bucket.assert_any_call('category', 'terms', field='category', size=50)
+        search.execute.assert_called_once()
+
+    def test_facet_buckets(self):
+        aggregations = MagicMock()
+        aggregations.tags.buckets = [MagicMock(key='physics', doc_count=4), MagicMock(key='', doc_count=1)]
+        aggregations.category.buckets = [MagicMock(key='Basic', doc_count=2)]
+        self.mixin.elastic_response = MagicMock(aggregations=aggregations)
+
+        self.assertEqual(self.mixin.get_elastic_facets(), {
+            'tags': [{'value': 'physics', 'count': 4}],
+            'category': [{'value': 'Basic', 'count': 2}],
+        })
+
+
+class ElasticCursorTests(TestCase):
+    def setUp(self):
+        self.mixin = ElasticMixin()
+        self.mixin.elastic_document = ExampleDocument
+        self.mixin.setup_elastic_document_conf()
+
+    def request(self, **params):
+        return MagicMock(query_params=params)
+
+    def test_first_page_sorted_with_tiebreak(self):
+        search = fake_search([], 0)
+
+        self.mixin.elastic_cursor(self.request(ordering='-date_to_update'), search)
+
+        search.sort.assert_called_once_with({'date_to_update': {'order': 'desc'}}, {'id': {'order': 'asc'}})
+        search.extra.assert_not_called()
+
+    def test_search_sorted_by_score(self):
+        search = fake_search([], 0)
+
+        self.mixin.elastic_cursor(self.request(query='geant'), search)
+
+        search.sort.assert_called_once_with('_score', {'id': {'order': 'asc'}})
+
+    def test_cursor_replaces_offset(self):
+        sort_fields = self.mixin.get_cursor_sort_fields(self.request())
+        cursor = self.mixin.encode_cursor([15], sort_fields)
+        search = fake_search([], 0)
+        request = self.request(cursor=cursor, page='3')
+
+        self.mixin.elastic_pagination(request, search)
+        self.mixin.elastic_cursor(request, search)
+
+        search.extra.assert_any_call(size=10)
+        search.extra.assert_any_call(search_after=[15])
+        self.assertNotIn('from_', str(search.extra.call_args_list))
+
+    def test_cursor_from_other_ordering_rejected(self):
+        sort_fields = self.mixin.get_cursor_sort_fields(self.request(ordering='title_verbose.keyword'))
+        cursor = self.mixin.encode_cursor(['a', 1], sort_fields)
+
+        with self.assertRaises(DRFValidationError):
+            self.mixin.elastic_cursor(self.request(cursor=cursor), fake_search([], 0))
+
+    def test_no_next_cursor_on_last_page(self):
+        page = {'total': 1, 'hits': [{'id': 1}], 'after': [1]}
+
+        self.assertIsNone(self.mixin.get_next_cursor(self.request(), page))
+
+
+class ExampleListTests(AuthSettingsTest):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    @patch.object(ExampleDocument, 'search')
+    def test_list_from_source_with_total_pages(self, mock_search):
+        search = fake_search([
+            fake_hit(3, {
+                'title_verbose': 'Example', 'title_not_verbose': 'TSU_01', 'description': 'desc',
+                'date_to_update': '2024-05-01T00:00:00', 'tags': ['physics'], 'category': 'Basic',
+            }),
+            fake_hit(4, {'title_verbose': 'Other', 'description': 'desc', 'synchronized': True}),
+        ], 25)
+        mock_search.return_value = search
+        self.login_user()
+
+        response = self.client.get(reverse('examples-list'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0], {
+            'id': 3, 'title_verbose': 'Example', 'title_not_verbose': 'TSU_01', 'description': 'desc',
+            'date_to_update': '2024-05-01', 'tags': ['physics'], 'category': {'title': 'Basic'},
+        })
+        self.assertEqual(response.data[1]['category'], None)
+        self.assertEqual(response.data[-1], {
+            'pages_count': 3, 'next_cursor': None, 'facets': {'tags': [], 'category': []}})
+        search.execute.assert_called_once()
+
+    @patch.object(ExampleDocument, 'search')
+    def test_list_full_page_returns_next_cursor(self, mock_search):
+        hits = [fake_hit(pk, {'title_verbose': str(pk)}) for pk in range(1, 11)]
+        for hit in hits:
+            hit.meta.sort = ['2024-05-01', int(hit.meta.id)]
+        search = fake_search(hits, 25)
+        mock_search.return_value = search
+        self.login_user()
+
+        response = self.client.get(reverse('examples-list'), {'ordering': '-date_to_update'})
+        cursor = response.data[-1]['next_cursor']
+        response = self.client.get(reverse('examples-list'), {'ordering': '-date_to_update', 'cursor': cursor})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        search.extra.assert_any_call(search_after=['2024-05-01', 10])
+
+    @patch.object(ExampleDocument, 'search')
+    def test_list_invalid_cursor(self, mock_search):
+        mock_search.return_value = fake_search([], 0)
+        self.login_user()
+
+        response = self.client.get(reverse('examples-list'), {'cursor': 'not a cursor'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch.object(ExampleDocument, 'search')
+    def test_repeated_list_served_from_cache(self, mock_search):
+        search = fake_search([fake_hit(3, {'title_verbose': 'Example'})], 1)
+        mock_search.return_value = search
+        self.login_user()
+
+        first = self.client.get(reverse('examples-list'), {'tags': 'b,a', 'query': 'geant'})
+        second = self.client.get(reverse('examples-list'), {'query': 'geant', 'tags': 'a,b'})
+
+        self.assertEqual(first.data, second.data)
+        search.execute.assert_called_once()
+
+    @patch.object(ExampleDocument, 'search')
+    def test_other_page_not_served_from_cache(self, mock_search):
+        search = fake_search([], 0)
+        mock_search.return_value = search
+        self.login_user()
+
+        self.client.get(reverse('examples-list'), {'page': 1})
+        self.client.get(reverse('examples-list'), {'page': 2})
+
+        self.assertEqual(search.execute.call_count, 2)
+
+    @patch.object(ExampleDocument, 'search')
+    def test_version_bump_invalidates_cache(self, mock_search):
+        search = fake_search([], 0)
+        mock_search.return_value = search
+        self.login_user()
+
+        self.client.get(reverse('examples-list'))
+        bump_index_version('ExampleDocument')
+        self.client.get(reverse('examples-list'))
+
+        self.assertEqual(search.execute.call_count, 2)
+
+
+class SuggestTests(AuthSettingsTest):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def fake_suggest(self, options):
+        search = fake_search([], 0)
+        search.suggest.return_value = search
+        response = MagicMock()
+        response.suggest.titles = [MagicMock(options=[
+            MagicMock(_id=str(pk), _source=MagicMock(to_dict=MagicMock(return_value={'title_verbose': title})))
+            for pk, title in options
+        ])]
+        search.execute.return_value = response
+        return search
+
+    @patch.object(ExampleDocument, 'search')
+    def test_suggest_returns_ids_and_titles(self, mock_search):
+        search = self.fake_suggest([(1, 'Electromagnetic shower'), (2, 'Electron beam')])
+        mock_search.return_value = search
+        self.login_user()
+
+        response = self.client.get(reverse('examples-suggest'), {'query': 'Elec'})
+        self.client.get(reverse('examples-suggest'), {'query': 'elec'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [
+            {'id': 1, 'title_verbose': 'Electromagnetic shower'},
+            {'id': 2, 'title_verbose': 'Electron beam'},
+        ])
+        search.source.assert_called_once_with(['title_verbose'])
+        search.suggest.assert_called_once_with('titles', 'Elec', completion={
+            'field': 'title_suggest', 'size': 8, 'skip_duplicates': True})
+        search.execute.assert_called_once()
+
+    @patch.object(ExampleDocument, 'search')
+    def test_suggest_empty_query(self, mock_search):
+        self.login_user()
+
+        response = self.client.get(reverse('examples-suggest'), {'query': '  '})
+
+        self.assertEqual(response.data, [])
+        mock_search.assert_not_called()
+
+    @patch.object(ExampleDocument, 'search')
+    def test_suggest_elastic_unavailable(self, mock_search):
+        search = self.fake_suggest([])
+        search.execute.side_effect = ElasticConnectionError('es down')
+        mock_search.return_value = search
+        self.login_user()
+
+        response = self.client.get(reverse('examples-suggest'), {'query': 'Elec'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [])
+
+    def test_suggest_inputs_start_at_every_word(self):
+        self.assertEqual(
+            suggest_inputs('Electromagnetic shower test', 'TSU_01'),
+            ['Electromagnetic shower test', 'shower test', 'test', 'TSU_01']
+        )
@@ -1,4 +1,7 @@
+from datetime import timedelta
+
 from django.test import TestCase
+from django.utils import timezone
 
 from api.v1.serializers.examples_serializers import (
     ExampleForUserSerializer,
@@ -9,8 +12,10 @@ from api.v1.serializers.examples_serializers import (
 )
 
 from geant_examples.models import *
+from geant_examples.run_stats import invalidate_run_stats
 from tests.base import Base
 
+from rest_framework import serializers
 from rest_framework.exceptions import ErrorDetail
 
 
@@ -40,7 +45,8 @@ class ExampleForUserSerializerTestCase(Base):
                 'tags': [],
                 'params': {'v': '11'},
                 'example_id': 3,
-                'category': ''
+                'category': '',
+                'eta': None
              }
         )
 
@@ -160,3 +166,30 @@ class ExampleCommandPOSTSerializerTestCase(Base):
         self.assertFalse(serializer.is_valid())
         self.assertEqual(serializer.errors, {'non_field_errors': [ErrorDetail(
             string='ExampleCommand cannot be unattached to the user', code='invalid')]})
+
+
+class RunETASerializerTestCase(Base):
+    def setUp(self):
+        self.user = User.objects.create(username='eta_username', email='eta@gmail.com')
+        self.example = Example.objects.create(title_verbose='eta_ex', title_not_verbose='TSU_XX_01')
+        invalidate_run_stats(self.example.pk)
+        finished_at = timezone.now()
+        done = ExampleCommand.objects.create(
+            example=self.example, key_s3='key-s3-TSU_XX_01__v=1',
+            started_at=finished_at - timedelta(seconds=90), finished_at=finished_at)
+        UserExampleCommand.objects.create(
+            user=self.user, example_command=done, status=UserExampleCommand.StatusChoice.executed)
+        self.started_at = finished_at
+        running = ExampleCommand.objects.create(
+            example=self.example, key_s3='key-s3-TSU_XX_01__v=2', started_at=self.started_at)
+        UserExampleCommand.objects.create(user=self.user, example_command=running)
+
+    def test_eta_of_running_run(self):
+        runs = UserExampleCommand.objects.filter(user=self.user).order_by('status')
+        data = ExampleForUserSerializer(runs, many=True).data
+
+        self.assertEqual(
+            data[0]['eta'],
+            serializers.DateTimeField().to_representation(self.started_at + timedelta(seconds=90))
+        )
+        self.assertIsNone(data[1]['eta'])
@@ -1,6 +1,8 @@
 from uuid import uuid4
 
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from api.v1.serializers.geant_documentation_serializers import (
     FileSerializer,
@@ -166,4 +168,101 @@ class ArticleSerializerTestCase(Base):
         updated = serializer.save()
         self.assertEqual(updated.title, "Article Updated")
         self.assertEqual(updated.subscriptions.count(), 1)
-        self.assertEqual(updated.subscriptions.first().title, "Updated Plan")
\ No newline at end of file
+        self.assertEqual(updated.subscriptions.first().title, "Updated Plan")
+    def article_data(self, subscriptions, title="Article 1"):
+        return {
+            "title": title,
+            "description": "Quantum Basics",
+            "category": self.category.id,
+            "chapter": self.chapter.id,
+            "subscriptions": subscriptions,
+        }
+
+    def elements_data(self, count, files=1):
+        return [
+            {"text": f"Element {i}", "element_order": i, "type": "text", "files": [{"format": "webp"}] * files}
+            for i in range(count)
+        ]
+
+    def save_article(self, data, instance=None):
+        serializer = ArticleSerializer(instance=instance, data=data)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        return serializer.save()
+
+    def test_write_query_count_does_not_grow_with_payload(self):
+        def queries(count):
+            data = self.article_data([
+                {"title": f"Plan {i}", "subscription_order": i, "elements": self.elements_data(count)}
+                for i in range(count)
+            ], title=f"Article {count}")
+            with CaptureQueriesContext(connection) as context:
+                self.save_article(data)
+            return len(context)
+
+        self.assertEqual(queries(2), queries(6))
+
+    def test_update_keeps_rows_matched_by_id_and_uuid(self):
+        article = self.save_article(self.article_data([
+            {"title": "Plan", "subscription_order": 1, "elements": self.elements_data(2)}
+        ]))
+        sub = article.subscriptions.get()
+        first, second = sub.elements.order_by('element_order')
+        kept_file = first.files.get()
+
+        article = self.save_article(self.article_data([
+            {"id": sub.id, "title": "Renamed", "subscription_order": 1, "elements": [
+                {"id": first.id, "text": "Changed", "element_order": 5, "type": "text",
+                 "files": [{"uuid": str(kept_file.uuid), "format": "webp"}]},
+                {"text": "New", "element_order": 6, "type": "text", "files": []},
+            ]}
+        ]), instance=article)
+
+        sub = article.subscriptions.get()
+        self.assertEqual(sub.title, "Renamed")
+        self.assertEqual(
+            list(sub.elements.order_by('element_order').values_list('text', 'element_order')),
+            [("Changed", 5), ("New", 6)]
+        )
+        self.assertEqual(File.objects.get(pk=kept_file.pk).element_id, first.id)
+        self.assertFalse(Element.objects.filter(pk=second.pk).exists())
+        self.assertEqual(File.objects.filter(element__subscription__article=article).count(), 1)
+
+    def test_update_moves_element_out_of_replaced_subscription(self):
+        article = self.save_article(self.article_data([
+            {"title": "Plan", "subscription_order": 1, "elements": self.elements_data(1)}
+        ]))
+        element = Element.objects.get(subscription__article=article)
+        file = element.files.get()
+
+        article = self.save_article(self.article_data([
+            {"title": "Other plan", "subscription_order": 2, "elements": [
+                {"id": element.id, "text": "Moved", "element_order": 1, "type": "text",
+                 "files": [{"uuid": str(file.uuid), "format": "webp"}]},
+            ]}
+        ]), instance=article)
+
+        sub = article.subscriptions.get()
+        self.assertEqual(sub.title, "Other plan")
+        self.assertEqual(Element.objects.get(pk=element.pk).subscription_id, sub.id)
+        self.assertEqual(File.objects.get(pk=file.pk).element_id, element.id)
+
+    def test_ids_of_other_articles_are_not_taken_over(self):
+        other = self.save_article(self.article_data([
+            {"title": "Plan", "subscription_order": 1, "elements": []}
+        ]))
+        other_sub = other.subscriptions.get()
+
+        article = self.save_article(self.article_data([
+            {"id": other_sub.id, "title": "Plan", "subscription_order": 1, "elements": []}
+        ], title="Article 2"))
+
+        self.assertNotEqual(article.subscriptions.get().pk, other_sub.pk)
+        self.assertEqual(Subscription.objects.get(pk=other_sub.pk).article_id, other.id)
+
+    def test_too_many_files_for_element(self):
+        serializer = ArticleSerializer(data=self.article_data([
+            {"title": "Plan", "subscription_order": 1, "elements": self.elements_data(1, files=9)}
+        ]))
+
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('subscriptions', serializer.errors)
@@ -1,14 +1,26 @@
-from unittest.mock import patch, MagicMock
+import os
+import tempfile
+from datetime import timedelta
+from unittest.mock import patch
 
+from django.conf import settings
+from django.test import override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIRequestFactory, force_authenticate
 
 from api.v1.views.examples_views import ExampleCommandViewSet
-from geant_examples.models import Example, ExampleCommand, UserExampleCommand
+from geant_examples import scheduler
+from geant_examples.models import Command, Example, ExampleCommand, ExampleSweep, UserExampleCommand
+from geant_examples.run_params import canonical_params
+from geant_examples.scheduler import QueueFull
+from geant_examples.tasks import dispatch_runs
 from tests.test_api.test_v1.test_views.auth_test_base import AuthSettingsTest
+from tests.test_geant_examples.test_scheduler import FakeRedis, SCHEDULER
 
 from file_client.files_clients import ReadOnlyClient
+from file_client.cache import CachedFile
 from file_client.exceptions import FileClientException
 
 
@@ -17,7 +29,9 @@ class ExampleCommandViewSetTestCase(AuthSettingsTest):
         self.example = Example.objects.create(
             title_verbose='test_verbose', title_not_verbose='TSU_99'
         )
-        self.params = {'params': {'velocity': ['144', '4']}}
+        Command.objects.create(title='velocity', default='100', order_index=4, example=self.example)
+        Command.objects.create(title='mass', default='1.5', order_index=2, example=self.example)
+        self.params = {'params': {'velocity': '144'}}
         self.key_s3 = 'key-s3-TSU_99___velocity=144'
         self.factory = APIRequestFactory()
         self.url = reverse('example-example-command-list',
@@ -25,14 +39,21 @@ class ExampleCommandViewSetTestCase(AuthSettingsTest):
         self.view = ExampleCommandViewSet()
 
     def test_generate_key_s3(self):
-        str_params = {
-            str(v[-1]).replace(' ', '--'): str(v[0]).replace(' ', '--')
-            for k, v in self.params['params'].items()
+        params = {'velocity': ['144 m/s', 4], 'mass': ['1.5', 2]}
+        self.assertEqual('key-s3-TSU_99__2=1.5__4=144--m/s',
+                         ExampleCommandViewSet._generate_key_s3(self.example.title_not_verbose, params))
+
+    def test_generate_key_s3_is_canonical(self):
+        commands = self.example.commands.all()
+        keys = {
+            ExampleCommandViewSet._generate_key_s3(self.example.title_not_verbose, canonical_params(commands, params))
+            for params in (
+                {'velocity': '144'},
+                {'mass': '1.5', 'velocity': '144.0'},
+                {'velocity': 144, 'mass': '1.50', 'colour': 'red'},
+            )
         }
-        correct_meaning = f'key-s3-{self.example.title_not_verbose}__' + \
-            '__'.join(f'{k}={v}' for k, v in str_params.items())
-        self.assertEqual(correct_meaning,
-                         ExampleCommandViewSet._generate_key_s3(self.example.title_not_verbose, self.params['params']))
+        self.assertEqual(keys, {'key-s3-TSU_99__2=1.5__4=144'})
 
     def test_add_user_in_example_command(self):
         ExampleCommandViewSet._add_user_in_example_command(
@@ -102,26 +123,168 @@ class ExampleCommandViewSetTestCase(AuthSettingsTest):
         self.assertEqual(
             response.data, {'detail': 'Example already executed, wait for results'})
 
-    @patch('api.v1.views.examples_views.requests.post')
-    def test_run_example_failure(self, mock_post):
-        mock_post.return_value = MagicMock(
-            status_code=400,
-            json=lambda: {'error': 'Bad request'},
-            headers={'Content-Type': 'application/json'}
+    @override_settings(GEANT_SCHEDULER=SCHEDULER)
+    @patch('geant_examples.tasks.dispatch_runs.delay', side_effect=dispatch_runs)
+    @patch('geant_examples.tasks.run_example_task.delay')
+    @patch('api.v1.views.examples_views.ReadOnlyClient.download_cached')
+    def test_create_dispatches_example_run(self, mock_download, mock_delay, mock_dispatch):
+        mock_download.side_effect = FileClientException(404, {'detail': 'Not found'})
+        self.login_user()
+
+        with patch('geant_examples.scheduler.get_connection', return_value=FakeRedis()):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(self.url, self.params, content_type='application/json')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        ex_command = ExampleCommand.objects.get(example=self.example)
+        self.assertEqual(response.data['id'], ex_command.id)
+        self.assertEqual(response.data['key_s3'], ex_command.key_s3)
+        self.assertEqual(response.data['queue_position'], 1)
+        self.assertIn(self.user, ex_command.users.all())
+        mock_delay.assert_called_once_with(
+            ex_command.key_s3,
+            {'title': self.example.title_not_verbose, 'commands': [{'mass': '1.5'}, {'velocity': '144'}]}
         )
+        self.assertEqual(ex_command.params, {'2': '1.5', '4': '144'})
 
-        request = self.factory.post(self.url, self.params, format='json')
-        force_authenticate(request, user=self.user)
+    @patch('geant_examples.tasks.scheduler.submit_many')
+    @patch('api.v1.views.examples_views.scheduler.check_capacity', side_effect=QueueFull(retry_after=120))
+    @patch('api.v1.views.examples_views.ReadOnlyClient.download_cached')
+    def test_create_when_queue_is_full(self, mock_download, mock_check, mock_submit):
+        mock_download.side_effect = FileClientException(404, {'detail': 'Not found'})
+        self.login_user()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, self.params, content_type='application/json')
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '120')
+        self.assertFalse(ExampleCommand.objects.filter(example=self.example).exists())
+        mock_submit.assert_not_called()
+
+    @override_settings(GEANT_SCHEDULER=SCHEDULER)
+    @patch('api.v1.views.examples_views.ReadOnlyClient.download_cached')
+    def test_create_queues_run_only_after_commit(self, mock_download):
+        mock_download.side_effect = FileClientException(404, {'detail': 'Not found'})
+        self.login_user()
+
+        with patch('geant_examples.scheduler.submit_many') as mock_submit, \
+                patch('geant_examples.scheduler.get_connection', return_value=FakeRedis()):
+            with self.captureOnCommitCallbacks() as callbacks:
+                response = self.client.post(self.url, self.params, content_type='application/json')
+            mock_submit.assert_not_called()
+
+            with patch('geant_examples.tasks.dispatch_runs.delay'):
+                for callback in callbacks:
+                    callback()
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        mock_submit.assert_called_once()
+        self.assertEqual(mock_submit.call_args.args[1][0][0], response.data['key_s3'])
+
+    @patch('geant_examples.tasks.run_example_task.delay')
+    @patch('api.v1.views.examples_views.ReadOnlyClient.download_cached')
+    def test_create_attaches_to_run_in_flight(self, mock_download, mock_delay):
+        mock_download.side_effect = FileClientException(404, {'detail': 'Not found'})
+        key_s3 = ExampleCommandViewSet._generate_key_s3(
+            self.example.title_not_verbose, canonical_params(self.example.commands.all(), {'velocity': '144.00'}))
+        ex_command = ExampleCommand.objects.create(key_s3=key_s3, example=self.example)
+        ex_command.users.add(self.staff)
+        self.login_user()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, self.params, content_type='application/json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(ExampleCommand.objects.filter(key_s3=key_s3).count(), 1)
+        self.assertIn(self.user, ex_command.users.all())
+        mock_delay.assert_not_called()
+
+    def test_create_rejects_malformed_params(self):
+        self.login_user()
+
+        for params in (['velocity', '144'], 'velocity=144', {'velocity': ['144', '4']}):
+            with self.subTest(params=params):
+                response = self.client.post(self.url, {'params': params}, content_type='application/json')
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertFalse(ExampleCommand.objects.filter(example=self.example).exists())
+
+    @patch('api.v1.views.examples_views.ReadOnlyClient.download_cached')
+    def test_create_rejects_too_long_params(self, mock_download):
+        self.login_user()
+
+        response = self.client.post(self.url, {'params': {'velocity': '1' * 1100}}, content_type='application/json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(ExampleCommand.objects.filter(example=self.example).exists())
+        mock_download.assert_not_called()
 
-        self.view.setup(request=request, kwargs={
-                        'example_pk': self.example.id})
+    def test_create_finds_result_stored_under_legacy_key(self):
+        with tempfile.NamedTemporaryFile(delete=False) as file:
+            file.write(b'zip archive')
+        self.addCleanup(os.remove, file.name)
+        legacy_key_s3 = 'key-s3-TSU_99__4=144.0'
 
-        response = self.view._run_example(
-            request, self.example, self.params['params'])
+        def download(client):
+            if client.filename == legacy_key_s3 + '.zip':
+                return CachedFile(path=file.name, etag='etag', size=11, modified=0)
+            raise FileClientException(404, {'detail': 'Not found'})
+
+        self.login_user()
+
+        with patch.object(ReadOnlyClient, 'download_cached', autospec=True, side_effect=download):
+            response = self.client.post(self.url, {'params': {'velocity': '144.0'}}, content_type='application/json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), b'zip archive')
+        self.assertIn(self.user, ExampleCommand.objects.get(key_s3=legacy_key_s3).users.all())
+
+    @patch('geant_examples.tasks.run_example_task.delay')
+    @patch('api.v1.views.examples_views.ReadOnlyClient.download_cached')
+    def test_create_attaches_to_run_under_legacy_key(self, mock_download, mock_delay):
+        mock_download.side_effect = FileClientException(404, {'detail': 'Not found'})
+        ex_command = ExampleCommand.objects.create(key_s3='key-s3-TSU_99__4=144.0', example=self.example)
+        ex_command.users.add(self.staff)
+        self.login_user()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, {'params': {'velocity': '144.0'}}, content_type='application/json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(ExampleCommand.objects.filter(example=self.example).count(), 1)
+        self.assertIn(self.user, ex_command.users.all())
+        mock_delay.assert_not_called()
+
+    @patch('api.v1.views.examples_views.ReadOnlyClient.download_cached')
+    def test_download_resumes_from_range(self, mock_download):
+        with tempfile.NamedTemporaryFile(delete=False) as file:
+            file.write(b'zip archive')
+        self.addCleanup(os.remove, file.name)
+        mock_download.return_value = CachedFile(path=file.name, etag='etag', size=11, modified=0)
+        ex_command = ExampleCommand.objects.create(key_s3='key-s3-download', example=self.example)
+        ex_command.users.add(self.user)
+        self.login_user()
+        url = reverse('example-example-command-download', args=[self.example.pk, ex_command.pk])
+
+        response = self.client.get(url, HTTP_RANGE='bytes=4-')
+
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b''.join(response.streaming_content), b'archive')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="key-s3-download.zip"')
+
+    @patch('api.v1.views.examples_views.ReadOnlyClient.download_cached')
+    def test_download_requires_attached_user(self, mock_download):
+        ex_command = ExampleCommand.objects.create(key_s3='key-s3-download', example=self.example)
+        ex_command.users.add(self.staff)
+        self.login_user()
+        url = reverse('example-example-command-download', args=[self.example.pk, ex_command.pk])
+
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        mock_download.assert_not_called()
 
-        self.assertEqual(response.status_code, 400)
-        self.assertEqual(response.data, {'error': 'Bad request'})
-        mock_post.assert_called_once()
 
 class ExampleCommandUpdateStatusAPIViewTestCAse(AuthSettingsTest):
     def setUp(self):
@@ -153,3 +316,175 @@ class ExampleCommandUpdateStatusAPIViewTestCAse(AuthSettingsTest):
             reverse('update-example-status'), data=data)
         self.us_ex_command.refresh_from_db()
         self.assertEqual(self.us_ex_command.status, 1)
+
+
+@override_settings(GEANT_SCHEDULER=SCHEDULER)
+class ExampleSweepViewSetTestCase(AuthSettingsTest):
+    def setUp(self):
+        self.example = Example.objects.create(title_verbose='test_verbose', title_not_verbose='TSU_97')
+        Command.objects.create(title='energy', default='1', order_index=1, example=self.example)
+        Command.objects.create(title='particle', default='e-', order_index=2, example=self.example)
+        self.url = reverse('example-sweep-list', kwargs={'example_pk': self.example.id})
+        self.redis = FakeRedis()
+        patcher = patch('geant_examples.scheduler.get_connection', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.login_user()
+
+    def key(self, energy, particle='e-'):
+        return f'key-s3-TSU_97__1={energy}__2={particle}'
+
+    def post(self, data, stored=(), during_probe=None):
+        def probe(clients):
+            if during_probe:
+                during_probe()
+            return {client.filename: client.filename[:-4] in stored for client in clients}
+
+        with patch('api.v1.views.examples_views.ReadOnlyClient.exists_many', side_effect=probe):
+            with patch('geant_examples.tasks.dispatch_runs.delay') as mock_dispatch:
+                with self.captureOnCommitCallbacks(execute=True):
+                    response = self.client.post(self.url, data, content_type='application/json')
+        self.mock_dispatch = mock_dispatch
+        return response
+
+    def queued(self):
+        return sorted(job['key_s3'] for job in scheduler.take_jobs())
+
+    def test_grid_queues_every_point(self):
+        response = self.post({'grid': {'energy': ['1', '2', '3'], 'particle': ['e-']}})
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['summary'], {'total': 3, 'executing': 3, 'executed': 0, 'failure': 0})
+        self.assertEqual(
+            [point['params'] for point in response.data['points']],
+            [{'1': '1', '2': 'e-'}, {'1': '2', '2': 'e-'}, {'1': '3', '2': 'e-'}]
+        )
+        self.assertEqual(ExampleCommand.objects.filter(example=self.example, users=self.user).count(), 3)
+        self.mock_dispatch.assert_called_once()
+        self.assertEqual(self.queued(), [self.key(1)])
+
+    def test_known_and_stored_points_are_not_queued(self):
+        finished = ExampleCommand.objects.create(key_s3=self.key(1), example=self.example)
+        UserExampleCommand.objects.create(
+            user=self.staff, example_command=finished, status=UserExampleCommand.StatusChoice.executed)
+
+        with patch('geant_examples.scheduler.submit_many', wraps=scheduler.submit_many) as mock_submit:
+            response = self.post({'points': [{'energy': str(i), 'particle': 'e-'} for i in (1, 2, 3)]}, stored={self.key(2)})
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['summary'], {'total': 3, 'executing': 1, 'executed': 2, 'failure': 0})
+        self.assertEqual([job[0] for job in mock_submit.call_args.args[1]], [self.key(3)])
+        self.assertIn(self.user, finished.users.all())
+
+    def test_points_under_legacy_keys_are_reused(self):
+        legacy = ExampleCommand.objects.create(key_s3='key-s3-TSU_97__1=2.0__2=e-', example=self.example)
+        UserExampleCommand.objects.create(
+            user=self.staff, example_command=legacy, status=UserExampleCommand.StatusChoice.executed)
+
+        response = self.post(
+            {'points': [{'energy': '2.0', 'particle': 'e-'}, {'energy': '3.0', 'particle': 'e-'}]},
+            stored={'key-s3-TSU_97__1=3.0__2=e-'}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['summary'], {'total': 2, 'executing': 0, 'executed': 2, 'failure': 0})
+        self.assertEqual(
+            set(ExampleCommand.objects.filter(example=self.example).values_list('key_s3', flat=True)),
+            {'key-s3-TSU_97__1=2.0__2=e-', 'key-s3-TSU_97__1=3.0__2=e-'}
+        )
+        self.assertIn(self.user, legacy.users.all())
+        self.assertEqual(self.queued(), [])
+
+    def test_too_long_points_rejected(self):
+        response = self.post({'points': [{'energy': '1' * 1100, 'particle': 'e-'}]})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {'detail': 'Run parameters are too long'})
+        self.assertFalse(ExampleCommand.objects.filter(example=self.example).exists())
+
+    def test_runs_inserted_concurrently_are_not_queued(self):
+        def concurrent_run():
+            ex_command = ExampleCommand.objects.create(key_s3=self.key(2), example=self.example)
+            ex_command.users.add(self.staff)
+
+        response = self.post({'grid': {'energy': ['1', '2'], 'particle': ['e-']}}, during_probe=concurrent_run)
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(self.queued(), [self.key(1)])
+        self.assertEqual(ExampleCommand.objects.filter(key_s3=self.key(2)).count(), 1)
+        self.assertIn(self.user, ExampleCommand.objects.get(key_s3=self.key(2)).users.all())
+
+    def test_stale_runs_are_queued_again(self):
+        for energy in (1, 2):
+            ex_command = ExampleCommand.objects.create(key_s3=self.key(energy), example=self.example)
+            ex_command.users.add(self.staff)
+        UserExampleCommand.objects.filter(example_command__key_s3=self.key(1)).update(
+            creation_date=timezone.now() - timedelta(seconds=SCHEDULER['run_timeout'] + 1))
+
+        with patch('geant_examples.scheduler.submit_many', wraps=scheduler.submit_many) as mock_submit:
+            response = self.post({'grid': {'energy': ['1', '2'], 'particle': ['e-']}})
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual([job[0] for job in mock_submit.call_args.args[1]], [self.key(1)])
+
+    def test_retrieve_reports_point_statuses(self):
+        sweep_id = self.post({'grid': {'energy': ['1', '2'], 'particle': ['e-']}}).data['id']
+        UserExampleCommand.objects.filter(example_command__key_s3=self.key(1)).update(
+            status=UserExampleCommand.StatusChoice.failure)
+
+        response = self.client.get(reverse('example-sweep-detail', args=[self.example.id, sweep_id]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['summary'], {'total': 2, 'executing': 1, 'executed': 0, 'failure': 1})
+        self.assertEqual(
+            {point['key_s3']: point['status'] for point in response.data['points']},
+            {self.key(1): UserExampleCommand.StatusChoice.failure, self.key(2): UserExampleCommand.StatusChoice.executing}
+        )
+
+    def test_sweeps_of_other_users_are_hidden(self):
+        sweep_id = self.post({'grid': {'energy': ['1']}}).data['id']
+        self.login_staff()
+
+        response = self.client.get(reverse('example-sweep-detail', args=[self.example.id, sweep_id]))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalid_sweeps(self):
+        for data in (
+            {},
+            {'grid': {'energy': ['1']}, 'points': [{'energy': '1'}]},
+            {'grid': {'mass': ['1']}},
+            {'grid': {'energy': [str(i) for i in range(SCHEDULER['max_user_queue'] + 1)]}},
+        ):
+            with self.subTest(data=data), override_settings(EXAMPLE_SWEEP_MAX_POINTS=SCHEDULER['max_user_queue']):
+                self.assertEqual(self.post(data).status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertFalse(ExampleCommand.objects.filter(example=self.example).exists())
+
+    def test_huge_grid_rejected_before_expanding(self):
+        grid = {'energy': [str(i) for i in range(10 ** 5)], 'particle': [str(i) for i in range(10 ** 5)]}
+
+        with patch('api.v1.serializers.examples_serializers.product') as mock_product:
+            response = self.post({'grid': grid})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        mock_product.assert_not_called()
+
+    def test_too_many_points_rejected(self):
+        points = [{'energy': str(i)} for i in range(settings.EXAMPLE_SWEEP_MAX_POINTS + 1)]
+
+        self.assertEqual(self.post({'points': points}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_duplicate_points_are_merged(self):
+        response = self.post({'points': [{'energy': '1', 'particle': 'e-'}, {'particle': 'e-', 'energy': '1'}]})
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['summary']['total'], 1)
+
+    def test_queue_full(self):
+        response = self.post({'grid': {'energy': [str(i) for i in range(SCHEDULER['max_user_queue'] + 1)]}})
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+        self.assertFalse(ExampleCommand.objects.filter(example=self.example).exists())
+        self.assertFalse(ExampleSweep.objects.exists())
@@ -1,19 +1,28 @@
+import json
+import os
+import tempfile
 import uuid
+import zipfile
 from io import BytesIO
 from unittest.mock import patch
 
 from PIL import Image
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
 from rest_framework import status
 from rest_framework.reverse import reverse
 from rest_framework.test import APIRequestFactory, force_authenticate
 
 from api.v1.views.geant_documentation_views import ArticleViewSet, ElementViewSet, SubscriptionViewSet
+from file_client.cache import CachedFile
 from file_client.exceptions import FileClientException
-from geant_documentation.models import Article, Category, Chapter, Subscription, Element
+from geant_documentation.cache import article_detail_key
+from geant_documentation.models import Article, ArticleUser, Category, Chapter, Subscription, Element, File
 from tests.test_api.test_v1.test_views.auth_test_base import AuthSettingsTest
 
 
+@override_settings(ARTICLE_DETAIL_CACHE_ORIGINS=['http://testserver', 'http://localhost', 'http://127.0.0.1'])
 class ArticleViewSetTestCase(AuthSettingsTest):
 
     def setUp(self):
@@ -44,7 +53,7 @@ class ArticleViewSetTestCase(AuthSettingsTest):
         force_authenticate(request, user=self.user)
         response = view(request, pk=self.article.id)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertIn('subscriptions', response.data)
+        self.assertIn('subscriptions', json.loads(response.content))
 
     def test_create_article_requires_auth(self):
         data = {
@@ -108,6 +117,53 @@ class ArticleViewSetTestCase(AuthSettingsTest):
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertFalse(Article.objects.filter(id=self.article.id).exists())
 
+    def test_retrieve_served_from_cache(self):
+        Element.objects.create(text='text', element_order=1, subscription=self.subscription)
+        first = self.client.get(self.detail_url)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(self.detail_url)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second['Content-Type'], 'application/json')
+        self.assertEqual(first.content, second.content)
+
+    def test_retrieve_cache_invalidated_by_element_change(self):
+        element = Element.objects.create(text='old text', element_order=1, subscription=self.subscription)
+        self.client.get(self.detail_url)
+
+        element.text = 'new text'
+        element.save()
+        response = self.client.get(self.detail_url)
+
+        elements = json.loads(response.content)['subscriptions'][0]['elements']
+        self.assertEqual(elements[0]['text'], 'new text')
+
+    def test_retrieve_cache_keeps_origins_apart(self):
+        element = Element.objects.create(element_order=1, type='webp', subscription=self.subscription)
+        File.objects.create(element=element, format='webp')
+
+        self.client.get(self.detail_url, HTTP_HOST='localhost')
+        response = self.client.get(self.detail_url, HTTP_HOST='127.0.0.1')
+
+        file_data = json.loads(response.content)['subscriptions'][0]['elements'][0]['files'][0]
+        self.assertTrue(file_data['url'].startswith('http://127.0.0.1/'))
+
+    def test_retrieve_cache_skips_unknown_origins(self):
+        response = self.client.get(self.detail_url, HTTP_X_FORWARDED_PORT='31337')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(cache.get(article_detail_key(self.article.id, 'http://testserver:31337')))
+
+    def test_retrieve_cache_invalidated_by_article_users(self):
+        self.client.get(self.detail_url)
+
+        ArticleUser.objects.create(article=self.article, user=self.user)
+        self.assertEqual(json.loads(self.client.get(self.detail_url).content)['users'], [self.user.id])
+
+        self.article.users.remove(self.user)
+        self.assertEqual(json.loads(self.client.get(self.detail_url).content)['users'], [])
+
 
 class SubscriptionViewSetTestCase(AuthSettingsTest):
     def setUp(self):
@@ -313,7 +369,7 @@ class FileViewSetTestCase(AuthSettingsTest):
         mock_handle.assert_called_once()
         mock_task.assert_called_once_with("/fake/path/file.csv", self.uuid)
 
-    @patch('file_client.files_clients.ReadOnlyClient.delete')
+    @patch('file_client.files_clients.DocumentationGraphicClient.delete')
     def test_delete_ok(self, mock_delete):
         self.login_user()
         url = reverse('file-manage', args=[self.uuid, 'csv'])
@@ -323,17 +379,136 @@ class FileViewSetTestCase(AuthSettingsTest):
         self.assertEqual(response.data, {"detail": "Image deleted"})
         mock_delete.assert_called_once()
 
-    @patch('file_client.files_clients.ReadOnlyClient.download')
+    def cached_file(self, content=b'binary content'):
+        with tempfile.NamedTemporaryFile(delete=False) as file:
+            file.write(content)
+        self.addCleanup(os.remove, file.name)
+        return CachedFile(path=file.name, etag='etag', size=len(content), modified=784111777)
+
+    @patch('file_client.files_clients.ReadOnlyClient.download_cached')
     def test_retrieve_ok(self, mock_download):
         self.login_user()
-        mock_download.return_value = BytesIO(b'binary content')
+        mock_download.return_value = self.cached_file()
         url = reverse('file-manage', args=[self.uuid, 'webp'])
         response = self.client.get(url)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.get('Content-Disposition'), f'attachment; filename="{self.uuid}.webp"')
+        self.assertEqual(response['ETag'], '"etag"')
+        self.assertEqual(response['Last-Modified'], 'Sun, 06 Nov 1994 08:49:37 GMT')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(b''.join(response.streaming_content), b'binary content')
+
+    @patch('file_client.files_clients.ReadOnlyClient.download_cached', autospec=True)
+    def test_retrieve_image_variant(self, mock_download):
+        cached = self.cached_file()
+        requested = []
+
+        def download_cached(client):
+            requested.append(client.filename)
+            if client.filename == f'{self.uuid}.webp':
+                return cached
+            raise FileClientException(404, {"detail": "Downloaded file not found S3"})
+
+        mock_download.side_effect = download_cached
+        url = reverse('file-manage', args=[self.uuid, 'webp'])
+
+        response = self.client.get(url, {'size': 'thumbnail'}, HTTP_ACCEPT='image/webp,*/*')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(requested, [f'{self.uuid}_thumbnail.webp', f'{self.uuid}.webp'])
+        self.assertIn('Accept', response['Vary'])
+
+    @patch('file_client.files_clients.ReadOnlyClient.download_cached', autospec=True)
+    def test_retrieve_summary(self, mock_download):
+        summary = self.cached_file(b'{"x":"x","rows":2,"series":[]}')
+        mock_download.side_effect = lambda client: summary if client.filename == f'{self.uuid}_summary.json' else None
+        url = reverse('file-manage', args=[self.uuid, 'csv'])
+
+        response = self.client.get(url, {'summary': ''})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(b''.join(response.streaming_content), b'{"x":"x","rows":2,"series":[]}')
+
+    @patch('api.v1.views.geant_documentation_views.LocalFileCache')
+    @patch('file_client.files_clients.ReadOnlyClient.download_cached', autospec=True)
+    def test_retrieve_summary_built_for_old_graphic(self, mock_download, mock_cache):
+        source = self.cached_file(b'x,y\n1,2\n2,4\n')
+
+        def download_cached(client):
+            if client.filename == f'{self.uuid}.csv':
+                return source
+            raise FileClientException(404, {"detail": "Downloaded file not found S3"})
+
+        mock_download.side_effect = download_cached
+        mock_cache.return_value.put.return_value = self.cached_file(b'built')
+        url = reverse('file-manage', args=[self.uuid, 'csv'])
+
+        response = self.client.get(url, {'summary': ''})
+
+        self.assertEqual(b''.join(response.streaming_content), b'built')
+        name, chunks = mock_cache.return_value.put.call_args.args
+        self.assertEqual(name, f'{self.uuid}_summary.json')
+        self.assertEqual(json.loads(chunks[0])['series'], [{'name': 'y', 'points': [[1.0, 2.0], [2.0, 4.0]]}])
+
+    @patch('file_client.files_clients.ReadOnlyClient.download_cached')
+    def test_retrieve_not_modified(self, mock_download):
+        mock_download.return_value = self.cached_file()
+        url = reverse('file-manage', args=[self.uuid, 'webp'])
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH='"etag"')
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], '"etag"')
 
-    @patch('file_client.files_clients.ReadOnlyClient.download')
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE='Sun, 06 Nov 1994 08:49:37 GMT')
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @patch('file_client.files_clients.ReadOnlyClient.download_cached')
+    def test_retrieve_range(self, mock_download):
+        mock_download.return_value = self.cached_file()
+        url = reverse('file-manage', args=[self.uuid, 'webp'])
+
+        response = self.client.get(url, HTTP_RANGE='bytes=7-')
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(response['Content-Range'], 'bytes 7-13/14')
+        self.assertEqual(response['Content-Length'], '7')
+        self.assertEqual(b''.join(response.streaming_content), b'content')
+
+        response = self.client.get(url, HTTP_RANGE='bytes=0-5')
+        self.assertEqual(response['Content-Range'], 'bytes 0-5/14')
+        self.assertEqual(b''.join(response.streaming_content), b'binary')
+
+        response = self.client.get(url, HTTP_RANGE='bytes=-3')
+        self.assertEqual(response['Content-Range'], 'bytes 11-13/14')
+        self.assertEqual(b''.join(response.streaming_content), b'ent')
+
+    @patch('file_client.files_clients.ReadOnlyClient.download_cached')
+    def test_retrieve_range_not_satisfiable(self, mock_download):
+        mock_download.return_value = self.cached_file()
+        url = reverse('file-manage', args=[self.uuid, 'webp'])
+
+        response = self.client.get(url, HTTP_RANGE='bytes=14-')
+
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(response['Content-Range'], 'bytes */14')
+
+    @patch('file_client.files_clients.ReadOnlyClient.download_cached')
+    def test_retrieve_range_ignored(self, mock_download):
+        mock_download.return_value = self.cached_file()
+        url = reverse('file-manage', args=[self.uuid, 'webp'])
+
+        stale = self.client.get(url, HTTP_RANGE='bytes=7-', HTTP_IF_RANGE='"old"')
+        multiple = self.client.get(url, HTTP_RANGE='bytes=0-1,4-5')
+
+        for response in (stale, multiple):
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(b''.join(response.streaming_content), b'binary content')
+
+    @patch('file_client.files_clients.ReadOnlyClient.download_cached')
     def test_retrieve_not_found(self, mock_download):
         self.login_user()
         mock_download.side_effect = FileClientException(404, {"detail": "Not found on disk"})
@@ -345,6 +520,81 @@ class FileViewSetTestCase(AuthSettingsTest):
         self.assertEqual(response.data, {"detail": "Not found on disk"})
 
 
+
+class FileBatchAPIViewTestCase(AuthSettingsTest):
+    def setUp(self):
+        self.url = reverse('file-batch')
+        self.found = str(uuid.uuid4())
+        self.missing = str(uuid.uuid4())
+        with tempfile.NamedTemporaryFile(delete=False) as file:
+            file.write(b'image bytes')
+        self.addCleanup(os.remove, file.name)
+        self.cached = CachedFile(path=file.name, etag='etag', size=11, modified=784111777)
+
+    def download_cached(self, client):
+        if client.filename.startswith(self.found):
+            return self.cached
+        raise FileClientException(404, {'detail': 'Downloaded file not found S3'})
+
+    def read_zip(self, response):
+        return zipfile.ZipFile(BytesIO(b''.join(response.streaming_content)))
+
+    def test_get_zip_of_found_files(self):
+        with patch('file_client.files_clients.ReadOnlyClient.download_cached', autospec=True,
+                   side_effect=self.download_cached):
+            response = self.client.get(self.url, {'files': f'{self.found}.webp,{self.missing}.csv'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        self.assertEqual(response['X-Missing-Files'], f'{self.missing}.csv')
+        archive = self.read_zip(response)
+        self.assertEqual(archive.namelist(), [f'{self.found}.webp'])
+        self.assertEqual(archive.read(f'{self.found}.webp'), b'image bytes')
+
+    def test_get_invalid_names(self):
+        for files in ['', 'not-a-uuid.webp', f'{self.found}.zip']:
+            response = self.client.get(self.url, {'files': files})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch('api.v1.views.geant_documentation_views.render_and_upload_documentation_files_task.delay')
+    @patch('api.v1.views.geant_documentation_views.handle_file_upload')
+    def test_post_dispatches_one_task(self, mock_handle, mock_task):
+        mock_handle.side_effect = lambda file: f'/fake/path/{file.name}'
+        self.login_staff()
+
+        response = self.client.post(self.url, data={
+            f'{self.found}.webp': create_temp_file(),
+            f'{self.missing}.csv': SimpleUploadedFile('graphic.csv', b'x,y\n1,2', content_type='text/csv'),
+        }, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        mock_task.assert_called_once_with([
+            (f'/fake/path/{self.found}-test_file.png', self.found, 'webp'),
+            (f'/fake/path/{self.missing}-graphic.csv', self.missing, 'csv'),
+        ])
+
+    def test_post_requires_staff(self):
+        self.login_user()
+        response = self.client.post(self.url, data={f'{self.found}.webp': create_temp_file()}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_article_files(self):
+        article = Article.objects.create(title='Batch article', description='desc')
+        subscription = Subscription.objects.create(title='Sub', subscription_order=1, article=article)
+        element = Element.objects.create(element_order=1, type=Element.TypeChoice.IMAGE, subscription=subscription)
+        File.objects.create(uuid=self.found, format='webp', element=element)
+        File.objects.create(uuid=self.missing, format='webp', element=element)
+
+        with patch('file_client.files_clients.ReadOnlyClient.download_cached', autospec=True,
+                   side_effect=self.download_cached):
+            response = self.client.get(reverse('articles-files', kwargs={'pk': article.pk}))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Disposition'], f'attachment; filename="article_{article.pk}.zip"')
+        self.assertEqual(self.read_zip(response).namelist(), [f'{self.found}.webp'])
+
+
 def create_temp_file():
     image = Image.new('RGB', (100, 100), color='blue')
     file_io = BytesIO()
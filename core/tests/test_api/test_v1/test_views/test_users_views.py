@@ -1,8 +1,8 @@
 import io
-from io import BytesIO
 
 from PIL import Image
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework import status
 
@@ -171,17 +171,54 @@ class UserProfileImageViewSetTestCase(AuthSettingsTest):
         self.assertEqual(response.data, {'detail': 'Image deleted'})
         mock_delete.assert_called_once()
 
-    @patch('file_client.files_clients.ProfileImageRendererClient.download')
+    @patch('file_client.files_clients.ProfileImageRendererClient.download_chunks')
     def test_download_image_ok(self, mock_download):
         self.login_user()
-        mock_download.return_value = BytesIO(b"image data")
+        mock_download.return_value = iter([b"image ", b"data"])
 
         response = self.client.get(self.url)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.getvalue(), b"image data")
+        self.assertTrue(response.streaming)
+        self.assertEqual(b''.join(response.streaming_content), b"image data")
+        self.assertEqual(response['Content-Disposition'], f'attachment; filename="{self.user.uuid}.webp"')
 
-    @patch('file_client.files_clients.ProfileImageRendererClient.download')
+    @override_settings(IMAGE_FALLBACK_FORMATS=['jpeg'])
+    @patch('file_client.files_clients.ProfileImageRendererClient.download_chunks', autospec=True)
+    def test_download_image_variant(self, mock_download):
+        self.login_user()
+        mock_download.side_effect = lambda client: iter([client.filename.encode()])
+
+        response = self.client.get(self.url, {'size': 'thumbnail'}, HTTP_ACCEPT='image/png,image/*;q=0.8')
+
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(b''.join(response.streaming_content), f'{self.user.uuid}_thumbnail.jpeg'.encode())
+        self.assertIn('Accept', response['Vary'])
+
+    @patch('file_client.files_clients.ProfileImageRendererClient.download_chunks', autospec=True)
+    def test_download_image_variant_falls_back_to_original(self, mock_download):
+        self.login_user()
+
+        def download_chunks(client):
+            if client.filename != f'{self.user.uuid}.webp':
+                raise FileClientException(404, {"detail": "Downloaded file not found S3"})
+            return iter([b'original'])
+
+        mock_download.side_effect = download_chunks
+
+        response = self.client.get(self.url, {'size': 'medium'}, HTTP_ACCEPT='image/webp')
+
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertEqual(b''.join(response.streaming_content), b'original')
+
+    def test_download_image_unknown_size(self):
+        self.login_user()
+
+        response = self.client.get(self.url, {'size': 'huge'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch('file_client.files_clients.ProfileImageRendererClient.download_chunks')
     def test_download_image_not_found(self, mock_download):
         self.login_user()
         mock_download.side_effect = FileClientException(
@@ -0,0 +1,126 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock, patch
+
+from django.test import TestCase
+
+from file_client.S3_client import S3FileLoader
+from file_client.cache import LocalFileCache
+from file_client.exceptions import FileClientException
+from file_client.files_clients import ReadOnlyClient
+
+
+class LocalFileCacheTestCase(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.cache = LocalFileCache(root=self.root, max_size=10)
+
+    def test_get_missing_returns_none(self):
+        self.assertIsNone(self.cache.get('missing.zip'))
+
+    def test_put_then_get(self):
+        cached = self.cache.put('a.zip', [b'abc', b'de'])
+
+        self.assertEqual(cached.size, 5)
+        self.assertEqual(cached.etag, hashlib.sha256(b'abcde').hexdigest())
+        with open(cached.path, 'rb') as f:
+            self.assertEqual(f.read(), b'abcde')
+        self.assertEqual(self.cache.get('a.zip'), cached)
+
+    def test_put_replaces_previous_content(self):
+        old = self.cache.put('a.zip', [b'old'])
+        new = self.cache.put('a.zip', [b'new'])
+
+        self.assertNotEqual(old.etag, new.etag)
+        self.assertFalse(os.path.exists(old.path))
+        self.assertEqual(self.cache.get('a.zip').etag, new.etag)
+
+    def test_invalidate(self):
+        self.cache.put('a.zip', [b'abc'])
+        self.cache.invalidate('a.zip')
+
+        self.assertIsNone(self.cache.get('a.zip'))
+
+    def test_evicts_least_recently_used(self):
+        first = self.cache.put('first.zip', [b'12345'])
+        self.cache.put('second.zip', [b'12345'])
+        os.utime(first.path, (0, first.modified))
+        self.cache.put('third.zip', [b'12345'])
+
+        self.assertIsNone(self.cache.get('first.zip'))
+        self.assertIsNotNone(self.cache.get('second.zip'))
+        self.assertIsNotNone(self.cache.get('third.zip'))
+
+    def test_keeps_entry_bigger_than_budget(self):
+        cached = self.cache.put('big.zip', [b'x' * 20])
+
+        self.assertIsNotNone(cached)
+        self.assertEqual(cached.size, 20)
+
+    def test_concurrent_puts_of_one_name(self):
+        cache = LocalFileCache(root=self.root, max_size=10 ** 6)
+
+        def fill(_):
+            results = []
+            for _ in range(100):
+                cached = cache.put('a.zip', [b'abc'])
+                with open(cached.path, 'rb') as f:
+                    results.append(f.read())
+                results.append(cache.get('a.zip') is not None)
+            return results
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = [result for results in executor.map(fill, range(4)) for result in results]
+
+        self.assertEqual(set(results), {b'abc', True})
+
+    def test_failed_fill_leaves_no_entry(self):
+        def chunks():
+            yield b'abc'
+            raise IOError('connection reset')
+
+        with self.assertRaises(IOError):
+            self.cache.put('a.zip', chunks())
+
+        self.assertIsNone(self.cache.get('a.zip'))
+        self.assertEqual(os.listdir(self.root), [])
+
+
+class DownloadCachedTestCase(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        patcher = patch('file_client.base_file_client.LocalFileCache',
+                        side_effect=lambda: LocalFileCache(root=self.root, max_size=1024))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.client = ReadOnlyClient('key-s3-TSU_01__1=10.zip')
+        self.client.loader = Mock(spec=S3FileLoader)
+
+    def test_miss_fills_cache_then_hits(self):
+        self.client.loader.download_chunks.return_value = iter([b'arch', b'ive'])
+
+        first = self.client.download_cached()
+        second = self.client.download_cached()
+
+        self.assertEqual(first, second)
+        self.client.loader.download_chunks.assert_called_once_with(self.client.filename)
+
+    def test_miss_not_in_storage(self):
+        self.client.loader.download_chunks.return_value = {'detail': 'not found'}
+
+        with self.assertRaises(FileClientException):
+            self.client.download_cached()
+
+    def test_delete_invalidates_cache(self):
+        self.client.loader.download_chunks.return_value = iter([b'arch', b'ive'])
+        self.client.download_cached()
+
+        self.client.delete()
+
+        self.assertIsNone(LocalFileCache(root=self.root).get(self.client.filename))
@@ -1,14 +1,18 @@
 import os
+import shutil
+import tempfile
 from io import BytesIO
 from unittest import mock
 from unittest.mock import Mock, patch
-from django.test import TestCase
+from PIL import Image
+from django.test import TestCase, override_settings
 from django.conf import settings
 
 from file_client.S3_client import S3FileLoader
 from file_client.base_file_client import render_then_cleanup
 from file_client.exceptions import FileClientException
-from file_client.files_clients import ProfileImageRendererClient
+from file_client.files_clients import ProfileImageRendererClient, DocumentationImageRenderClient, \
+    DocumentationGraphicClient
 
 
 class ProfileImageRendererClientTestCase(TestCase):
@@ -87,6 +91,26 @@ class ProfileImageRendererClientTestCase(TestCase):
 
         self.client.is_read_only = False
 
+    def test_download_chunks_success(self):
+        self.client.loader.download_chunks.return_value = iter([b"test ", b"content"])
+        self.client.is_read_only = True
+
+        result = self.client.download_chunks()
+        self.assertEqual(b''.join(result), b"test content")
+        self.client.loader.download_chunks.assert_called_once_with(
+            self.correct_name)
+
+        self.client.is_read_only = False
+
+    def test_download_chunks_file_not_found(self):
+        self.client.loader.download_chunks.return_value = {"detail": "not found"}
+        self.client.is_read_only = True
+
+        with self.assertRaises(FileClientException):
+            self.client.download_chunks()
+
+        self.client.is_read_only = False
+
     def test_delete(self):
         self.client.loader.delete.return_value = "deleted"
         self.client.is_read_only = True
@@ -116,6 +140,60 @@ class ProfileImageRendererClientTestCase(TestCase):
             self.client.render()
 
 
+class ImageVariantsRenderClientTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        settings_patcher = override_settings(PATH_TO_LOCAL_STORAGE=self.directory, IMAGE_FALLBACK_FORMATS=['jpeg'])
+        settings_patcher.enable()
+        self.addCleanup(settings_patcher.disable)
+
+        self.source = os.path.join(self.directory, 'upload.png')
+        Image.new('RGBA', (1000, 500), color='blue').save(self.source)
+        self.client = DocumentationImageRenderClient(name='0f1e', path=self.source)
+
+    def test_render_all_variants(self):
+        self.client.render()
+
+        expected = {
+            '0f1e.webp': (1000, 500), '0f1e_full.jpeg': (1000, 500),
+            '0f1e_medium.webp': (640, 320), '0f1e_medium.jpeg': (640, 320),
+            '0f1e_thumbnail.webp': (128, 64), '0f1e_thumbnail.jpeg': (128, 64),
+        }
+        for filename, size in expected.items():
+            with Image.open(os.path.join(self.directory, filename)) as img:
+                self.assertEqual(img.size, size)
+        self.assertEqual(len(self.client.extra_paths), 5)
+        self.assertNotIn(self.client.new_path, self.client.extra_paths)
+
+    @patch('file_client.files_clients.S3FileLoader.upload', autospec=True)
+    def test_upload_sends_variants_and_cleans_up(self, mock_upload):
+        self.client.loader = Mock(spec=S3FileLoader)
+        self.client.loader.upload.return_value = {'detail': 'ok'}
+        mock_upload.return_value = {'detail': 'ok'}
+
+        result = self.client.upload()
+
+        self.assertEqual(result, {'detail': 'ok'})
+        self.client.loader.upload.assert_called_once()
+        self.assertEqual(
+            sorted(call.args[0].filename for call in mock_upload.call_args_list),
+            ['0f1e_full.jpeg', '0f1e_medium.jpeg', '0f1e_medium.webp', '0f1e_thumbnail.jpeg', '0f1e_thumbnail.webp']
+        )
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_delete_removes_every_variant(self):
+        client = DocumentationImageRenderClient(name='0f1e')
+        client.loader = Mock(spec=S3FileLoader)
+
+        client.delete()
+
+        deleted = [call.args[0] for call in client.loader.delete.call_args_list]
+        self.assertEqual(deleted[0], '0f1e.webp')
+        self.assertEqual(len(deleted), 6)
+        self.assertIn('0f1e_thumbnail.jpeg', deleted)
+
+
 class RenderThenCleanupDecoratorTestCase(TestCase):
 
     @mock.patch("logging.getLogger")
@@ -149,3 +227,34 @@ class FakeProcessor:
     @render_then_cleanup
     def process(self):
         return "processed"
+
+
+class DocumentationGraphicClientTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        settings_patcher = override_settings(PATH_TO_LOCAL_STORAGE=self.directory)
+        settings_patcher.enable()
+        self.addCleanup(settings_patcher.disable)
+
+        self.source = os.path.join(self.directory, 'upload.csv')
+        with open(self.source, 'w') as file:
+            file.write('x,y\n1,2\n2,3\n')
+        self.client = DocumentationGraphicClient(name='0f1e', path=self.source)
+
+    def test_render_writes_summary(self):
+        self.client.render()
+
+        self.assertEqual(self.client.extra_paths, [os.path.join(self.directory, '0f1e_summary.json')])
+        with open(self.client.extra_paths[0]) as file:
+            self.assertEqual(file.read(), '{"x":"x","rows":2,"series":[{"name":"y","points":[[1.0,2.0],[2.0,3.0]]}]}')
+
+    def test_delete_removes_summary(self):
+        client = DocumentationGraphicClient(name='0f1e')
+        client.loader = Mock(spec=S3FileLoader)
+
+        client.delete()
+
+        self.assertEqual(
+            [call.args[0] for call in client.loader.delete.call_args_list], ['0f1e.csv', '0f1e_summary.json']
+        )
@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+from unittest.mock import MagicMock, patch
+
+from django.test import TestCase, override_settings
+
+from file_client.S3_client import S3FileLoader, Endpoint
+
+
+class S3FileLoaderStreamingTestCase(TestCase):
+    def setUp(self):
+        self.loader = S3FileLoader(path='/tmp/key-s3-TSU_01__1=10.zip')
+        self.response = MagicMock(ok=True)
+        self.response.__enter__.return_value = self.response
+        self.response.iter_content.return_value = iter([b'first', b'second'])
+
+    @patch('requests.Session.post')
+    def test_download_chunks_is_lazy(self, mock_post):
+        mock_post.return_value = self.response
+
+        chunks = self.loader.download_chunks(self.loader.filename)
+
+        mock_post.assert_called_once_with(
+            url=Endpoint.retrieve, data=None, json={'filename': self.loader.filename}, stream=True
+        )
+        self.response.iter_content.assert_not_called()
+        self.assertEqual(list(chunks), [b'first', b'second'])
+        self.response.__exit__.assert_called_once()
+
+    @patch('requests.Session.post')
+    def test_download_chunks_not_found(self, mock_post):
+        self.response.ok = False
+        self.response.json.return_value = {'detail': 'not found'}
+        mock_post.return_value = self.response
+
+        result = self.loader.download_chunks(self.loader.filename)
+
+        self.assertEqual(result, {'detail': 'not found'})
+        self.response.__exit__.assert_called_once()
+
+    @patch('requests.Session.post')
+    def test_exists_does_not_read_body(self, mock_post):
+        mock_post.return_value = self.response
+
+        self.assertTrue(self.loader.exists(self.loader.filename))
+        self.response.ok = False
+        self.assertFalse(self.loader.exists(self.loader.filename))
+
+        mock_post.assert_called_with(url=Endpoint.retrieve, json={'filename': self.loader.filename}, stream=True)
+        self.response.iter_content.assert_not_called()
+        self.assertEqual(self.response.__exit__.call_count, 2)
+
+    @patch('requests.Session.post')
+    def test_download_stream_writes_chunks_to_disk(self, mock_post):
+        mock_post.return_value = self.response
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+
+        with override_settings(PATH_TO_LOCAL_STORAGE=directory):
+            result = self.loader.download_stream(self.loader.filename)
+
+        self.assertIsNone(result)
+        with open(os.path.join(directory, self.loader.filename), 'rb') as file:
+            self.assertEqual(file.read(), b'firstsecond')
@@ -0,0 +1,88 @@
+import json
+import os
+import tempfile
+import zipfile
+from io import BytesIO
+from unittest.mock import Mock
+
+from django.test import TestCase
+
+from file_client.base_file_client import run_many
+from file_client.cache import CachedFile
+from file_client.utils import iter_zip, lttb, build_csv_summary
+
+
+class RunManyTestCase(TestCase):
+    def test_results_and_errors_keyed_by_filename(self):
+        ok = Mock(filename='ok.webp')
+        broken = Mock(filename='broken.webp')
+        broken.upload.side_effect = IOError('storage is down')
+        ok.upload.return_value = {'detail': 'uploaded'}
+
+        results = run_many([ok, broken], lambda client: client.upload())
+
+        self.assertEqual(results['ok.webp'], {'detail': 'uploaded'})
+        self.assertIsInstance(results['broken.webp'], IOError)
+
+    def test_empty(self):
+        self.assertEqual(run_many([], lambda client: client.upload()), {})
+
+
+class IterZipTestCase(TestCase):
+    def test_streams_valid_archive(self):
+        with tempfile.NamedTemporaryFile(delete=False) as file:
+            file.write(b'a' * 200000)
+        self.addCleanup(os.remove, file.name)
+        cached = CachedFile(path=file.name, etag='etag', size=200000, modified=784111777)
+
+        chunks = list(iter_zip([('first.csv', cached), ('second.csv', cached)]))
+
+        self.assertGreater(len(chunks), 2)
+        archive = zipfile.ZipFile(BytesIO(b''.join(chunks)))
+        self.assertIsNone(archive.testzip())
+        self.assertEqual(archive.namelist(), ['first.csv', 'second.csv'])
+        self.assertEqual(archive.read('second.csv'), b'a' * 200000)
+
+
+class CsvSummaryTestCase(TestCase):
+    def write_csv(self, content: str):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as file:
+            file.write(content)
+        self.addCleanup(os.remove, file.name)
+        return file.name
+
+    def test_lttb_keeps_edges_and_peaks(self):
+        xs = list(range(1000))
+        ys = [0.0] * 1000
+        ys[500] = 100.0
+
+        sampled = lttb(xs, ys, 20)
+
+        self.assertEqual(len(sampled), 20)
+        self.assertEqual(sampled[0], (0, 0.0))
+        self.assertEqual(sampled[-1], (999, 0.0))
+        self.assertIn((500, 100.0), sampled)
+
+    def test_lttb_short_series_untouched(self):
+        self.assertEqual(lttb([1, 2], [3, 4], 10), [(1, 3), (2, 4)])
+
+    def test_header_and_broken_rows(self):
+        path = self.write_csv('energy;count;error\n1;10;0.1\n2;20;0.2\nbroken;row;here\n3;nan;0.3\n4;40;0.4\n')
+
+        summary = json.loads(build_csv_summary(path, points=100))
+
+        self.assertEqual(summary['x'], 'energy')
+        self.assertEqual(summary['rows'], 3)
+        self.assertEqual(summary['series'], [
+            {'name': 'count', 'points': [[1.0, 10.0], [2.0, 20.0], [4.0, 40.0]]},
+            {'name': 'error', 'points': [[1.0, 0.1], [2.0, 0.2], [4.0, 0.4]]},
+        ])
+
+    def test_single_column_uses_row_index(self):
+        path = self.write_csv('\n'.join(str(i % 7) for i in range(5000)))
+
+        summary = json.loads(build_csv_summary(path, points=50))
+
+        self.assertEqual(summary['x'], 'index')
+        self.assertEqual(summary['rows'], 5000)
+        self.assertEqual(len(summary['series'][0]['points']), 50)
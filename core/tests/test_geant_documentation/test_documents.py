@@ -0,0 +1,43 @@
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+
+from geant_documentation.documents import ArticleDocument
+from geant_documentation.models import Article, Subscription, Element
+from tests.test_utils.test_search_index import FakeRedis, QUEUE_KEY
+from utils.search_index import QueuedSignalProcessor
+
+
+class ArticleDocumentTestCase(TestCase):
+    def setUp(self):
+        self.article = Article.objects.create(title='Muons', description='About muons')
+        self.subscription = Subscription.objects.create(title='Decay', subscription_order=1, article=self.article)
+        Element.objects.create(text='The muon decays', element_order=1, subscription=self.subscription)
+        Element.objects.create(text='e^{-t/\\tau}', element_order=2, type=Element.TypeChoice.FORMULA,
+                               subscription=self.subscription)
+        Element.objects.create(element_order=3, type=Element.TypeChoice.IMAGE, subscription=self.subscription)
+        Subscription.objects.create(title='Empty', subscription_order=2, article=self.article)
+
+    def test_prepare_subscriptions(self):
+        doc = ArticleDocument()
+        article = doc.get_queryset().get(pk=self.article.pk)
+
+        with self.assertNumQueries(0):
+            prepared = doc.prepare_subscriptions(article)
+
+        self.assertEqual(prepared, [
+            {'id': self.subscription.id, 'order': 1, 'title': 'Decay', 'text': 'The muon decays\ne^{-t/\\tau}'},
+            {'id': self.subscription.id + 1, 'order': 2, 'title': 'Empty', 'text': ''},
+        ])
+
+    @override_settings(ELASTICSEARCH_DSL_AUTOSYNC=True)
+    def test_element_change_queues_article(self):
+        redis = FakeRedis()
+        processor = QueuedSignalProcessor.__new__(QueuedSignalProcessor)
+        element = Element.objects.get(element_order=1)
+
+        with patch('utils.search_index.get_queue_connection', return_value=redis):
+            with self.captureOnCommitCallbacks(execute=True):
+                processor.handle_save(Element, element)
+
+        self.assertEqual(redis.sets[QUEUE_KEY], {f'geant_documentation.Article:{self.article.pk}'.encode()})
@@ -0,0 +1,37 @@
+from django.test import SimpleTestCase
+
+from geant_examples.models import Command
+from geant_examples.run_params import canonical_params, normalize_value, params_from_key, stored_params
+
+
+class RunParamsTestCase(SimpleTestCase):
+    def setUp(self):
+        self.commands = [
+            Command(title='particle', default='e-', order_index=3),
+            Command(title='energy', default='10', order_index=1),
+        ]
+
+    def test_normalize_value(self):
+        cases = {
+            '1': '1', '1.0': '1', ' 1.50 ': '1.5', '1e3': '1000', '-0.0': '0',
+            2.5: '2.5', '0.001': '0.001', 'e-': 'e-', 'nan': 'nan', '10 MeV': '10 MeV',
+        }
+        for value, normalized in cases.items():
+            with self.subTest(value=value):
+                self.assertEqual(normalize_value(value), normalized)
+
+    def test_canonical_params(self):
+        params = canonical_params(self.commands, {'particle': 'gamma', 'energy': '20.0', 'mass': '1'})
+
+        self.assertEqual(params, {'energy': ['20', 1], 'particle': ['gamma', 3]})
+        self.assertEqual(list(params), ['energy', 'particle'])
+
+    def test_omitted_commands_take_defaults(self):
+        self.assertEqual(canonical_params(self.commands, {}), {'energy': ['10', 1], 'particle': ['e-', 3]})
+
+    def test_stored_params(self):
+        self.assertEqual(stored_params(canonical_params(self.commands, {})), {'1': '10', '3': 'e-'})
+
+    def test_params_from_key(self):
+        self.assertEqual(params_from_key('key-s3-TSU_01__1=10--MeV__3=e-'), {'1': '10 MeV', '3': 'e-'})
+        self.assertEqual(params_from_key('key-s3-TSU_01__'), {})
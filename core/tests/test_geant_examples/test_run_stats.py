@@ -0,0 +1,67 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from geant_examples.models import Example, ExampleCommand, UserExampleCommand
+from geant_examples.run_stats import get_run_stats, invalidate_run_stats, expected_duration, percentile
+from users.models import User
+
+
+class RunStatsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='runner@gmail.com', username='runner')
+        self.example = Example.objects.create(title_verbose='test_verbose', title_not_verbose='TSU_98')
+        self.now = timezone.now()
+        invalidate_run_stats(self.example.pk)
+
+    def create_run(self, seconds, status=UserExampleCommand.StatusChoice.executed, finished_ago=0):
+        finished_at = self.now - timedelta(seconds=finished_ago)
+        ex_command = ExampleCommand.objects.create(
+            key_s3=f'key-{ExampleCommand.objects.count()}',
+            example=self.example,
+            started_at=finished_at - timedelta(seconds=seconds),
+            finished_at=finished_at,
+        )
+        UserExampleCommand.objects.create(user=self.user, example_command=ex_command, status=status)
+
+    def test_percentile(self):
+        values = list(range(1, 11))
+
+        self.assertEqual(percentile(values, 50), 5)
+        self.assertEqual(percentile(values, 90), 9)
+        self.assertEqual(percentile(values, 99), 10)
+        self.assertEqual(percentile([7], 50), 7)
+
+    def test_stats_of_successful_runs(self):
+        for seconds in (10, 20, 30, 40):
+            self.create_run(seconds)
+        self.create_run(1000, status=UserExampleCommand.StatusChoice.failure)
+        ExampleCommand.objects.create(key_s3='key-running', example=self.example, started_at=self.now)
+
+        stats = get_run_stats(self.example.pk)
+
+        self.assertEqual(stats, {'count': 4, 'p50': 20, 'p90': 40, 'p99': 40})
+
+    @override_settings(RUN_STATS={'window': 2, 'percentiles': (50,), 'timeout': 60})
+    def test_stats_use_latest_runs(self):
+        self.create_run(500, finished_ago=100)
+        self.create_run(10, finished_ago=2)
+        self.create_run(20, finished_ago=1)
+
+        self.assertEqual(get_run_stats(self.example.pk), {'count': 2, 'p50': 10})
+
+    def test_stats_are_cached_until_invalidated(self):
+        self.create_run(10)
+        get_run_stats(self.example.pk)
+        self.create_run(30)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_run_stats(self.example.pk)['count'], 1)
+
+        invalidate_run_stats(self.example.pk)
+        self.assertEqual(get_run_stats(self.example.pk)['count'], 2)
+
+    def test_expected_duration_without_history(self):
+        self.assertIsNone(get_run_stats(self.example.pk)['p50'])
+        self.assertEqual(expected_duration(self.example.pk), 60)
@@ -0,0 +1,190 @@
+from contextlib import nullcontext
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+
+from geant_examples import scheduler
+
+SCHEDULER = {
+    'redis_url': '',
+    'key': 'geant_scheduler',
+    'concurrency': 2,
+    'max_user_running': 1,
+    'max_queue': 5,
+    'max_user_queue': 3,
+    'run_time': 60,
+    'run_timeout': 3600,
+    'dispatch_interval': 10,
+}
+
+
+def encode(value):
+    return value.encode() if isinstance(value, str) else str(value).encode()
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def lock(self, name, **kwargs):
+        return nullcontext()
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def incr(self, key):
+        self.data[key] = encode(int(self.data.get(key, 0)) + 1)
+        return int(self.data[key])
+
+    def incrby(self, key, amount):
+        self.data[key] = encode(int(self.data.get(key, 0)) + amount)
+
+    def decr(self, key):
+        self.data[key] = encode(int(self.data.get(key, 0)) - 1)
+
+    def llen(self, key):
+        return len(self.data.get(key, []))
+
+    def rpush(self, key, *values):
+        self.data.setdefault(key, []).extend(encode(value) for value in values)
+
+    def lrange(self, key, start, end):
+        return list(self.data.get(key, []))
+
+    def lpop(self, key):
+        values = self.data.get(key)
+        return values.pop(0) if values else None
+
+    def zadd(self, key, mapping):
+        self.data.setdefault(key, {}).update({encode(member): score for member, score in mapping.items()})
+
+    def zcard(self, key):
+        return len(self.data.get(key, {}))
+
+    def zrange(self, key, start, end):
+        members = self.data.get(key, {})
+        return sorted(members, key=lambda member: (members[member], member))
+
+    def zpopmin(self, key):
+        members = self.data.get(key)
+        if not members:
+            return []
+        member = min(members, key=lambda member: (members[member], member))
+        return [(member, members.pop(member))]
+
+    def hgetall(self, key):
+        return {encode(field): value for field, value in self.data.get(key, {}).items()}
+
+    def hset(self, key, field, value):
+        self.data.setdefault(key, {})[field] = encode(value)
+
+    def hdel(self, key, *fields):
+        for field in fields:
+            self.data.get(key, {}).pop(field, None)
+
+
+@override_settings(GEANT_SCHEDULER=SCHEDULER)
+class SchedulerTestCase(SimpleTestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        patcher = patch('geant_examples.scheduler.get_connection', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def taken(self):
+        return [job['key_s3'] for job in scheduler.take_jobs()]
+
+    def test_submit_returns_queue_position(self):
+        self.assertEqual(scheduler.submit(1, 'a1', {}), 1)
+        self.assertEqual(scheduler.submit(2, 'b1', {}), 2)
+
+    def test_users_take_turns(self):
+        for key_s3 in ('a1', 'a2', 'a3'):
+            scheduler.submit(1, key_s3, {})
+        scheduler.submit(2, 'b1', {})
+
+        self.assertEqual(self.taken(), ['a1', 'b1'])
+
+    def test_user_runs_shortest_first(self):
+        scheduler.submit(1, 'long', {}, expected=600)
+        scheduler.submit(1, 'short', {}, expected=30)
+        scheduler.submit(1, 'short2', {}, expected=30)
+
+        self.assertEqual(self.taken(), ['short'])
+        scheduler.release('short')
+        self.assertEqual(self.taken(), ['short2'])
+        scheduler.release('short2')
+        self.assertEqual(self.taken(), ['long'])
+
+    def test_user_running_limit(self):
+        scheduler.submit(1, 'a1', {})
+        scheduler.submit(1, 'a2', {})
+
+        self.assertEqual(self.taken(), ['a1'])
+        self.assertEqual(self.taken(), [])
+
+        scheduler.release('a1')
+        self.assertEqual(self.taken(), ['a2'])
+
+    def test_global_concurrency(self):
+        for user_id in (1, 2, 3):
+            scheduler.submit(user_id, f'run{user_id}', {})
+
+        self.assertEqual(self.taken(), ['run1', 'run2'])
+
+        scheduler.release('run2')
+        self.assertEqual(self.taken(), ['run3'])
+
+    def test_user_queue_full(self):
+        for i in range(3):
+            scheduler.submit(1, f'a{i}', {})
+
+        with self.assertRaises(scheduler.QueueFull) as context:
+            scheduler.submit(1, 'a3', {})
+
+        self.assertEqual(context.exception.retry_after, 4 * 60)
+        scheduler.submit(2, 'b1', {})
+
+    def test_submit_many_is_all_or_nothing(self):
+        scheduler.submit(1, 'a0', {})
+
+        with self.assertRaises(scheduler.QueueFull):
+            scheduler.submit_many(1, [(f'a{i}', {}, 0) for i in range(1, 4)])
+
+        self.assertEqual(scheduler.submit_many(1, [('a1', {}, 0), ('a2', {}, 0)]), 2)
+        self.assertEqual(int(self.redis.get('geant_scheduler:size')), 3)
+
+    def test_queue_full(self):
+        for user_id in range(5):
+            scheduler.submit(user_id, f'run{user_id}', {})
+
+        with self.assertRaises(scheduler.QueueFull) as context:
+            scheduler.submit(9, 'run9', {})
+
+        self.assertEqual(context.exception.retry_after, 3 * 60)
+
+    def test_expired_runs_release_their_slot(self):
+        scheduler.submit(1, 'a1', {})
+        scheduler.submit(1, 'a2', {})
+        self.taken()
+
+        self.assertEqual(scheduler.reclaim_expired(), [])
+        with patch('geant_examples.scheduler.time.time', return_value=4e9):
+            self.assertEqual(scheduler.reclaim_expired(), ['a1'])
+            self.assertEqual(self.taken(), ['a2'])
+
+    def test_active_runs(self):
+        scheduler.submit(1, 'a1', {})
+        scheduler.submit(1, 'a2', {})
+        scheduler.submit(2, 'b1', {})
+        self.taken()
+        scheduler.release('b1')
+
+        self.assertEqual(scheduler.active_runs(), {'a1', 'a2'})
+
+    def test_check_capacity_does_not_queue(self):
+        self.assertEqual(scheduler.check_capacity(1, 3), 0)
+        with self.assertRaises(scheduler.QueueFull):
+            scheduler.check_capacity(1, 4)
+
+        self.assertEqual(self.taken(), [])
@@ -0,0 +1,160 @@
+from unittest.mock import patch, MagicMock
+
+import redis
+import requests
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+from geant_examples import scheduler
+from geant_examples.models import Example, ExampleCommand, UserExampleCommand
+from geant_examples.tasks import dispatch_runs, mark_run_finished, run_example_task, submit_runs, submit_runs_task
+from tests.test_geant_examples.test_scheduler import FakeRedis, SCHEDULER
+from users.models import User
+
+
+class RunExampleTaskTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='runner@gmail.com',
+            username='runner',
+            first_name='runner_fname',
+            last_name='runner_lname'
+        )
+        self.example = Example.objects.create(
+            title_verbose='test_verbose', title_not_verbose='TSU_98'
+        )
+        self.ex_command = ExampleCommand.objects.create(
+            key_s3='key-s3-TSU_98__1=10', example=self.example
+        )
+        self.ex_command.users.add(self.user)
+        self.data = {'title': 'TSU_98', 'commands': [{'energy': '10'}]}
+
+    def get_status(self):
+        return UserExampleCommand.objects.get(
+            user=self.user, example_command=self.ex_command).status
+
+    @patch('requests.Session.post')
+    def test_run_example_success(self, mock_post):
+        mock_post.return_value = MagicMock(ok=True)
+
+        result = run_example_task.apply(args=(self.ex_command.key_s3, self.data)).get()
+
+        self.assertTrue(result)
+        mock_post.assert_called_once_with(settings.GEANT_BACKEND_RUN_EXAMPLE_URL, json=self.data)
+        self.assertEqual(self.get_status(), UserExampleCommand.StatusChoice.executing)
+        self.ex_command.refresh_from_db()
+        self.assertIsNotNone(self.ex_command.started_at)
+        self.assertIsNone(self.ex_command.finished_at)
+
+    @patch('requests.Session.post')
+    def test_run_example_rejected_by_backend(self, mock_post):
+        mock_post.return_value = MagicMock(ok=False, status_code=400, text='Bad request')
+
+        result = run_example_task.apply(args=(self.ex_command.key_s3, self.data)).get()
+
+        self.assertFalse(result)
+        self.assertEqual(self.get_status(), UserExampleCommand.StatusChoice.failure)
+        self.ex_command.refresh_from_db()
+        self.assertIsNotNone(self.ex_command.finished_at)
+
+    @patch('requests.Session.post')
+    def test_run_example_backend_unreachable(self, mock_post):
+        mock_post.side_effect = requests.ConnectionError('connection refused')
+
+        result = run_example_task.apply(args=(self.ex_command.key_s3, self.data)).get()
+
+        self.assertFalse(result)
+        self.assertEqual(self.get_status(), UserExampleCommand.StatusChoice.failure)
+
+    @patch('requests.Session.post')
+    def test_run_example_keeps_finish_reported_during_post(self, mock_post):
+        def post(*args, **kwargs):
+            mark_run_finished(self.ex_command.key_s3)
+            return MagicMock(ok=True)
+        mock_post.side_effect = post
+
+        run_example_task.apply(args=(self.ex_command.key_s3, self.data)).get()
+
+        self.ex_command.refresh_from_db()
+        self.assertIsNotNone(self.ex_command.started_at)
+        self.assertIsNotNone(self.ex_command.finished_at)
+
+    @patch('requests.Session.post')
+    def test_run_example_connect_timeout_fails_run(self, mock_post):
+        mock_post.side_effect = requests.ConnectTimeout('connect timeout')
+
+        result = run_example_task.apply(args=(self.ex_command.key_s3, self.data)).get()
+
+        self.assertFalse(result)
+        self.assertEqual(self.get_status(), UserExampleCommand.StatusChoice.failure)
+
+    @patch('requests.Session.post')
+    def test_run_example_read_timeout_is_not_retried(self, mock_post):
+        mock_post.side_effect = requests.ReadTimeout('read timeout')
+
+        with patch.object(run_example_task, 'retry') as mock_retry:
+            result = run_example_task.apply(args=(self.ex_command.key_s3, self.data)).get()
+
+        self.assertIsNone(result)
+        mock_post.assert_called_once()
+        mock_retry.assert_not_called()
+        self.assertEqual(self.get_status(), UserExampleCommand.StatusChoice.executing)
+
+    @patch('geant_examples.tasks.publish_run_statuses')
+    @patch('requests.Session.post')
+    def test_run_example_failure_is_published(self, mock_post, mock_publish):
+        mock_post.return_value = MagicMock(ok=False, status_code=400, text='Bad request')
+
+        run_example_task.apply(args=(self.ex_command.key_s3, self.data)).get()
+
+        mock_publish.assert_called_once_with(self.ex_command.key_s3)
+
+    @override_settings(GEANT_SCHEDULER=SCHEDULER)
+    @patch('geant_examples.tasks.publish_run_statuses')
+    @patch('geant_examples.tasks.run_example_task.delay')
+    def test_dispatch_fails_runs_without_status_callback(self, mock_delay, mock_publish):
+        with patch('geant_examples.scheduler.get_connection', return_value=FakeRedis()):
+            scheduler.submit(self.user.pk, self.ex_command.key_s3, self.data)
+            dispatch_runs()
+            with patch('geant_examples.scheduler.time.time', return_value=4e9):
+                dispatch_runs()
+
+        self.assertEqual(self.get_status(), UserExampleCommand.StatusChoice.failure)
+        mock_publish.assert_called_once_with(self.ex_command.key_s3)
+        mock_delay.assert_called_once_with(self.ex_command.key_s3, self.data)
+
+    @override_settings(GEANT_SCHEDULER=SCHEDULER)
+    @patch('geant_examples.tasks.dispatch_runs.delay')
+    @patch('geant_examples.tasks.run_example_task.delay')
+    def test_submit_runs_queues_admitted_runs_over_full_queue(self, mock_delay, mock_dispatch):
+        redis_connection = FakeRedis()
+        jobs = [(f'key-{i}', self.data, 0) for i in range(SCHEDULER['max_user_queue'] + 1)]
+
+        with patch('geant_examples.scheduler.get_connection', return_value=redis_connection):
+            submit_runs(self.user.pk, jobs)
+            queued = scheduler.active_runs()
+
+        self.assertEqual(queued, {key_s3 for key_s3, _, _ in jobs})
+        mock_dispatch.assert_called_once()
+        mock_delay.assert_not_called()
+
+    @patch('geant_examples.tasks.submit_runs_task.apply_async')
+    @patch('geant_examples.tasks.run_example_task.delay')
+    def test_submit_runs_retries_when_scheduler_is_down(self, mock_delay, mock_retry):
+        jobs = [(self.ex_command.key_s3, self.data, 0)]
+
+        with patch('geant_examples.scheduler.submit_many', side_effect=redis.ConnectionError('down')):
+            submit_runs(self.user.pk, jobs)
+
+        mock_retry.assert_called_once_with((self.user.pk, jobs), countdown=1)
+        mock_delay.assert_not_called()
+        self.assertEqual(self.get_status(), UserExampleCommand.StatusChoice.executing)
+
+    @patch('geant_examples.tasks.run_example_task.delay')
+    def test_submit_runs_task_fails_runs_when_scheduler_stays_down(self, mock_delay):
+        with patch('geant_examples.scheduler.submit_many', side_effect=redis.ConnectionError('down')):
+            result = submit_runs_task.apply(args=(self.user.pk, [[self.ex_command.key_s3, self.data, 0]])).get()
+
+        self.assertFalse(result)
+        mock_delay.assert_not_called()
+        self.assertEqual(self.get_status(), UserExampleCommand.StatusChoice.failure)
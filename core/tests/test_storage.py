@@ -8,7 +8,7 @@ from unittest.mock import patch, MagicMock, mock_open
 from core.storage import BackupStorage
 
 class BackupStorageTestCase(TestCase):
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_init_method(self, mock_post):
         storage = BackupStorage()
 
@@ -18,7 +18,7 @@ class BackupStorageTestCase(TestCase):
         )
         mock_post.return_value.raise_for_status.assert_called_once()
 
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_init_backup(self, mock_post):
         storage = BackupStorage()
 
@@ -33,7 +33,7 @@ class BackupStorageTestCase(TestCase):
         mock_post.return_value.raise_for_status.assert_called_once()
 
     @patch("core.storage.TemporaryDirectory")
-    @patch("requests.post")
+    @patch("requests.Session.post")
     @patch("builtins.open", new_callable=mock_open)
     def test_open_method(self, mock_file, mock_post, mock_dir):
         mock_post.return_value.content = b""
@@ -65,7 +65,7 @@ class BackupStorageTestCase(TestCase):
         )
         mock_file().write.assert_called_once_with(b"")
 
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_save_method(self, mock_post):
         mock_content = MagicMock()
         mock_file = MagicMock()
@@ -0,0 +1,73 @@
+from unittest.mock import patch
+
+from django.conf import settings
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+
+from tests.test_api.test_v1.test_views.auth_test_base import AuthSettingsTest
+from utils import http
+from utils.http import get_session, pool_stats, PooledSession
+
+
+class PooledSessionTestCase(TestCase):
+    def setUp(self):
+        patcher = patch.dict(http._sessions, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_session_is_reused_per_process(self):
+        self.assertIs(get_session('storage'), get_session('storage'))
+        self.assertIsNot(get_session('storage'), get_session('geant_backend'))
+
+    def test_session_is_rebuilt_after_fork(self):
+        session = get_session('storage')
+
+        with patch('utils.http.os.getpid', return_value=-1):
+            self.assertIsNot(get_session('storage'), session)
+
+    def test_adapter_configuration(self):
+        conf = settings.HTTP_CLIENTS['storage']
+        session = get_session('storage')
+        adapter = session.get_adapter('http://storage')
+
+        self.assertEqual(session.timeout, conf['timeout'])
+        self.assertEqual(adapter._pool_maxsize, conf['pool_size'])
+        self.assertEqual(adapter.max_retries.total, conf['retries'])
+        self.assertIn('POST', adapter.max_retries.allowed_methods)
+        self.assertNotIn('POST', get_session('geant_backend').get_adapter('http://').max_retries.allowed_methods)
+
+    @patch('requests.Session.request')
+    def test_default_timeout(self, mock_request):
+        session = PooledSession(timeout=(1, 2))
+
+        session.request('GET', 'http://storage')
+        session.request('GET', 'http://storage', timeout=10)
+
+        self.assertEqual(mock_request.call_args_list[0].kwargs['timeout'], (1, 2))
+        self.assertEqual(mock_request.call_args_list[1].kwargs['timeout'], 10)
+
+    def test_pool_stats(self):
+        session = get_session('storage')
+        session.get_adapter('http://').poolmanager.connection_from_url('http://storage:8000')
+
+        stats = pool_stats()
+
+        pool = stats['sessions']['storage'][0]
+        self.assertEqual(pool['host'], 'storage')
+        self.assertEqual(pool['port'], 8000)
+        self.assertEqual(pool['maxsize'], settings.HTTP_CLIENTS['storage']['pool_size'])
+        self.assertEqual(pool['connections_opened'], 0)
+
+
+class HttpPoolStatsAPIViewTestCase(AuthSettingsTest):
+    def test_staff_only(self):
+        url = reverse('http-pool-stats')
+
+        self.login_user()
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.login_staff()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('sessions', response.data)
@@ -0,0 +1,98 @@
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.test import TestCase, override_settings
+
+from api.jwt_authentication import JWTCookieAuthMiddlewareStack
+from api.v1.routing import websocket_urlpatterns
+from geant_examples.models import Example, ExampleCommand, UserExampleCommand
+from users.auth.utils import get_tokens_for_user
+from users.models import User
+from utils.realtime import run_status_group, send_run_statuses
+
+IN_MEMORY_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYERS)
+class RunStatusConsumerTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='runner@gmail.com', username='runner')
+        self.user.is_active = True
+        self.user.save()
+        self.example = Example.objects.create(title_verbose='test_verbose', title_not_verbose='TSU_98')
+        self.ex_command = ExampleCommand.objects.create(key_s3='key-s3-TSU_98', example=self.example)
+        self.ex_command.users.add(self.user)
+        self.run = UserExampleCommand.objects.get(user=self.user, example_command=self.ex_command)
+        self.application = JWTCookieAuthMiddlewareStack(URLRouter(websocket_urlpatterns))
+
+    def communicator(self, access=None):
+        headers = [(b'cookie', f'access={access}'.encode())] if access else []
+        return WebsocketCommunicator(self.application, '/ws/v1/runs/', headers=headers)
+
+    def test_anonymous_connection_rejected(self):
+        async def connect():
+            connected, _ = await self.communicator().connect()
+            return connected
+
+        self.assertFalse(async_to_sync(connect)())
+
+    def test_invalid_token_rejected(self):
+        async def connect():
+            connected, _ = await self.communicator('not-a-token').connect()
+            return connected
+
+        self.assertFalse(async_to_sync(connect)())
+
+    def test_status_pushed_to_user(self):
+        access = get_tokens_for_user(self.user)['access']
+
+        async def receive():
+            communicator = self.communicator(access)
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            await get_channel_layer().group_send(
+                run_status_group(self.user.pk), {'type': 'run.status', 'data': {'key_s3': 'key'}})
+            message = await communicator.receive_json_from()
+            await communicator.disconnect()
+            return message
+
+        self.assertEqual(async_to_sync(receive)(), {'key_s3': 'key'})
+
+    def test_send_run_statuses(self):
+        layer = get_channel_layer()
+        async_to_sync(layer.group_add)(run_status_group(self.user.pk), 'test-channel')
+        UserExampleCommand.objects.filter(pk=self.run.pk).update(status=UserExampleCommand.StatusChoice.failure)
+
+        send_run_statuses(self.ex_command.key_s3)
+
+        message = async_to_sync(layer.receive)('test-channel')
+        self.assertEqual(message, {
+            'type': 'run.status',
+            'data': {
+                'id': self.run.pk,
+                'example': self.example.pk,
+                'example_command': self.ex_command.pk,
+                'key_s3': 'key-s3-TSU_98',
+                'status': UserExampleCommand.StatusChoice.failure.value,
+                'status_label': UserExampleCommand.StatusChoice.failure.label,
+            },
+        })
+
+    def test_failed_send_does_not_skip_other_users(self):
+        other = User.objects.create_user(email='other@gmail.com', username='other')
+        self.ex_command.users.add(other)
+        layer = get_channel_layer()
+        sent = []
+
+        async def group_send(group, message):
+            sent.append(group)
+            if len(sent) == 1:
+                raise ConnectionError('redis down')
+
+        with patch.object(layer, 'group_send', side_effect=group_send):
+            send_run_statuses(self.ex_command.key_s3)
+
+        self.assertEqual(sorted(sent), sorted([run_status_group(self.user.pk), run_status_group(other.pk)]))
@@ -0,0 +1,96 @@
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from geant_examples.models import Example
+
+COMMAND = 'utils.management.commands.rebuild_search_index'
+
+
+def fake_parallel_bulk(client, actions, **kwargs):
+    return [(True, {'index': {'_id': action['_id']}}) for action in actions]
+
+
+class RebuildSearchIndexTestCase(TestCase):
+    def setUp(self):
+        for i in range(3):
+            Example.objects.create(title_verbose=f'verbose {i}', title_not_verbose=f'TSU_0{i}')
+
+        self.es = MagicMock()
+        self.es.count.return_value = {'count': 3}
+        self.es.indices.exists_alias.return_value = True
+        self.es.indices.get_alias.return_value = {'examples-old': {}}
+
+        for target, kwargs in (
+            (f'{COMMAND}.connections.get_connection', {'return_value': self.es}),
+            ('elasticsearch_dsl.Index.create', {}),
+            (f'{COMMAND}.start_replay', {}),
+            (f'{COMMAND}.finish_replay', {}),
+        ):
+            patcher = patch(target, **kwargs)
+            setattr(self, target.rsplit('.', 1)[-1], patcher.start())
+            self.addCleanup(patcher.stop)
+
+    def call(self, *args):
+        call_command('rebuild_search_index', '--models', 'geant_examples.example', *args, stdout=StringIO(), stderr=StringIO())
+
+    def new_index_name(self):
+        return self.es.indices.refresh.call_args.kwargs['index']
+
+    @patch(f'{COMMAND}.parallel_bulk', side_effect=fake_parallel_bulk)
+    def test_builds_new_index_and_swaps_alias(self, mock_bulk):
+        self.call()
+
+        new_name = self.new_index_name()
+        self.assertTrue(new_name.startswith('examples-'))
+        self.create.assert_called_once()
+        actions = mock_bulk.call_args.args[1]
+        self.assertEqual(len(actions), 3)
+        self.assertEqual({action['_index'] for action in actions}, {new_name})
+        self.es.indices.update_aliases.assert_called_once_with(actions=[
+            {'add': {'index': new_name, 'alias': 'examples'}},
+            {'remove': {'index': 'examples-old', 'alias': 'examples'}},
+        ])
+        self.es.indices.delete.assert_called_once_with(index='examples-old', ignore_unavailable=True)
+        self.start_replay.assert_called_once()
+        self.finish_replay.assert_called_once()
+
+    @patch(f'{COMMAND}.parallel_bulk', side_effect=fake_parallel_bulk)
+    def test_replaces_legacy_concrete_index(self, mock_bulk):
+        self.es.indices.exists_alias.return_value = False
+        self.es.indices.exists.return_value = True
+
+        self.call('--keep-old')
+
+        self.es.indices.update_aliases.assert_called_once_with(actions=[
+            {'add': {'index': self.new_index_name(), 'alias': 'examples'}},
+            {'remove_index': {'index': 'examples'}},
+        ])
+        self.es.indices.delete.assert_not_called()
+
+    @patch(f'{COMMAND}.parallel_bulk', side_effect=fake_parallel_bulk)
+    def test_count_mismatch_keeps_old_index(self, mock_bulk):
+        self.es.count.return_value = {'count': 2}
+
+        with self.assertRaises(CommandError):
+            self.call()
+
+        self.es.indices.update_aliases.assert_not_called()
+        self.es.indices.delete.assert_called_once_with(index=self.new_index_name(), ignore_unavailable=True)
+        self.finish_replay.assert_called_once()
+
+    @patch(f'{COMMAND}.parallel_bulk')
+    def test_failed_documents_abort(self, mock_bulk):
+        mock_bulk.return_value = [(True, {}), (False, {'index': {'status': 400}})]
+
+        with self.assertRaises(CommandError):
+            self.call()
+
+        self.es.indices.update_aliases.assert_not_called()
+
+    def test_unknown_model(self):
+        with self.assertRaises(CommandError):
+            call_command('rebuild_search_index', '--models', 'nope', stdout=StringIO())
@@ -0,0 +1,199 @@
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+
+from geant_examples.models import Example, ExampleCommand, UserExampleCommand, Tag, Category
+from geant_examples.documents import ExampleDocument
+from geant_examples.signals import update_user_example_command_document
+from users.documents import UserExampleCommandDocument
+from users.models import User
+from utils.search_index import (
+    QueuedSignalProcessor, enqueue, flush_index_queue, start_replay, finish_replay, get_index_version
+)
+
+QUEUE_KEY = 'search_index:queue'
+
+
+class FakeRedis:
+    def __init__(self):
+        self.sets = {}
+
+    def sadd(self, key, *members):
+        self.sets.setdefault(key, set()).update(
+            member.encode() if isinstance(member, str) else member for member in members)
+
+    def spop(self, key, count):
+        members = self.sets.get(key, set())
+        return [members.pop() for _ in range(min(count, len(members)))]
+
+    def set(self, key, value, ex=None):
+        self.sets[key] = value
+
+    def exists(self, key):
+        return int(bool(self.sets.get(key)))
+
+    def delete(self, key):
+        self.sets.pop(key, None)
+
+    def sunionstore(self, destination, keys):
+        self.sets[destination] = set().union(*(self.sets.get(key, set()) for key in keys))
+
+
+@override_settings(ELASTICSEARCH_DSL_AUTOSYNC=True)
+class SearchIndexQueueTestCase(TestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        patcher = patch('utils.search_index.get_queue_connection', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.processor = QueuedSignalProcessor.__new__(QueuedSignalProcessor)
+        self.example = Example.objects.create(title_verbose='verbose', title_not_verbose='TSU_01')
+
+    def queued(self):
+        return self.redis.sets.get(QUEUE_KEY, set())
+
+    def test_save_is_queued_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.processor.handle_save(Example, self.example)
+            self.processor.handle_save(Example, self.example)
+            self.assertEqual(self.queued(), set())
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.queued(), {f'geant_examples.Example:{self.example.pk}'.encode()})
+
+    @override_settings(ELASTICSEARCH_DSL_AUTOSYNC=False)
+    def test_autosync_disabled(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue(Example, [self.example.pk])
+
+        self.assertEqual(self.queued(), set())
+
+    def test_unregistered_model_ignored(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue(User, [1])
+
+        self.assertEqual(self.queued(), set())
+
+    def test_m2m_add_queues_user_example_commands(self):
+        user = User.objects.create_user(email='user@gmail.com', username='user')
+        ex_command = ExampleCommand.objects.create(key_s3='key', example=self.example)
+        UserExampleCommand.objects.create(user=user, example_command=ex_command)
+        us_ex_command = UserExampleCommand.objects.get(user=user, example_command=ex_command)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            update_user_example_command_document(
+                UserExampleCommand, ex_command, 'post_add', {user.pk})
+
+        self.assertEqual(self.queued(), {f'geant_examples.UserExampleCommand:{us_ex_command.pk}'.encode()})
+
+    @patch.object(ExampleDocument, 'bulk', return_value=(1, []))
+    def test_flush_indexes_existing_and_deletes_missing(self, mock_bulk):
+        self.redis.sadd(QUEUE_KEY, f'geant_examples.Example:{self.example.pk}', 'geant_examples.Example:999999')
+
+        flushed = flush_index_queue()
+
+        self.assertEqual(flushed, 2)
+        self.assertEqual(self.queued(), set())
+        mock_bulk.assert_called_once()
+        actions = mock_bulk.call_args.args[0]
+        self.assertEqual(
+            sorted((action['_op_type'], str(action['_id'])) for action in actions),
+            [('delete', '999999'), ('index', str(self.example.pk))]
+        )
+        self.assertEqual(mock_bulk.call_args.kwargs, {'raise_on_error': False, 'refresh': False})
+
+    @patch.object(ExampleDocument, 'bulk', return_value=(1, []))
+    def test_flush_bumps_index_version(self, mock_bulk):
+        version = get_index_version('ExampleDocument')
+        self.redis.sadd(QUEUE_KEY, f'geant_examples.Example:{self.example.pk}')
+
+        flush_index_queue()
+
+        self.assertEqual(get_index_version('ExampleDocument'), version + 1)
+
+    @patch.object(ExampleDocument, 'bulk', side_effect=ConnectionError('es down'))
+    def test_flush_failure_requeues_batch(self, mock_bulk):
+        self.redis.sadd(QUEUE_KEY, f'geant_examples.Example:{self.example.pk}')
+
+        with self.assertRaises(ConnectionError):
+            flush_index_queue()
+
+        self.assertEqual(self.queued(), {f'geant_examples.Example:{self.example.pk}'.encode()})
+
+    @override_settings(ELASTICSEARCH_INDEX_QUEUE={'redis_url': '', 'key': QUEUE_KEY, 'batch_size': 2, 'flush_interval': 1})
+    @patch.object(UserExampleCommandDocument, 'bulk', return_value=(0, []))
+    @patch.object(ExampleDocument, 'bulk', return_value=(0, []))
+    def test_flush_drains_queue_in_batches(self, mock_example_bulk, mock_user_bulk):
+        self.redis.sadd(QUEUE_KEY, *[f'geant_examples.Example:{pk}' for pk in range(1, 6)])
+
+        flushed = flush_index_queue()
+
+        self.assertEqual(flushed, 5)
+        self.assertEqual(mock_example_bulk.call_count, 3)
+        mock_user_bulk.assert_not_called()
+
+    @patch.object(ExampleDocument, 'bulk', return_value=(1, []))
+    def test_rows_flushed_during_rebuild_are_replayed(self, mock_bulk):
+        member = f'geant_examples.Example:{self.example.pk}'.encode()
+        start_replay()
+        self.redis.sadd(QUEUE_KEY, member)
+
+        flush_index_queue()
+        self.assertEqual(self.queued(), set())
+        finish_replay()
+
+        self.assertEqual(self.queued(), {member})
+        self.assertFalse(self.redis.exists(f'{QUEUE_KEY}:rebuilding'))
+
+    def create_runs(self, example, count):
+        ex_command = ExampleCommand.objects.create(key_s3=f'key-{example.pk}', example=example)
+        for i in range(count):
+            user = User.objects.create_user(email=f'user{example.pk}_{i}@gmail.com', username=f'user{example.pk}_{i}')
+            UserExampleCommand.objects.create(user=user, example_command=ex_command)
+        return UserExampleCommand.objects.filter(example_command=ex_command)
+
+    def test_tag_change_queues_its_examples(self):
+        tag = Tag.objects.create(title='physics')
+        self.example.tags.add(tag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.processor.handle_save(Tag, tag)
+
+        self.assertEqual(self.queued(), {f'geant_examples.Example:{self.example.pk}'.encode()})
+
+    @patch.object(UserExampleCommandDocument, 'bulk', return_value=(2, []))
+    @patch.object(ExampleDocument, 'bulk', return_value=(1, []))
+    def test_example_change_updates_runs_partially(self, mock_example_bulk, mock_user_bulk):
+        self.example.tags.add(Tag.objects.create(title='physics'))
+        self.example.category = Category.objects.create(title='Basic')
+        self.example.save()
+        runs = self.create_runs(self.example, 2)
+        self.redis.sadd(QUEUE_KEY, f'geant_examples.Example:{self.example.pk}')
+
+        flush_index_queue()
+
+        actions = mock_user_bulk.call_args.args[0]
+        self.assertEqual(sorted(action['_id'] for action in actions), sorted(run.pk for run in runs))
+        self.assertEqual({action['_op_type'] for action in actions}, {'update'})
+        self.assertEqual(actions[0]['doc'], {
+            'title_verbose': 'verbose', 'description': '', 'tags': ['physics'],
+            'category': 'Basic', 'synchronized': False,
+        })
+
+
+class UserExampleCommandDocumentTestCase(TestCase):
+    def test_prepare_without_per_row_queries(self):
+        example = Example.objects.create(title_verbose='verbose', title_not_verbose='TSU_01')
+        example.tags.add(Tag.objects.create(title='physics'))
+        ex_command = ExampleCommand.objects.create(key_s3='key', example=example)
+        for i in range(5):
+            user = User.objects.create_user(email=f'user{i}@gmail.com', username=f'user{i}')
+            UserExampleCommand.objects.create(user=user, example_command=ex_command)
+        doc = UserExampleCommandDocument()
+
+        with self.assertNumQueries(2):
+            prepared = [doc.prepare(run) for run in doc.get_indexing_queryset()]
+
+        self.assertEqual(len(prepared), 5)
+        self.assertEqual(prepared[0]['tags'], ['physics'])
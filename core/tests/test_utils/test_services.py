@@ -59,7 +59,7 @@ class DatabaseSynchronizerTestCase(Base):
         self.assertEqual(len(data["commands"]), 2)
         self.assertEqual(data["commands"][0]["title"], "command1")
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_get_example_from_backend_found(self, mock_get):
         mock_response = MagicMock()
         mock_response.json.return_value = {"id": 123, "detail": "success"}
@@ -73,7 +73,7 @@ class DatabaseSynchronizerTestCase(Base):
             url=settings.GEANT_BACKEND_GET_EXAMPLE_URL.format(title=self.example.title_not_verbose)
         )
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_get_example_from_backend_not_found(self, mock_get):
         mock_response = MagicMock()
         mock_response.json.return_value = {"detail": "Example not found"}
@@ -84,7 +84,7 @@ class DatabaseSynchronizerTestCase(Base):
 
         self.assertEqual(example_id, -1)
 
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_get_example_from_backend_error(self, mock_get):
         mock_get.side_effect = requests.exceptions.RequestException("API Error")
 
@@ -94,7 +94,7 @@ class DatabaseSynchronizerTestCase(Base):
             sync.get_example_from_backend()
 
     @patch('utils.services.DatabaseSynchronizer.get_example_from_backend')
-    @patch('requests.delete')
+    @patch('requests.Session.delete')
     def test_drop_example_success(self, mock_delete, mock_get_example):
         mock_get_example.return_value = 123
         mock_response = MagicMock()
@@ -109,7 +109,7 @@ class DatabaseSynchronizerTestCase(Base):
         )
 
     @patch('utils.services.DatabaseSynchronizer.get_example_from_backend')
-    @patch('requests.delete')
+    @patch('requests.Session.delete')
     def test_drop_example_not_found(self, mock_delete, mock_get_example):
         mock_get_example.return_value = -1
 
@@ -118,7 +118,7 @@ class DatabaseSynchronizerTestCase(Base):
 
         mock_delete.assert_not_called()
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_create_example_success(self, mock_post):
         mock_response = MagicMock()
         mock_response.status_code = 201
@@ -149,7 +149,7 @@ class DatabaseSynchronizerTestCase(Base):
             timeout=5
         )
 
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_create_example_error(self, mock_post):
         mock_post.side_effect = requests.exceptions.RequestException("API Error")
 
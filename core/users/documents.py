@@ -2,7 +2,7 @@ from django.conf import settings
 from django_elasticsearch_dsl import Document, fields
 from django_elasticsearch_dsl.registries import registry
 
-from geant_examples.models import UserExampleCommand
+from geant_examples.models import Example, UserExampleCommand
 
 
 @registry.register_document
@@ -48,6 +48,42 @@ class UserExampleCommandDocument(Document):
 
     class Django:
         model = UserExampleCommand
+        fields = ['id']
+        queryset_pagination = 1000
+        # example fields copied into every run are refreshed through get_denormalized_updates
+        denormalized_from = [Example]
+
+    def get_queryset(self):
+        return super().get_queryset().select_related(
+            'example_command__example__category'
+        ).prefetch_related(
+            'example_command__example__tags'
+        )
+
+    @staticmethod
+    def prepare_example_fields(example: Example) -> dict:
+        return {
+            'title_verbose': example.title_verbose,
+            'description': example.description,
+            'tags': [tag.title for tag in example.tags.all()],
+            'category': example.category.title if example.category else None,
+            'synchronized': example.synchronized,
+        }
+
+    def get_denormalized_updates(self, model, pks):
+        examples = Example.objects.filter(pk__in=pks).select_related('category').prefetch_related('tags')
+        partial_docs = {example.pk: self.prepare_example_fields(example) for example in examples}
+
+        rows = UserExampleCommand.objects.filter(
+            example_command__example_id__in=partial_docs.keys()
+        ).values_list('id', 'example_command__example_id')
+        for pk, example_id in rows.iterator(chunk_size=self.django.queryset_pagination):
+            yield {
+                '_op_type': 'update',
+                '_index': self._index._name,
+                '_id': pk,
+                'doc': partial_docs[example_id],
+            }
 
     def prepare_title_verbose(self, instance):
         return instance.example_command.example.title_verbose
@@ -69,4 +105,4 @@ class UserExampleCommandDocument(Document):
         return instance.example_command.example.synchronized
 
     def prepare_user(self, instance):
-        return instance.user.id
+        return instance.user_id
@@ -0,0 +1,81 @@
+import os
+import threading
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class PooledSession(requests.Session):
+    def __init__(self, timeout=None):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+_sessions = {}
+_lock = threading.Lock()
+
+
+def build_session(name: str) -> PooledSession:
+    conf = settings.HTTP_CLIENTS[name]
+    retry = Retry(
+        total=conf['retries'],
+        connect=conf['retries'],
+        read=conf['retries'],
+        status=conf['retries'],
+        backoff_factor=conf.get('backoff_factor', 0.5),
+        status_forcelist=(502, 503, 504),
+        allowed_methods=conf.get('retry_methods', Retry.DEFAULT_ALLOWED_METHODS),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=conf['pool_size'],
+        pool_maxsize=conf['pool_size'],
+        max_retries=retry,
+    )
+    session = PooledSession(timeout=conf['timeout'])
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_session(name: str) -> PooledSession:
+    # keyed by pid so that forked celery/gunicorn workers never share sockets with their parent
+    key = (os.getpid(), name)
+    session = _sessions.get(key)
+    if session is None:
+        with _lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = _sessions[key] = build_session(name)
+    return session
+
+
+def pool_stats() -> dict:
+    pid = os.getpid()
+    stats = {}
+    for (session_pid, name), session in list(_sessions.items()):
+        if session_pid != pid:
+            continue
+        pools = []
+        manager = session.get_adapter('http://').poolmanager
+        for key in list(manager.pools.keys()):
+            pool = manager.pools.get(key)
+            if pool is None:
+                continue
+            pools.append({
+                'host': pool.host,
+                'port': pool.port,
+                'scheme': pool.scheme,
+                'maxsize': pool.pool.maxsize if pool.pool else 0,
+                'idle': pool.pool.qsize() if pool.pool else 0,
+                'connections_opened': pool.num_connections,
+                'requests': pool.num_requests,
+            })
+        stats[name] = pools
+    return {'pid': pid, 'sessions': stats}
@@ -0,0 +1,143 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django_elasticsearch_dsl.registries import registry
+from elasticsearch.helpers import parallel_bulk
+from elasticsearch_dsl import connections
+
+from utils.search_index import start_replay, finish_replay, bump_index_version
+
+
+class Command(BaseCommand):
+    help = 'Build versioned copies of the search indices and atomically point their aliases at them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--models',
+            metavar='app[.model]',
+            nargs='*',
+            help='Only rebuild the indices of these apps or models',
+        )
+        parser.add_argument('--workers', type=int, default=settings.ELASTICSEARCH_REBUILD['workers'])
+        parser.add_argument('--chunk-size', type=int, default=settings.ELASTICSEARCH_REBUILD['chunk_size'])
+        parser.add_argument(
+            '--keep-old',
+            action='store_true',
+            help='Do not delete the indices the aliases pointed at before',
+        )
+
+    def handle(self, *args, **options):
+        self.es = connections.get_connection()
+        models = self.get_models(options['models'])
+
+        start_replay()
+        try:
+            for index in registry.get_indices(models):
+                self.rebuild(index, models, options)
+        finally:
+            finish_replay()
+
+    def get_models(self, labels):
+        models = registry.get_models()
+        if not labels:
+            return models
+
+        selected = set()
+        for label in labels:
+            label = label.lower()
+            matched = {
+                model for model in models
+                if label in (model._meta.app_label, model._meta.label_lower)
+            }
+            if not matched:
+                raise CommandError(f'No model or app named {label}')
+            selected |= matched
+        return selected
+
+    def rebuild(self, index, models, options):
+        alias = index._name
+        new_name = f'{alias}-{timezone.now():%Y%m%d%H%M%S%f}'
+        new_index = index.clone(name=new_name)
+        new_index.settings(refresh_interval='-1')
+        new_index.create()
+        self.stdout.write(f"Created index '{new_name}' for '{alias}'")
+
+        try:
+            indexed = expected = 0
+            for doc_class in registry.get_documents(models):
+                if doc_class._index._name != alias:
+                    continue
+                doc = doc_class()
+                expected += doc.get_queryset().count()
+                indexed += self.populate(doc, new_name, options)
+
+            self.es.indices.put_settings(index=new_name, settings={'refresh_interval': None})
+            self.es.indices.refresh(index=new_name)
+            count = self.es.count(index=new_name)['count']
+            if count != indexed:
+                raise CommandError(f"'{new_name}' holds {count} documents, {indexed} were sent")
+            if count != expected:
+                self.stdout.write(self.style.WARNING(
+                    f"'{new_name}' holds {count} documents, the database had {expected} at the start"))
+        except BaseException:
+            self.es.indices.delete(index=new_name, ignore_unavailable=True)
+            self.stderr.write(f"Deleted unfinished index '{new_name}'")
+            raise
+
+        self.swap_alias(alias, new_name, options['keep_old'])
+        for doc_class in registry.get_documents(models):
+            if doc_class._index._name == alias:
+                bump_index_version(doc_class.__name__)
+
+    def populate(self, doc, index_name, options):
+        # actions are prepared here, the bulk threads only send them, so no queryset is evaluated off the main thread
+        batch_size = options['chunk_size'] * options['workers']
+        indexed = 0
+        batch = []
+        for action in doc.get_actions(doc.get_indexing_queryset(), 'index'):
+            action['_index'] = index_name
+            batch.append(action)
+            if len(batch) >= batch_size:
+                indexed += self.send(batch, options)
+                batch = []
+        if batch:
+            indexed += self.send(batch, options)
+
+        self.stdout.write(f"Indexed {indexed} '{doc.django.model.__name__}' objects into '{index_name}'")
+        return indexed
+
+    def send(self, actions, options):
+        indexed = 0
+        errors = []
+        for ok, item in parallel_bulk(
+            self.es, actions,
+            thread_count=options['workers'],
+            chunk_size=options['chunk_size'],
+            raise_on_error=False,
+        ):
+            if ok:
+                indexed += 1
+            else:
+                errors.append(item)
+
+        if errors:
+            raise CommandError(f'{len(errors)} documents failed to index: {errors[:5]}')
+        return indexed
+
+    def swap_alias(self, alias, new_name, keep_old):
+        actions = [{'add': {'index': new_name, 'alias': alias}}]
+        old_indices = []
+        if self.es.indices.exists_alias(name=alias):
+            old_indices = list(self.es.indices.get_alias(name=alias).keys())
+            actions.extend({'remove': {'index': old, 'alias': alias}} for old in old_indices)
+        elif self.es.indices.exists(index=alias):
+            # left over from search_index --rebuild, a concrete index carrying the alias name
+            actions.append({'remove_index': {'index': alias}})
+
+        self.es.indices.update_aliases(actions=actions)
+        self.stdout.write(self.style.SUCCESS(f"Alias '{alias}' now points at '{new_name}'"))
+
+        if not keep_old:
+            for old in old_indices:
+                self.es.indices.delete(index=old, ignore_unavailable=True)
+                self.stdout.write(f"Deleted index '{old}'")
@@ -0,0 +1,41 @@
+import loguru
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+from geant_examples.models import UserExampleCommand
+
+
+def run_status_group(user_id) -> str:
+    return f'run_status_{user_id}'
+
+
+def send_run_statuses(key_s3: str):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+
+    runs = UserExampleCommand.objects.filter(example_command__key_s3=key_s3).values(
+        'id', 'user_id', 'status', 'example_command_id', 'example_command__example_id'
+    )
+    for run in runs:
+        status = UserExampleCommand.StatusChoice(run['status'])
+        data = {
+            'id': run['id'],
+            'example': run['example_command__example_id'],
+            'example_command': run['example_command_id'],
+            'key_s3': key_s3,
+            'status': status.value,
+            'status_label': status.label,
+        }
+        try:
+            async_to_sync(channel_layer.group_send)(
+                run_status_group(run['user_id']), {'type': 'run.status', 'data': data})
+        except Exception as e:
+            # a missed push only means the client learns the status on its next request
+            loguru.logger.error(f'Could not push status of run {key_s3} to user {run["user_id"]}: {e}')
+            continue
+
+
+def publish_run_statuses(key_s3: str):
+    transaction.on_commit(lambda: send_run_statuses(key_s3))
@@ -0,0 +1,182 @@
+from collections import defaultdict
+
+import loguru
+import redis
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import models, transaction
+from django_elasticsearch_dsl.apps import DEDConfig
+from django_elasticsearch_dsl.registries import registry
+from django_elasticsearch_dsl.signals import RealTimeSignalProcessor
+
+_connection = None
+
+
+def get_queue_connection() -> redis.Redis:
+    global _connection
+    if _connection is None:
+        _connection = redis.Redis.from_url(settings.ELASTICSEARCH_INDEX_QUEUE['redis_url'])
+    return _connection
+
+
+def push(members: list[str]):
+    try:
+        get_queue_connection().sadd(settings.ELASTICSEARCH_INDEX_QUEUE['key'], *members)
+    except redis.RedisError as e:
+        loguru.logger.error(f'Could not enqueue {len(members)} documents for indexing: {e}')
+
+
+def suggest_inputs(*titles: str, max_words: int = 6) -> list[str]:
+    # completion suggesters only match from the start of an input, so every word of the title starts one
+    inputs = []
+    for title in filter(None, titles):
+        words = title.split()
+        inputs.extend(' '.join(words[i:]) for i in range(min(len(words), max_words)))
+    return inputs
+
+
+def get_index_version(document_name: str) -> int:
+    return cache.get(f'search:version:{document_name}', 0)
+
+
+def bump_index_version(document_name: str):
+    # cached list pages are keyed by this version, bumping it drops all of them at once
+    key = f'search:version:{document_name}'
+    cache.add(key, 0, None)
+    cache.incr(key)
+
+
+def enqueue(model, pks):
+    if not DEDConfig.autosync_enabled():
+        return
+    if not registry.get_documents([model]) and not get_dependent_documents(model):
+        return
+
+    members = [f'{model._meta.label}:{pk}' for pk in pks]
+    if members:
+        # the consumer reads rows back from the database, so they have to be committed first
+        transaction.on_commit(lambda: push(members))
+
+
+def enqueue_related(instance):
+    for doc_class in registry.get_documents():
+        if instance.__class__ not in doc_class.django.related_models:
+            continue
+        try:
+            related = doc_class().get_instances_from_related(instance)
+        except ObjectDoesNotExist:
+            related = None
+        if related is None:
+            continue
+        if isinstance(related, models.Model):
+            pks = [related.pk]
+        elif isinstance(related, models.QuerySet):
+            pks = list(related.values_list('pk', flat=True))
+        else:
+            pks = [obj.pk for obj in related]
+        enqueue(doc_class.django.model, pks)
+
+
+def get_dependent_documents(model) -> list:
+    return [
+        doc_class for doc_class in registry.get_documents()
+        if model in getattr(doc_class.Django, 'denormalized_from', ())
+    ]
+
+
+def bulk_index(doc, actions: list):
+    _, errors = doc.bulk(actions, raise_on_error=False, refresh=False)
+    bump_index_version(doc.__class__.__name__)
+    # deletes and partial updates of documents that were never indexed are not worth reporting
+    errors = [error for error in errors if next(iter(error.values())).get('status') != 404]
+    if errors:
+        loguru.logger.error(f'Bulk indexing of {doc.__class__.__name__} failed for {len(errors)} documents: {errors[:5]}')
+
+
+class QueuedSignalProcessor(RealTimeSignalProcessor):
+    """Queue changed rows in Redis instead of indexing them inside the request.
+
+    The queue is a set of "<app_label.Model>:<pk>" members, so repeated saves of
+    a row collapse into one entry until flush_index_queue picks it up.
+    """
+
+    def handle_save(self, sender, instance, **kwargs):
+        enqueue(instance.__class__, [instance.pk])
+        enqueue_related(instance)
+
+    def handle_pre_delete(self, sender, instance, **kwargs):
+        enqueue_related(instance)
+
+    def handle_delete(self, sender, instance, **kwargs):
+        enqueue(instance.__class__, [instance.pk])
+
+
+def index_members(members: list[bytes]):
+    pks_by_model = defaultdict(set)
+    for member in members:
+        label, pk = member.decode().rsplit(':', 1)
+        pks_by_model[apps.get_model(label)].add(pk)
+
+    for model, pks in pks_by_model.items():
+        for doc_class in registry.get_documents([model]):
+            if doc_class.django.ignore_signals:
+                continue
+
+            doc = doc_class()
+            objects = list(doc.get_queryset().filter(pk__in=pks))
+            actions = list(doc.get_actions(objects, 'index'))
+            # rows that are gone from the database were deleted after being queued
+            missing = pks - {str(obj.pk) for obj in objects}
+            actions.extend(
+                {'_op_type': 'delete', '_index': doc._index._name, '_id': pk}
+                for pk in missing
+            )
+
+            bulk_index(doc, actions)
+
+        for doc_class in get_dependent_documents(model):
+            doc = doc_class()
+            actions = list(doc.get_denormalized_updates(model, pks))
+            if actions:
+                bulk_index(doc, actions)
+
+
+def start_replay():
+    # while an index is rebuilt the queue keeps writing to the live one, so the flushed rows are kept for a replay
+    key = settings.ELASTICSEARCH_INDEX_QUEUE['key']
+    get_queue_connection().set(f'{key}:rebuilding', 1, ex=settings.ELASTICSEARCH_REBUILD['replay_timeout'])
+
+
+def finish_replay():
+    key = settings.ELASTICSEARCH_INDEX_QUEUE['key']
+    connection = get_queue_connection()
+    connection.delete(f'{key}:rebuilding')
+    if connection.exists(f'{key}:replay'):
+        connection.sunionstore(key, [key, f'{key}:replay'])
+        connection.delete(f'{key}:replay')
+
+
+def flush_index_queue() -> int:
+    conf = settings.ELASTICSEARCH_INDEX_QUEUE
+    connection = get_queue_connection()
+    flushed = 0
+
+    while True:
+        members = connection.spop(conf['key'], conf['batch_size'])
+        if not members:
+            break
+        try:
+            index_members(members)
+        except Exception:
+            # give the batch back so that the next flush retries it
+            connection.sadd(conf['key'], *members)
+            raise
+        if connection.exists(f'{conf["key"]}:rebuilding'):
+            connection.sadd(f'{conf["key"]}:replay', *members)
+        flushed += len(members)
+        if len(members) < conf['batch_size']:
+            break
+
+    return flushed
@@ -1,9 +1,9 @@
-import requests
-
 from django.conf import settings
 from loguru import logger
 from tenacity import wait_fixed, retry, stop_after_attempt
 
+from utils.http import get_session
+
 
 class DatabaseSynchronizer:
     def __init__(self, example=None, command=None):
@@ -28,7 +28,7 @@ class DatabaseSynchronizer:
         ]
 
     def get_example_from_backend(self):
-        response = requests.get(
+        response = get_session('geant_backend').get(
             url=settings.GEANT_BACKEND_GET_EXAMPLE_URL.format(title=self.example.title_not_verbose)
         )
         data = response.json()
@@ -44,13 +44,13 @@ class DatabaseSynchronizer:
             return
 
         url = settings.GEANT_BACKEND_DELETE_EXAMPLE_URL.format(id=backend_example_id)
-        requests.delete(url)
+        get_session('geant_backend').delete(url)
         logger.info("success delete %s example from Backend." % self.example.title_not_verbose)
 
     @retry(wait=wait_fixed(3), stop=stop_after_attempt(5), reraise=True)
     def create_example(self):
         json = self.prepare_data()
-        response = requests.post(
+        response = get_session('geant_backend').post(
             url=settings.GEANT_BACKEND_CREATE_EXAMPLE_URL,
             json=json,
             timeout=5
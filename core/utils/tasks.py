@@ -2,10 +2,17 @@ from celery import shared_task
 
 from django.core.management import call_command
 
+from utils.search_index import flush_index_queue
+
 @shared_task
 def database_backup():
     call_command(
         'dbbackup',
         '-o',
         'web-backend-backup.bin',
-    )
\ No newline at end of file
+    )
+
+
+@shared_task
+def flush_search_index():
+    return flush_index_queue()